@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from backend.app.observability import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_SERVICE_SECONDS,
+    ADMISSION_WAIT_SECONDS,
+)
+
+logger = logging.getLogger("cspaper.admission")
+
+# 同时在跑的审稿（上传解析 + 模型调用 + 写库）上限；<= 0 关闭准入控制
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+# 单个客户端（按 IP）同时在跑与排队的请求数上限
+ADMISSION_MAX_PER_CLIENT = int(os.getenv("ADMISSION_MAX_PER_CLIENT", "2"))
+# 排队的在线请求数上限，超出直接 503
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+# 在线请求最长排队时间；预计等待超过它的请求不进队列，立即 503
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30"))
+# 还没有观测数据时假定的单次审稿耗时，用于估算等待时间与 Retry-After
+ADMISSION_DEFAULT_SERVICE_SECONDS = float(os.getenv("ADMISSION_DEFAULT_SERVICE_SECONDS", "20"))
+# 审稿耗时滑动平均的平滑系数
+SERVICE_TIME_ALPHA = 0.2
+
+# 数值越小越先放行
+PRIORITY_INTERACTIVE = 0  # SSE 流式审稿：用户正盯着页面
+PRIORITY_DEFAULT = 1  # 同步审稿、重新审稿
+PRIORITY_BACKGROUND = 2  # 异步任务 worker：不受单客户端与队列长度限制，也不会超时
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_DEFAULT: "default", PRIORITY_BACKGROUND: "background"}
+
+
+class AdmissionRejected(Exception):
+    """
+    请求被准入控制拒绝：429（单个客户端超限）或 503（排队已满、预计或实际等待过长）。
+    retry_after 为建议的重试间隔（秒），由观测到的审稿耗时估算。
+    """
+
+    def __init__(self, status_code: int, code: str, message: str, retry_after: int, details: Optional[dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.retry_after = retry_after
+        self.details = details
+
+
+class AdmissionSlot:
+    """
+    一个已放行的名额。release() 可重复调用，只有第一次生效；
+    名额直接交给排在最前的等待者，没有等待者时才让出并发数。
+    """
+
+    def __init__(self, controller: "AdmissionController", client: Optional[str]):
+        self._controller = controller
+        self._client = client
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self._client, time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """
+    进程内的准入控制：全局并发上限 + 单客户端上限 + 按优先级排序的有界等待队列。
+    超出容量的请求立即拒绝而不是无限排队，过载时延迟保持在 max_wait 以内，
+    被拒绝的客户端按 Retry-After 退避。只能在同一个事件循环里使用。
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_per_client: int = ADMISSION_MAX_PER_CLIENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+        service_seconds: float = ADMISSION_DEFAULT_SERVICE_SECONDS,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_per_client = max_per_client
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.service_seconds = service_seconds
+        self.in_flight = 0
+        # (priority, seq, future)；超时或取消的等待者留在堆里，放行时跳过
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._waiting: Dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+        self._clients: Dict[str, int] = {}
+        ADMISSION_SERVICE_SECONDS.set(service_seconds)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._waiting.values())
+
+    def _retry_after(self, seconds: float) -> int:
+        return max(1, math.ceil(seconds))
+
+    def _predicted_wait(self, priority: int) -> float:
+        # 排在前面的等待者（优先级不低于自己）加上自己，按全部名额平均分摊审稿耗时
+        ahead = sum(count for p, count in self._waiting.items() if p <= priority)
+        return (ahead + 1) * self.service_seconds / self.max_in_flight
+
+    def _reject(self, status_code: int, code: str, reason: str, message: str, retry_after: float, details: dict):
+        ADMISSION_REJECTED.inc(reason=reason)
+        return AdmissionRejected(status_code, code, message, self._retry_after(retry_after), details)
+
+    def _client_enter(self, client: Optional[str]) -> None:
+        if client is not None:
+            self._clients[client] = self._clients.get(client, 0) + 1
+
+    def _client_leave(self, client: Optional[str]) -> None:
+        if client is None:
+            return
+        remaining = self._clients.get(client, 0) - 1
+        if remaining > 0:
+            self._clients[client] = remaining
+        else:
+            self._clients.pop(client, None)
+
+    def _set_waiting(self, priority: int, delta: int) -> None:
+        self._waiting[priority] += delta
+        ADMISSION_QUEUE_DEPTH.set(self._waiting[priority], priority=PRIORITY_NAMES[priority])
+
+    async def acquire(self, client: Optional[str], priority: int = PRIORITY_DEFAULT) -> AdmissionSlot:
+        """
+        申请一个名额，必要时排队等待。client 为 None 时不做单客户端限制（后台任务）。
+        被拒绝时抛出 AdmissionRejected，调用方无需释放。
+        """
+        if not self.enabled:
+            return AdmissionSlot(self, None)
+        background = priority >= PRIORITY_BACKGROUND
+        if background:
+            client = None
+
+        if client is not None and self._clients.get(client, 0) >= self.max_per_client:
+            raise self._reject(
+                429,
+                "TOO_MANY_REQUESTS",
+                "client_limit",
+                "同时进行的审稿请求过多，请等当前请求完成后再试。",
+                self.service_seconds,
+                {"limit": self.max_per_client},
+            )
+
+        if self.in_flight < self.max_in_flight and not self.queue_depth:
+            self.in_flight += 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight)
+            ADMISSION_WAIT_SECONDS.observe(0.0, priority=PRIORITY_NAMES[priority])
+            self._client_enter(client)
+            return AdmissionSlot(self, client)
+
+        if not background:
+            online_waiting = self.queue_depth - self._waiting[PRIORITY_BACKGROUND]
+            if online_waiting >= self.max_queue:
+                raise self._reject(
+                    503,
+                    "QUEUE_FULL",
+                    "queue_full",
+                    "服务繁忙，审稿队列已满，请稍后重试。",
+                    self._predicted_wait(PRIORITY_BACKGROUND),
+                    {"queue_depth": online_waiting, "limit": self.max_queue},
+                )
+            predicted = self._predicted_wait(priority)
+            if predicted > self.max_wait:
+                raise self._reject(
+                    503,
+                    "SERVER_BUSY",
+                    "wait_too_long",
+                    "服务繁忙，预计等待时间过长，请稍后重试。",
+                    predicted,
+                    {"estimated_wait_seconds": round(predicted, 1), "max_wait_seconds": self.max_wait},
+                )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        self._set_waiting(priority, 1)
+        self._client_enter(client)
+        started = time.monotonic()
+        admitted = False
+        try:
+            await asyncio.wait({future}, timeout=None if background else self.max_wait)
+            # 超时与放行可能发生在同一轮事件循环里：future 已有结果就说明名额已经交给了自己
+            admitted = future.done() and not future.cancelled()
+        finally:
+            self._set_waiting(priority, -1)
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, priority=PRIORITY_NAMES[priority])
+            if not admitted:
+                if future.done() and not future.cancelled():
+                    # 被取消时名额恰好已经交过来：转交给下一个等待者
+                    self._handoff()
+                future.cancel()
+                self._client_leave(client)
+
+        if not admitted:
+            raise self._reject(
+                503,
+                "SERVER_BUSY",
+                "queue_timeout",
+                "服务繁忙，排队等待超时，请稍后重试。",
+                self._predicted_wait(priority),
+                {"waited_seconds": round(time.monotonic() - started, 1), "max_wait_seconds": self.max_wait},
+            )
+        return AdmissionSlot(self, client)
+
+    def _handoff(self) -> None:
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+
+    def _release(self, client: Optional[str], held_seconds: float) -> None:
+        if not self.enabled:
+            return
+        self.service_seconds += SERVICE_TIME_ALPHA * (held_seconds - self.service_seconds)
+        ADMISSION_SERVICE_SECONDS.set(self.service_seconds)
+        self._client_leave(client)
+        self._handoff()
+
+    @asynccontextmanager
+    async def admit(self, client: Optional[str], priority: int = PRIORITY_DEFAULT) -> AsyncIterator[AdmissionSlot]:
+        slot = await self.acquire(client, priority)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+
+# 每个 worker 进程各自一份；多 worker 部署时总并发约为 worker 数 × ADMISSION_MAX_IN_FLIGHT
+admission = AdmissionController()
@@ -0,0 +1,233 @@
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from backend.app.models import ScoreDailyStatORM, ScoreHistogramORM
+from backend.app.schemas import DailyScoreStats, DimensionScoreStats, ScoreAnalytics, ScoreRank
+
+logger = logging.getLogger("cspaper.analytics")
+
+# 分数范围与直方图分桶：0.0–5.0 每 0.1 一桶，模型给出的分数最多一位小数，分桶即精确值
+SCORE_MIN = 0.0
+SCORE_MAX = 5.0
+HISTOGRAM_BUCKET_WIDTH = 0.1
+HISTOGRAM_BUCKETS = int(round((SCORE_MAX - SCORE_MIN) / HISTOGRAM_BUCKET_WIDTH)) + 1
+QUANTILES = (("p25", 0.25), ("p50", 0.5), ("p75", 0.75), ("p90", 0.9))
+# 趋势默认回看的天数与上限
+ANALYTICS_DAYS = 30
+ANALYTICS_MAX_DAYS = 365
+
+
+def score_bucket(value: float) -> int:
+    """
+    分数所在的直方图分桶（四舍五入到最近的 0.1，超出范围的截到两端）。
+    与 rebuild_score_stats 里的 SQL 表达式保持一致。
+    """
+    clipped = min(max(value, SCORE_MIN), SCORE_MAX)
+    return int((clipped - SCORE_MIN) / HISTOGRAM_BUCKET_WIDTH + 0.5)
+
+
+def bucket_value(bucket: int) -> float:
+    return round(SCORE_MIN + bucket * HISTOGRAM_BUCKET_WIDTH, 4)
+
+
+def _day(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d")
+
+
+def record_scores(db: Session, scores: Sequence[Tuple[str, float]], generated_at: datetime) -> None:
+    """
+    把一份审稿结果的分数计入按天汇总与直方图。与写入 review_results 在同一事务内调用，不提交；
+    两条 INSERT ... ON CONFLICT DO UPDATE 在 SQLite 内原子累加，并发写入不会丢计数。
+    """
+    # NaN / inf 会污染累加和，并让 score_bucket 的 int() 抛错
+    scores = [(dimension, value) for dimension, value in scores if math.isfinite(value)]
+    if not scores:
+        return
+    day = _day(generated_at)
+
+    daily: Dict[str, List[float]] = defaultdict(list)
+    buckets: Dict[Tuple[str, int], int] = defaultdict(int)
+    for dimension, value in scores:
+        daily[dimension].append(value)
+        buckets[(dimension, score_bucket(value))] += 1
+
+    stmt = sqlite_insert(ScoreDailyStatORM)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["day", "dimension"],
+            set_={
+                "count": ScoreDailyStatORM.count + stmt.excluded.count,
+                "value_sum": ScoreDailyStatORM.value_sum + stmt.excluded.value_sum,
+                "value_sq_sum": ScoreDailyStatORM.value_sq_sum + stmt.excluded.value_sq_sum,
+                "min_value": func.min(ScoreDailyStatORM.min_value, stmt.excluded.min_value),
+                "max_value": func.max(ScoreDailyStatORM.max_value, stmt.excluded.max_value),
+            },
+        ),
+        [
+            {
+                "day": day,
+                "dimension": dimension,
+                "count": len(values),
+                "value_sum": sum(values),
+                "value_sq_sum": sum(v * v for v in values),
+                "min_value": min(values),
+                "max_value": max(values),
+            }
+            for dimension, values in daily.items()
+        ],
+    )
+
+    stmt = sqlite_insert(ScoreHistogramORM)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["dimension", "bucket"],
+            set_={"count": ScoreHistogramORM.count + stmt.excluded.count},
+        ),
+        [
+            {"dimension": dimension, "bucket": bucket, "count": count}
+            for (dimension, bucket), count in buckets.items()
+        ],
+    )
+
+
+_BUCKET_SQL = (
+    f"CAST((MIN(MAX(s.value, {SCORE_MIN}), {SCORE_MAX}) - {SCORE_MIN}) / {HISTOGRAM_BUCKET_WIDTH} + 0.5 AS INTEGER)"
+)
+
+
+def rebuild_score_stats(conn: Connection) -> None:
+    """
+    按 scores / review_results 全量重算汇总表。用于回填旧数据或怀疑汇总与明细不一致时。
+    """
+    conn.exec_driver_sql("DELETE FROM score_daily_stats")
+    conn.exec_driver_sql("DELETE FROM score_histogram")
+    conn.exec_driver_sql(
+        "INSERT INTO score_daily_stats (day, dimension, count, value_sum, value_sq_sum, min_value, max_value) "
+        "SELECT date(r.generated_at), s.dimension, COUNT(*), SUM(s.value), SUM(s.value * s.value), "
+        "MIN(s.value), MAX(s.value) "
+        "FROM scores s JOIN review_results r ON r.id = s.review_result_id "
+        "GROUP BY date(r.generated_at), s.dimension"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO score_histogram (dimension, bucket, count) "
+        f"SELECT s.dimension, {_BUCKET_SQL}, COUNT(*) FROM scores s GROUP BY s.dimension, {_BUCKET_SQL}"
+    )
+
+
+def ensure_score_stats(conn: Connection) -> None:
+    """
+    汇总表为空而 scores 已有数据时（升级后首次启动）回填一次。
+    """
+    if conn.exec_driver_sql("SELECT 1 FROM score_daily_stats LIMIT 1").first() is not None:
+        return
+    if conn.exec_driver_sql("SELECT 1 FROM scores LIMIT 1").first() is None:
+        return
+    rebuild_score_stats(conn)
+    logger.info("Score analytics backfilled from scores table")
+
+
+def _mean_std(count: int, value_sum: float, value_sq_sum: float) -> Tuple[float, float]:
+    mean = value_sum / count
+    # 总体标准差；浮点误差可能让方差略小于 0
+    return mean, math.sqrt(max(value_sq_sum / count - mean * mean, 0.0))
+
+
+def _load_histograms(db: Session, dimension: Optional[str] = None) -> Dict[str, List[int]]:
+    stmt = select(ScoreHistogramORM.dimension, ScoreHistogramORM.bucket, ScoreHistogramORM.count)
+    if dimension is not None:
+        stmt = stmt.where(ScoreHistogramORM.dimension == dimension)
+    histograms: Dict[str, List[int]] = {}
+    for dim, bucket, count in db.execute(stmt):
+        histograms.setdefault(dim, [0] * HISTOGRAM_BUCKETS)[bucket] = count
+    return histograms
+
+
+def _quantile(histogram: List[int], total: int, q: float) -> float:
+    target = q * total
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        seen += count
+        if seen >= target and count:
+            return bucket_value(bucket)
+    return SCORE_MAX
+
+
+def score_analytics(db: Session, days: int = ANALYTICS_DAYS) -> ScoreAnalytics:
+    """
+    各维度的全量统计（条数、均值、标准差、最值、分位数、直方图）与最近 days 天的逐日趋势。
+    只读汇总表：行数取决于维度数与天数，与审稿结果数量无关。
+    """
+    totals = db.execute(
+        select(
+            ScoreDailyStatORM.dimension,
+            func.sum(ScoreDailyStatORM.count),
+            func.sum(ScoreDailyStatORM.value_sum),
+            func.sum(ScoreDailyStatORM.value_sq_sum),
+            func.min(ScoreDailyStatORM.min_value),
+            func.max(ScoreDailyStatORM.max_value),
+        )
+        .group_by(ScoreDailyStatORM.dimension)
+        .order_by(ScoreDailyStatORM.dimension)
+    ).all()
+    histograms = _load_histograms(db)
+
+    dimensions = []
+    for dimension, count, value_sum, value_sq_sum, min_value, max_value in totals:
+        mean, std = _mean_std(count, value_sum, value_sq_sum)
+        histogram = histograms.get(dimension, [0] * HISTOGRAM_BUCKETS)
+        hist_total = sum(histogram)
+        dimensions.append(
+            DimensionScoreStats(
+                dimension=dimension,
+                count=count,
+                mean=round(mean, 4),
+                std=round(std, 4),
+                min=min_value,
+                max=max_value,
+                quantiles={name: _quantile(histogram, hist_total, q) for name, q in QUANTILES} if hist_total else {},
+                histogram=histogram,
+            )
+        )
+
+    since = _day(datetime.now(timezone.utc) - timedelta(days=days - 1))
+    daily = []
+    for row in db.execute(
+        select(ScoreDailyStatORM)
+        .where(ScoreDailyStatORM.day >= since)
+        .order_by(ScoreDailyStatORM.day, ScoreDailyStatORM.dimension)
+    ).scalars():
+        mean, std = _mean_std(row.count, row.value_sum, row.value_sq_sum)
+        daily.append(
+            DailyScoreStats(day=row.day, dimension=row.dimension, count=row.count, mean=round(mean, 4), std=round(std, 4))
+        )
+
+    return ScoreAnalytics(bucket_width=HISTOGRAM_BUCKET_WIDTH, dimensions=dimensions, daily=daily)
+
+
+def score_rank(db: Session, dimension: str, value: float) -> Optional[ScoreRank]:
+    """
+    某个分数在该维度全部历史分数中的位置，例如 "clarity 4.5 分位于前 12%"。
+    只读该维度的直方图；维度没有任何数据时返回 None。
+    """
+    histogram = _load_histograms(db, dimension).get(dimension)
+    if histogram is None:
+        return None
+    total = sum(histogram)
+    bucket = score_bucket(value)
+    below = sum(histogram[:bucket])
+    equal = histogram[bucket]
+    return ScoreRank(
+        dimension=dimension,
+        value=value,
+        count=total,
+        percentile=round(100.0 * (below + equal / 2) / total, 2),
+        top_percent=round(100.0 * (total - below) / total, 2),
+    )
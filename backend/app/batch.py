@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.jobs import STATUS_DONE, STATUS_FAILED, create_job, job_to_schema
+from backend.app.models import ReviewBatchItemORM, ReviewBatchORM, ReviewJobORM
+from backend.app.pipeline import ReviewPipelineError, run_review_pipeline
+from backend.app.schemas import ReviewBatch
+from backend.app.uploads import SpooledUpload
+
+logger = logging.getLogger("cspaper.batch")
+
+# 单个批次最多包含的文件数（接口上传）
+REVIEW_BATCH_MAX_FILES = int(os.getenv("REVIEW_BATCH_MAX_FILES", "500"))
+
+# 命令行批量审稿：默认并发数与模型调用失败后的重试次数
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_RETRIES = int(os.getenv("BATCH_RETRIES", "2"))
+# 一篇论文因模型调用失败重试前的等待（秒），按 2 的幂增长
+BATCH_RETRY_BASE_SECONDS = float(os.getenv("BATCH_RETRY_BASE_SECONDS", "5"))
+BATCH_RETRY_MAX_SECONDS = float(os.getenv("BATCH_RETRY_MAX_SECONDS", "120"))
+
+CHECKPOINT_FILE_NAME = ".cspaper-batch.jsonl"
+
+
+# ---------- 接口：批次 = 一组 review_jobs 任务 ----------
+
+
+def create_batch(db: Session, uploads: List[SpooledUpload], refresh: bool = False) -> ReviewBatchORM:
+    """
+    为每个已落盘的上传文件登记一条 queued 任务，并记录到同一个批次下。
+    任务由 JobWorkerPool 处理：并发受 REVIEW_JOB_WORKERS 与 LLM_MAX_CONCURRENCY 限制，
+    任务状态持久化在数据库里，服务重启后未完成的任务会被放回队列继续处理。
+    批次与全部任务在同一个事务里提交：中途失败时一个任务都不会入队。
+    """
+    batch = ReviewBatchORM(batch_id=f"batch_{uuid4().hex[:12]}", refresh=refresh)
+    try:
+        db.add(batch)
+        db.flush()
+        for upload in uploads:
+            job = create_job(db, upload, refresh, commit=False)
+            db.add(ReviewBatchItemORM(batch_db_id=batch.id, job_id=job.job_id))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(batch)
+    return batch
+
+
+def get_batch(db: Session, batch_id: str) -> Optional[ReviewBatch]:
+    batch = db.execute(
+        select(ReviewBatchORM).where(ReviewBatchORM.batch_id == batch_id)
+    ).scalar_one_or_none()
+    if batch is None:
+        return None
+
+    jobs = db.execute(
+        select(ReviewJobORM)
+        .join(ReviewBatchItemORM, ReviewBatchItemORM.job_id == ReviewJobORM.job_id)
+        .where(ReviewBatchItemORM.batch_db_id == batch.id)
+        .order_by(ReviewJobORM.id.asc())
+    ).scalars().all()
+
+    counts = Counter(job.status for job in jobs)
+    done = counts.get(STATUS_DONE, 0)
+    started = [job.started_at for job in jobs if job.started_at is not None]
+    finished = [job.finished_at for job in jobs if job.finished_at is not None]
+    papers_per_minute = None
+    if done and started and finished:
+        minutes = (max(finished) - min(started)).total_seconds() / 60
+        if minutes > 0:
+            papers_per_minute = round(done / minutes, 2)
+
+    return ReviewBatch(
+        batch_id=batch.batch_id,
+        created_at=batch.created_at.isoformat(),
+        total=len(jobs),
+        status_counts=dict(counts),
+        finished=counts.get(STATUS_DONE, 0) + counts.get(STATUS_FAILED, 0) == len(jobs),
+        papers_per_minute=papers_per_minute,
+        jobs=[job_to_schema(job) for job in jobs],
+    )
+
+
+# ---------- 命令行：直接在本进程内审阅一个目录 ----------
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 并发控制：模型调用失败（多为限流或服务过载）时并发减半，
+    之后每连续成功 limit 篇恢复 1 个并发，直到 max_concurrency。
+    max_per_minute > 0 时另外限制开始处理的速率。
+    """
+
+    def __init__(self, max_concurrency: int, max_per_minute: float = 0.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.active = 0
+        self._successes = 0
+        self._interval = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + self._interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def release(self, throttled: bool = False) -> None:
+        async with self._cond:
+            self.active -= 1
+            if throttled:
+                if self.limit > 1:
+                    self.limit = max(1, self.limit // 2)
+                    logger.warning(f"Model calls failing, batch concurrency reduced to {self.limit}")
+                self._successes = 0
+            elif self.limit < self.max_concurrency:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+class BatchCheckpoint:
+    """
+    追加写入的 JSON Lines 进度文件，每篇论文处理完立即落盘。
+    以 PDF 内容哈希为键：重启后已成功的论文（即使被改名）直接跳过，失败的重新处理。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: Dict[str, dict] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 进程崩溃时写了一半的行
+                    if entry.get("status") == STATUS_DONE:
+                        self.done[entry["sha256"]] = entry
+
+    def is_done(self, sha256: str) -> bool:
+        return sha256 in self.done
+
+    def record(self, entry: dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if entry.get("status") == STATUS_DONE:
+            self.done[entry["sha256"]] = entry
+
+
+@dataclass
+class BatchReport:
+    total: int = 0
+    reviewed: int = 0
+    cached: int = 0
+    skipped: int = 0
+    failures: List[dict] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def papers_per_minute(self) -> float:
+        processed = self.reviewed + self.cached
+        return processed / (self.elapsed_seconds / 60) if self.elapsed_seconds > 0 else 0.0
+
+
+def find_pdfs(directory: Path) -> List[Path]:
+    return sorted(p for p in directory.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+
+async def review_directory(
+    directory: Path,
+    concurrency: int = BATCH_CONCURRENCY,
+    checkpoint_path: Optional[Path] = None,
+    refresh: bool = False,
+    max_per_minute: float = 0.0,
+    retries: int = BATCH_RETRIES,
+) -> BatchReport:
+    """
+    审阅目录下（含子目录）的全部 PDF，走与 POST /api/review 相同的流水线（缓存、去重、写库）。
+    进度写入 checkpoint_path（默认为目录下的 .cspaper-batch.jsonl），中断后重新运行即从断点继续。
+    """
+    paths = find_pdfs(directory)
+    checkpoint = BatchCheckpoint(checkpoint_path or directory / CHECKPOINT_FILE_NAME)
+    limiter = AdaptiveLimiter(concurrency, max_per_minute)
+    report = BatchReport(total=len(paths))
+    position = 0
+    started = time.perf_counter()
+
+    def log(path: Path, message: str) -> None:
+        nonlocal position
+        position += 1
+        print(f"[{position}/{report.total}] {path.relative_to(directory)}: {message}", flush=True)
+
+    def record(entry: dict) -> None:
+        # 断点文件写不进去时只少了断点，不中止整批：重新运行时这篇会再审一次（多半命中缓存）
+        try:
+            checkpoint.record(entry)
+        except OSError as e:
+            logger.error(f"Failed to write checkpoint for {entry['file']}: {e}")
+
+    def fail(path: Path, entry: dict, error: ReviewPipelineError) -> None:
+        failure = {**entry, "status": STATUS_FAILED, "error": error.to_error()}
+        record(failure)
+        report.failures.append(failure)
+        log(path, f"failed: {error.code} {error.message}")
+
+    async def review_one(path: Path) -> None:
+        try:
+            upload = await run_in_threadpool(SpooledUpload.from_path, path, path.name)
+        except OSError as e:
+            # 运行期间被删除或没有读权限的文件：记为失败，继续审其余文件
+            fail(
+                path,
+                {"file": str(path), "sha256": None},
+                ReviewPipelineError(400, "FILE_UNREADABLE", "无法读取 PDF 文件。", {"reason": str(e)}),
+            )
+            return
+        if checkpoint.is_done(upload.sha256):
+            report.skipped += 1
+            log(path, "skipped (already in checkpoint)")
+            return
+
+        entry = {"file": str(path), "sha256": upload.sha256}
+        for attempt in range(retries + 1):
+            await limiter.acquire()
+            paper_started = time.perf_counter()
+            error = None
+            try:
+                result, cache_status = await run_review_pipeline(upload, refresh=refresh)
+            except ReviewPipelineError as e:
+                error = e
+            except Exception as e:
+                logger.exception(f"Batch review of {path} crashed: {type(e).__name__}: {e}")
+                error = ReviewPipelineError(500, "INTERNAL_ERROR", "审稿任务执行异常。", {"reason": str(e)})
+            finally:
+                throttled = error is not None and error.code == "MODEL_ERROR"
+                await limiter.release(throttled)
+
+            if error is None:
+                if cache_status in ("hit", "near-hit"):
+                    report.cached += 1
+                else:
+                    report.reviewed += 1
+                review_result_id = result.review_result.review_result_id
+                record({**entry, "status": STATUS_DONE, "review_result_id": review_result_id})
+                log(path, f"{review_result_id} ({cache_status}, {time.perf_counter() - paper_started:.1f}s)")
+                return
+            if error.code != "MODEL_ERROR" or attempt == retries:
+                break
+            delay = min(BATCH_RETRY_MAX_SECONDS, BATCH_RETRY_BASE_SECONDS * (2 ** attempt))
+            logger.warning(f"{path.name}: {error.code}, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+        fail(path, entry, error)
+
+    await asyncio.gather(*(review_one(path) for path in paths))
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行：python -m backend.app.batch <目录> [--concurrency N] [--checkpoint 文件] [--max-per-minute N]
+    """
+    parser = argparse.ArgumentParser(description="Review every PDF under a directory")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--checkpoint", type=Path, default=None, help=f"default: <directory>/{CHECKPOINT_FILE_NAME}")
+    parser.add_argument("--max-per-minute", type=float, default=0.0, help="cap on papers started per minute")
+    parser.add_argument("--retries", type=int, default=BATCH_RETRIES, help="retries per paper after a model error")
+    parser.add_argument("--refresh", action="store_true", help="bypass the review cache")
+    args = parser.parse_args(argv)
+
+    if not args.directory.is_dir():
+        parser.error(f"not a directory: {args.directory}")
+
+    from backend.app.db import init_db
+    from backend.app.pdf_utils import shutdown_pdf_pool
+    from backend.app.providers import aclose_llm_clients
+
+    async def run() -> BatchReport:
+        try:
+            return await review_directory(
+                args.directory,
+                concurrency=args.concurrency,
+                checkpoint_path=args.checkpoint,
+                refresh=args.refresh,
+                max_per_minute=args.max_per_minute,
+                retries=args.retries,
+            )
+        finally:
+            await aclose_llm_clients()
+
+    init_db()
+    try:
+        report = asyncio.run(run())
+    finally:
+        shutdown_pdf_pool()
+
+    print(
+        f"\n{report.total} PDFs: {report.reviewed} reviewed, {report.cached} from cache, "
+        f"{report.skipped} skipped, {len(report.failures)} failed "
+        f"in {report.elapsed_seconds:.1f}s ({report.papers_per_minute:.1f} papers/min)"
+    )
+    for failure in report.failures:
+        print(f"  FAILED {failure['file']}: {failure['error']['code']} {failure['error']['message']}")
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from backend.app.llm import LLM_MODEL, LLM_TEMPERATURE, PROMPT_VERSION
+from backend.app.models import ReviewCacheORM, ReviewResultORM
+
+logger = logging.getLogger("cspaper.cache")
+
+# 缓存条目有效期（秒）与最大条目数，超出后按最近命中时间淘汰
+REVIEW_CACHE_TTL_SECONDS = int(os.getenv("REVIEW_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+REVIEW_CACHE_MAX_ENTRIES = int(os.getenv("REVIEW_CACHE_MAX_ENTRIES", "10000"))
+# 命中时 last_hit_at 早于这么多秒才写库（连同期间累计的命中次数），热门条目不必每次命中都开写事务
+REVIEW_CACHE_HIT_WRITE_SECONDS = int(os.getenv("REVIEW_CACHE_HIT_WRITE_SECONDS", "60"))
+# 每个进程每写入这么多条缓存执行一次淘汰（含进程内第一次写入），条目数最多超出上限这么多条
+REVIEW_CACHE_EVICT_EVERY = max(1, int(os.getenv("REVIEW_CACHE_EVICT_EVERY", "100")))
+
+_lock = threading.Lock()
+# 尚未写库的命中次数，按缓存键累计
+_pending_hits: Dict[str, int] = {}
+_stores = 0
+
+
+def _utcnow_naive() -> datetime:
+    # SQLite 的 DateTime 列读回来是不带时区的 UTC 时间，比较时保持一致
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def make_cache_key(
+    pdf_hash: str,
+    model: str = LLM_MODEL,
+    temperature: float = LLM_TEMPERATURE,
+    prompt_version: str = PROMPT_VERSION,
+) -> str:
+    """
+    缓存键 = sha256(PDF 内容哈希 | 模型名 | temperature | prompt 版本)。
+    任一项变化都会得到新键，旧结果自然失效。
+    """
+    raw = f"{pdf_hash}|{model}|{temperature!r}|{prompt_version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def lookup_cached_review(db: Session, cache_key: str) -> Optional[ReviewResultORM]:
+    """
+    命中且未过期时返回已有的 ReviewResultORM，并更新命中统计；否则返回 None。
+    命中统计最多每 REVIEW_CACHE_HIT_WRITE_SECONDS 秒写库一次，其间的命中次数先在进程内累计。
+    """
+    entry = db.execute(
+        select(ReviewCacheORM).where(ReviewCacheORM.cache_key == cache_key)
+    ).scalar_one_or_none()
+    if entry is None:
+        return None
+
+    now = _utcnow_naive()
+    if entry.created_at < now - timedelta(seconds=REVIEW_CACHE_TTL_SECONDS):
+        logger.info(f"Review cache expired: key={cache_key[:12]}")
+        db.delete(entry)
+        db.commit()
+        return None
+
+    recorded = entry.hit_count
+    with _lock:
+        hits = _pending_hits.get(cache_key, 0) + 1
+        stale = entry.last_hit_at < now - timedelta(seconds=REVIEW_CACHE_HIT_WRITE_SECONDS)
+        if stale:
+            _pending_hits.pop(cache_key, None)
+        else:
+            _pending_hits[cache_key] = hits
+    if stale:
+        db.execute(
+            update(ReviewCacheORM)
+            .where(ReviewCacheORM.id == entry.id)
+            .values(last_hit_at=now, hit_count=ReviewCacheORM.hit_count + hits)
+        )
+        db.commit()
+    logger.info(f"Review cache hit: key={cache_key[:12]}, hits={recorded + hits}")
+    return entry.review_result
+
+
+def lookup_cached_review_for_submission(db: Session, submission_db_id: int) -> Optional[ReviewResultORM]:
+    """
+    某个 submission 在当前模型配置与 prompt 版本下、未过期的最新审稿结果。
+    近似重复投稿复用结果时使用，复用条件与精确缓存一致。
+    """
+    cutoff = _utcnow_naive() - timedelta(seconds=REVIEW_CACHE_TTL_SECONDS)
+    return db.execute(
+        select(ReviewResultORM)
+        .join(ReviewCacheORM, ReviewCacheORM.review_result_db_id == ReviewResultORM.id)
+        .where(
+            ReviewResultORM.submission_db_id == submission_db_id,
+            ReviewCacheORM.model == LLM_MODEL,
+            ReviewCacheORM.temperature == LLM_TEMPERATURE,
+            ReviewCacheORM.prompt_version == PROMPT_VERSION,
+            ReviewCacheORM.created_at >= cutoff,
+        )
+        .order_by(ReviewResultORM.generated_at.desc())
+        .limit(1)
+    ).scalars().first()
+
+
+def store_cached_review(
+    db: Session,
+    cache_key: str,
+    pdf_hash: str,
+    review_result_db_id: int,
+    model: str = LLM_MODEL,
+) -> None:
+    """
+    写入（或覆盖）缓存条目。不提交事务，由调用方与审稿结果一起提交。
+    model 为实际应答的模型（备用模型应答时与 LLM_MODEL 不同），须与生成 cache_key 时所用的一致。
+    同一 PDF 的并发请求会落到同一个键上，用 upsert 避免唯一约束冲突。
+    每 REVIEW_CACHE_EVICT_EVERY 次写入顺带执行一次 evict_review_cache，不在每次写入时都数一遍条目。
+    """
+    if model != LLM_MODEL:
+        logger.info(f"Review answered by {model} instead of {LLM_MODEL}; cached under {model}: key={cache_key[:12]}")
+    now = _utcnow_naive()
+    stmt = sqlite_insert(ReviewCacheORM).values(
+        cache_key=cache_key,
+        content_hash=pdf_hash,
+        model=model,
+        temperature=LLM_TEMPERATURE,
+        prompt_version=PROMPT_VERSION,
+        review_result_db_id=review_result_db_id,
+        created_at=now,
+        last_hit_at=now,
+        hit_count=0,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ReviewCacheORM.cache_key],
+        set_={
+            "review_result_db_id": stmt.excluded.review_result_db_id,
+            "created_at": stmt.excluded.created_at,
+            "last_hit_at": stmt.excluded.last_hit_at,
+            "hit_count": 0,
+        },
+    )
+    db.execute(stmt)
+
+    global _stores
+    with _lock:
+        _pending_hits.pop(cache_key, None)
+        evict = _stores % REVIEW_CACHE_EVICT_EVERY == 0
+        _stores += 1
+    if evict:
+        evict_review_cache(db)
+
+
+def evict_review_cache(db: Session) -> None:
+    """
+    删除过期条目；条目数超过 REVIEW_CACHE_MAX_ENTRIES 时，按最近命中时间淘汰最旧的。
+    只删除缓存索引，review_results 等历史记录保持不变。
+    """
+    cutoff = _utcnow_naive() - timedelta(seconds=REVIEW_CACHE_TTL_SECONDS)
+    db.execute(delete(ReviewCacheORM).where(ReviewCacheORM.created_at < cutoff))
+
+    total = db.execute(select(func.count(ReviewCacheORM.id))).scalar_one()
+    overflow = total - REVIEW_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = (
+            select(ReviewCacheORM.id)
+            .order_by(ReviewCacheORM.last_hit_at.asc())
+            .limit(overflow)
+        )
+        db.execute(delete(ReviewCacheORM).where(ReviewCacheORM.id.in_(oldest)))
+        logger.info(f"Review cache evicted {overflow} entries (max={REVIEW_CACHE_MAX_ENTRIES})")
@@ -0,0 +1,400 @@
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backend.app.llm import LLMError, acall_deepseek_for_chunk
+
+logger = logging.getLogger("cspaper.llm")
+
+# 超过该估算 token 数的论文走长文档模式（分段审稿后合并）
+LONG_DOC_THRESHOLD_TOKENS = int(os.getenv("LONG_DOC_THRESHOLD_TOKENS", "24000"))
+# 单次请求送入模型的正文 token 总预算，决定长论文的耗时与费用上限
+LONG_DOC_TOKEN_BUDGET = int(os.getenv("LONG_DOC_TOKEN_BUDGET", "32000"))
+# 每个分块的 token 上限
+LONG_DOC_CHUNK_TOKENS = int(os.getenv("LONG_DOC_CHUNK_TOKENS", "8000"))
+
+# 粗略估算：英文文本约 4 个字符 1 个 token
+CHARS_PER_TOKEN = 4
+
+# 被压缩时每节至少保留的 token 数
+MIN_SECTION_TOKENS = 200
+
+# 各类章节的保留优先级，0 表示直接丢弃
+SECTION_PRIORITY = {
+    "front": 0.5,
+    "abstract": 1.0,
+    "introduction": 0.9,
+    "related": 0.4,
+    "method": 1.0,
+    "body": 0.8,
+    "experiments": 1.0,
+    "conclusion": 0.9,
+    "acknowledgments": 0.0,
+    "references": 0.0,
+    "appendix": 0.0,
+}
+
+_SECTION_KEYWORDS = [
+    ("abstract", r"abstract"),
+    ("introduction", r"introduction"),
+    ("related", r"related\s+work|background|preliminaries|prior\s+work"),
+    ("experiments", r"experiment|evaluation|results|ablation"),
+    ("conclusion", r"conclusion|discussion|future\s+work|limitations"),
+    ("acknowledgments", r"acknowledg"),
+    ("references", r"references|bibliography"),
+    ("appendix", r"appendix|appendices|supplementary"),
+    ("method", r"method|approach|model|architecture|framework|algorithm"),
+]
+
+# 标题行：可选编号（"3."、"3.1"、"IV."、"A."）+ 以大写字母开头的短标题
+_HEADING_RE = re.compile(
+    r"^\s*(?P<num>(?:\d+(?:\.\d+)*\.?|[IVX]+\.|[A-H]\.)\s+)?(?P<title>[A-Z][A-Za-z0-9 ,:&/\-]{2,70})\s*$"
+)
+_UNNUMBERED_KINDS = {"abstract", "introduction", "references", "acknowledgments", "appendix"}
+# 目录条目末尾的点引导线与页码（"References 120"、"Appendix A ...... 130"、"Preface xi"）
+_TOC_TAIL_RE = re.compile(r"(?:\s*\.{2,}\s*|\s+)(?:\d{1,4}|[ivxlc]{1,6})\s*$")
+_CONTENTS_RE = re.compile(r"^\s*(?:table\s+of\s+contents|contents|list\s+of\s+(?:figures|tables))\s*$", re.IGNORECASE)
+# 不低于该长度、且不以页码结尾的行视为正文段落，目录块到此结束
+_PROSE_MIN_CHARS = 80
+
+# References 标题至少出现在全文这一比例之后才切换到参考文献 / 附录；
+# 不取更靠后的位置，是因为会议论文的附录常比正文还长
+BACK_MATTER_MIN_POSITION = 1 / 3
+# 参考文献条目的特征：[12] 编号、年份、et al.、出版物名称
+_REFERENCE_MARK_RE = re.compile(
+    r"^\s*\[\d{1,3}\]|\b(?:19|20)\d{2}[a-z]?\b|\bet al\.|\barXiv\b|\bProc(?:eedings)?\b|\bConference\b|\bJournal\b",
+    re.MULTILINE,
+)
+# textnorm 把参考文献列表压缩成的占位行
+_CONDENSED_REFERENCES_RE = re.compile(r"^\[(?:\d+ entries|list) omitted\]$", re.MULTILINE)
+
+
+class NoReviewableTextError(LLMError):
+    """
+    章节裁剪后没有剩下可送审的正文（例如全文只识别出参考文献与附录），
+    与模型调用失败区分开，流水线据此返回 4xx 而不是 502。
+    """
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class Section:
+    title: str
+    kind: str
+    text: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+@dataclass
+class Chunk:
+    sections: List[str] = field(default_factory=list)
+    parts: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.parts)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def _classify(title: str) -> str:
+    lowered = title.lower()
+    for kind, pattern in _SECTION_KEYWORDS:
+        if re.search(pattern, lowered):
+            return kind
+    return "body"
+
+
+def _match_heading(line: str) -> Optional[str]:
+    """
+    判断一行是否为章节标题，返回分类；否则返回 None。
+    编号的顶级/子级标题都算；无编号的只认 Abstract / References 等固定标题，
+    避免把正文短句误判为标题。
+    """
+    m = _HEADING_RE.match(line)
+    if not m or _TOC_TAIL_RE.search(m.group("title")):
+        # 以页码结尾的是目录条目，不是正文里的标题
+        return None
+    kind = _classify(m.group("title"))
+    if m.group("num") is None and (
+        kind not in _UNNUMBERED_KINDS or len(m.group("title").split()) > 3
+    ):
+        return None
+    if m.group("num") is not None and "." in m.group("num").strip().strip("."):
+        # 子节（3.1 等）归入所在的顶级章节，不单独切分
+        return None
+    return kind
+
+
+def _is_prose(line: str) -> bool:
+    stripped = line.strip()
+    return len(stripped) >= _PROSE_MIN_CHARS and not _TOC_TAIL_RE.search(stripped)
+
+
+def _looks_like_references(text: str) -> bool:
+    body = [line for line in text.splitlines()[1:] if line.strip()]
+    if _CONDENSED_REFERENCES_RE.search(text):
+        return True
+    marks = len(_REFERENCE_MARK_RE.findall("\n".join(body)))
+    return marks >= 2 and marks * 5 >= len(body)
+
+
+def _resolve_back_matter(sections: List[Section]) -> None:
+    """
+    只有位于全文后部、内容确实像参考文献列表的 References 才切换到参考文献，
+    其后的章节一律视为附录；其余 References / Appendix 标题按正文处理。
+    """
+    total = sum(len(s.text) for s in sections)
+    seen = 0
+    after_references = False
+    for section in sections:
+        late = seen >= total * BACK_MATTER_MIN_POSITION
+        seen += len(section.text)
+        if after_references:
+            section.kind = "appendix"
+        elif section.kind == "references":
+            if late and _looks_like_references(section.text):
+                after_references = True
+            else:
+                section.kind = "body"
+        elif section.kind == "appendix" and not late:
+            section.kind = "body"
+
+
+def split_sections(full_text: str) -> List[Section]:
+    """
+    按标题行把论文切成章节。第一个标题之前的内容（题目、作者）记为 front。
+    目录块（Contents 之后、正文标题再次出现之前）里的条目不算标题；
+    全文后部的 References 之后出现的章节一律视为附录。
+    """
+    sections: List[Section] = []
+    title, kind, lines = "Front matter", "front", []
+    # 目录块中列出的标题；None 表示不在目录块内
+    listed: Optional[set] = None
+    # 目录块内最后一个不带页码的标题行（在 lines 中的下标与分类），目录因正文段落结束时从它切分
+    candidate: Optional[tuple] = None
+
+    for line in full_text.splitlines():
+        heading_kind = _match_heading(line)
+        if listed is not None:
+            entry = _TOC_TAIL_RE.sub("", line).strip()
+            if heading_kind is not None and entry in listed:
+                # 目录里列过的标题再次出现：正文开始
+                listed = None
+            elif _match_heading(entry) is not None or not _is_prose(line):
+                if _match_heading(entry) is not None:
+                    listed.add(entry)
+                if heading_kind is not None:
+                    candidate = (len(lines), heading_kind)
+                lines.append(line)
+                continue
+            else:
+                listed = None
+                if candidate is not None:
+                    index, candidate_kind = candidate
+                    if lines[:index]:
+                        sections.append(Section(title, kind, "\n".join(lines[:index]).strip()))
+                    title, kind, lines = lines[index].strip(), candidate_kind, lines[index:]
+                lines.append(line)
+                continue
+        elif _CONTENTS_RE.match(line):
+            listed, candidate = set(), None
+            lines.append(line)
+            continue
+
+        if heading_kind is not None:
+            if lines:
+                sections.append(Section(title, kind, "\n".join(lines).strip()))
+            title, kind, lines = line.strip(), heading_kind, [line]
+        else:
+            lines.append(line)
+
+    if lines:
+        sections.append(Section(title, kind, "\n".join(lines).strip()))
+    sections = [s for s in sections if s.text]
+    _resolve_back_matter(sections)
+    return sections
+
+
+def _shrink(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return text[:cut].rstrip() + "\n[...]"
+
+
+def fit_to_budget(sections: List[Section], budget_tokens: int) -> List[Section]:
+    """
+    丢弃参考文献、附录、致谢；仍超出预算时先压缩低优先级章节，
+    再按比例压缩全部章节，保证送入模型的正文不超过 budget_tokens。
+    """
+    kept = [s for s in sections if SECTION_PRIORITY.get(s.kind, 0.8) > 0]
+    total = sum(s.tokens for s in kept)
+    if total <= budget_tokens:
+        return kept
+
+    for section in sorted(kept, key=lambda s: SECTION_PRIORITY.get(s.kind, 0.8)):
+        excess = total - budget_tokens
+        if excess <= 0:
+            break
+        floor = max(MIN_SECTION_TOKENS, section.tokens // 4)
+        target = max(floor, section.tokens - excess)
+        if target < section.tokens:
+            before = section.tokens
+            section.text = _shrink(section.text, target)
+            total -= before - section.tokens
+
+    if total > budget_tokens:
+        ratio = budget_tokens / total
+        for section in kept:
+            section.text = _shrink(section.text, max(1, int(section.tokens * ratio)))
+    return kept
+
+
+def _split_oversized(section: Section, chunk_tokens: int) -> List[str]:
+    pieces: List[str] = []
+    current = ""
+    for para in re.split(r"\n\s*\n|\n", section.text):
+        if current and estimate_tokens(current) + estimate_tokens(para) > chunk_tokens:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n{para}" if current else para
+        while estimate_tokens(current) > chunk_tokens:
+            limit = chunk_tokens * CHARS_PER_TOKEN
+            pieces.append(current[:limit])
+            current = current[limit:]
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+
+def build_chunks(
+    full_text: str,
+    budget_tokens: int = LONG_DOC_TOKEN_BUDGET,
+    chunk_tokens: int = LONG_DOC_CHUNK_TOKENS,
+) -> List[Chunk]:
+    """
+    章节识别 -> 预算裁剪 -> 按章节顺序装箱成不超过 chunk_tokens 的分块。
+    """
+    sections = fit_to_budget(split_sections(full_text), budget_tokens)
+    chunks: List[Chunk] = []
+    current = Chunk()
+
+    for section in sections:
+        for piece in _split_oversized(section, chunk_tokens):
+            if current.parts and current.tokens + estimate_tokens(piece) > chunk_tokens:
+                chunks.append(current)
+                current = Chunk()
+            current.parts.append(piece)
+            if section.title not in current.sections:
+                current.sections.append(section.title)
+
+    if current.parts:
+        chunks.append(current)
+    return chunks
+
+
+def is_long_document(full_text: str) -> bool:
+    return estimate_tokens(full_text) > LONG_DOC_THRESHOLD_TOKENS
+
+
+def merge_chunk_reviews(
+    chunks: List[Chunk], results: List[Optional[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    合并各分块的结果，输出与单次审稿相同的 {"scores", "reviews"} 结构：
+    - 分数：按分块 token 数加权平均
+    - 评语：同一 reviewer 的各段评语按分块顺序拼接，并标注对应章节
+    results 中为 None 的分块（调用失败）被跳过，编号仍按原分块顺序。
+    """
+    weighted: Dict[str, float] = {}
+    weights: Dict[str, float] = {}
+    reviews: Dict[str, List[str]] = {}
+    total = len(chunks)
+
+    for index, (chunk, result) in enumerate(zip(chunks, results), start=1):
+        if result is None:
+            continue
+        weight = float(chunk.tokens)
+        for item in result.get("scores", []):
+            dimension = str(item.get("dimension", "")).strip()
+            try:
+                value = float(item.get("value", 0.0))
+            except (TypeError, ValueError):
+                continue
+            if not dimension:
+                continue
+            weighted[dimension] = weighted.get(dimension, 0.0) + value * weight
+            weights[dimension] = weights.get(dimension, 0.0) + weight
+
+        label = f"[Part {index}/{total}: {', '.join(chunk.sections)}]"
+        for item in result.get("reviews", []):
+            reviewer_id = str(item.get("reviewer_id", "")).strip() or "reviewer"
+            text = str(item.get("text", "")).strip()
+            if text:
+                reviews.setdefault(reviewer_id, []).append(f"{label} {text}")
+
+    return {
+        "scores": [
+            {"dimension": d, "value": round(weighted[d] / weights[d], 2)}
+            for d in weighted
+            if weights[d] > 0
+        ],
+        "reviews": [
+            {"reviewer_id": reviewer_id, "text": "\n\n".join(parts)}
+            for reviewer_id, parts in reviews.items()
+        ],
+    }
+
+
+async def review_long_document(full_text: str) -> Dict[str, Any]:
+    """
+    长文档模式：分块并发审稿（受 LLM_MAX_CONCURRENCY 限制），再合并成一份结果。
+    个别分块失败时用其余分块的结果合并；全部失败才抛出 LLMError。
+    裁剪后没有任何可送审的章节时抛出 NoReviewableTextError。
+    """
+    chunks = build_chunks(full_text)
+    if not chunks:
+        raise NoReviewableTextError(f"No reviewable sections left after trimming: chars={len(full_text)}")
+    logger.info(
+        f"Long-document mode: chars={len(full_text)}, est_tokens={estimate_tokens(full_text)}, "
+        f"chunks={len(chunks)}, sent_tokens={sum(c.tokens for c in chunks)}"
+    )
+
+    outcomes = await asyncio.gather(
+        *[
+            acall_deepseek_for_chunk(chunk.text, i, len(chunks), chunk.sections)
+            for i, chunk in enumerate(chunks, start=1)
+        ],
+        return_exceptions=True,
+    )
+
+    results: List[Optional[Dict[str, Any]]] = []
+    errors: List[str] = []
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            errors.append(str(outcome))
+            results.append(None)
+        else:
+            results.append(outcome)
+
+    if len(errors) == len(chunks):
+        raise LLMError(f"All {len(chunks)} chunk reviews failed: {errors[0]}")
+    if errors:
+        logger.warning(f"Long-document mode: {len(errors)}/{len(chunks)} chunks failed; merging the rest")
+
+    return merge_chunk_reviews(chunks, results)
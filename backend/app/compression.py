@@ -0,0 +1,118 @@
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只协商 gzip
+    brotli = None
+
+# 设为 0 时关闭（例如前面的 nginx 已经负责压缩）
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1") != "0"
+# 小于该字节数的响应不压缩：压缩省下的字节抵不过 CPU 与头部开销
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# 动态内容的常用档位；gzip 9 / br 11 比它们慢得多，体积只小几个百分点
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BR_QUALITY = int(os.getenv("COMPRESSION_BR_QUALITY", "5"))
+# 超过该大小的单个响应片段放到线程池里压缩，不阻塞事件循环
+COMPRESSION_THREAD_MIN_BYTES = 128 * 1024
+
+# 除 Starlette 的默认排除项（图片、压缩包、SSE 等）外，parquet 自带列压缩
+EXCLUDED_CONTENT_TYPES = DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/vnd.apache.parquet",)
+
+# 服务端偏好顺序：q 值相同时选排在前面的
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    按 Accept-Encoding 的 q 值在 SUPPORTED_ENCODINGS 中选择编码，没有可用编码时返回 None（不压缩）。
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int, *, exclude_content_types: Tuple[str, ...]):
+        super().__init__(app, minimum_size, exclude_content_types=exclude_content_types)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= COMPRESSION_THREAD_MIN_BYTES:
+            return await run_in_threadpool(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality, mode=brotli.MODE_TEXT)
+        out = self._compressor.process(body)
+        # 流式响应每个片段都 flush，客户端能立即解出已收到的行
+        return out + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware:
+    """
+    按 Accept-Encoding 协商 br / gzip 压缩响应体（含流式导出），响应头加 Vary: Accept-Encoding。
+    小响应、已编码的响应与 EXCLUDED_CONTENT_TYPES 原样返回。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        br_quality: int = COMPRESSION_BR_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.br_quality = br_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "br":
+            responder = BrotliResponder(
+                self.app, self.minimum_size, self.br_quality, exclude_content_types=EXCLUDED_CONTENT_TYPES
+            )
+        elif encoding == "gzip":
+            responder = GZipResponder(
+                self.app,
+                self.minimum_size,
+                compresslevel=self.gzip_level,
+                thread_minimum_size=COMPRESSION_THREAD_MIN_BYTES,
+                exclude_content_types=EXCLUDED_CONTENT_TYPES,
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size, exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        await responder(scope, receive, send)
@@ -1,23 +1,103 @@
-from sqlalchemy import create_engine
+import os
+import time
+from typing import Optional
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from pathlib import Path
 
+from backend.app.observability import record_db_query
+
 # 数据库文件路径：backend/instance/cspaper.db
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "instance" / "cspaper.db"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+# 可通过环境变量切换到独立数据库（例如压测时不污染 cspaper.db）
+SQLALCHEMY_DATABASE_URL = os.getenv("CSPAPER_DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+# SQLite 连接参数：WAL 让读写互不阻塞；busy_timeout 让并发写入排队等待而不是立即报 "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# WAL 模式下 NORMAL 只在检查点时 fsync，断电最多丢失最近的事务，不会损坏数据库
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},  # SQLite 线程设置
 )
 
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None) -> None:
+    """
+    每个新连接建立时执行；journal_mode=WAL 会持久化到数据库文件，其余是连接级设置。
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # 只计 SQL 执行本身，按语句类型计入 cspaper_db_query_seconds；事务提交时间计入流水线的 persist 阶段
+    record_db_query(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+
+def _on_query_error(context) -> None:
+    # 执行失败的语句不会触发 after_cursor_execute，丢掉它的开始时间
+    conn = context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
+event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+event.listen(engine, "handle_error", _on_query_error)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# 数据库结构版本，记录在 SQLite 的 PRAGMA user_version 里。
+# 新增表、索引、FTS 表或需要回填的汇总表时加 1，已升级的数据库下次启动会重新检查一遍
+SCHEMA_VERSION = 2
+
+
+def _schema_version(conn) -> Optional[int]:
+    if conn.dialect.name != "sqlite":
+        return None
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
 def init_db() -> None:
+    """
+    建表、补建索引、建立全文检索表并回填分数汇总。
+    数据库已是 SCHEMA_VERSION 时只读一次 user_version 就返回，worker 启动不再逐表检查。
+    """
+    with engine.connect() as conn:
+        if _schema_version(conn) == SCHEMA_VERSION:
+            return
+
     from backend.app import models  # 修复：从顶层包路径导入
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    # create_all 只会创建缺失的表；已有表上新增的索引在这里补建（CREATE INDEX IF NOT EXISTS）
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    from backend.app.analytics import ensure_score_stats
+    from backend.app.search import ensure_search_schema
+    with engine.begin() as conn:
+        ensure_search_schema(conn)
+        ensure_score_stats(conn)
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
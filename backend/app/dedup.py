@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import os
+import re
+import struct
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from backend.app.models import SubmissionFingerprintORM, SubmissionLshBucketORM
+
+logger = logging.getLogger("cspaper.dedup")
+
+# MinHash 签名长度；LSH 把签名切成 LSH_BANDS 段，每段 MINHASH_PERMUTATIONS // LSH_BANDS 行。
+# 16 段 × 8 行时，Jaccard 相似度 s 的两篇文档成为候选的概率为 1 - (1 - s^8)^16：
+# s=0.9 时约 1.0，s=0.7 时约 0.47，s=0.5 时约 0.06。
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+# 以连续 SHINGLE_SIZE 个词为一个 shingle
+SHINGLE_SIZE = 5
+
+# 估计相似度不低于该值时视为同一篇论文，直接复用已有审稿结果；大于 1 即关闭复用
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+# 每次查询最多精确比较的候选数（按共享桶数从多到少取）
+NEAR_DUPLICATE_MAX_CANDIDATES = int(os.getenv("NEAR_DUPLICATE_MAX_CANDIDATES", "50"))
+
+# 单次置换 MinHash（one permutation hashing）：shingle 哈希的低 7 位选桶，高 57 位参与取最小值，
+# 一遍扫描得到 128 个分量；空桶按循环方向借用下一个非空桶的值并加上距离偏移（rotation densification）
+_BIN_BITS = MINHASH_PERMUTATIONS.bit_length() - 1
+_VALUE_BITS = 64 - _BIN_BITS
+_EMPTY = 1 << 64
+_SIGNATURE_FORMAT = f"<{MINHASH_PERMUTATIONS}Q"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class Fingerprint:
+    signature: Tuple[int, ...]
+    shingle_count: int
+
+
+@dataclass
+class NearDuplicate:
+    submission_db_id: int
+    similarity: float
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _shingle_hashes(text: str) -> List[int]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return [_hash64(s.encode("utf-8")) for s in shingles]
+
+
+def compute_fingerprint(text: str) -> Optional[Fingerprint]:
+    """
+    计算全文的 MinHash 签名。大小写、标点与换行不影响结果。
+    文本中没有任何词时返回 None。在线程池中调用（一万词约 20ms）。
+    """
+    hashes = _shingle_hashes(text)
+    if not hashes:
+        return None
+
+    mask = MINHASH_PERMUTATIONS - 1
+    bins = [_EMPTY] * MINHASH_PERMUTATIONS
+    for h in hashes:
+        i = h & mask
+        value = h >> _BIN_BITS
+        if value < bins[i]:
+            bins[i] = value
+
+    signature = list(bins)
+    for i, value in enumerate(bins):
+        if value != _EMPTY:
+            continue
+        for distance in range(1, MINHASH_PERMUTATIONS):
+            borrowed = bins[(i + distance) & mask]
+            if borrowed != _EMPTY:
+                signature[i] = borrowed + (distance << _VALUE_BITS)
+                break
+    return Fingerprint(signature=tuple(signature), shingle_count=len(hashes))
+
+
+def estimate_similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    # 两个签名对应位置相等的比例是 Jaccard 相似度的无偏估计
+    return sum(1 for x, y in zip(a, b) if x == y) / MINHASH_PERMUTATIONS
+
+
+def lsh_buckets(signature: Tuple[int, ...]) -> List[int]:
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS : (band + 1) * LSH_ROWS]
+        # 取 63 位，落在 SQLite INTEGER 的有符号范围内
+        buckets.append(_hash64(struct.pack(f"<I{LSH_ROWS}Q", band, *rows)) >> 1)
+    return buckets
+
+
+def pack_signature(signature: Tuple[int, ...]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack_signature(data: bytes) -> Tuple[int, ...]:
+    return struct.unpack(_SIGNATURE_FORMAT, data)
+
+
+def store_fingerprint(db: Session, submission_db_id: int, fingerprint: Fingerprint) -> None:
+    """
+    写入签名与 LSH 分桶。不提交事务，由调用方与 submission 一起提交。
+    """
+    db.execute(
+        insert(SubmissionFingerprintORM).values(
+            submission_db_id=submission_db_id,
+            signature=pack_signature(fingerprint.signature),
+            shingle_count=fingerprint.shingle_count,
+        )
+    )
+    db.execute(
+        insert(SubmissionLshBucketORM),
+        [
+            {"bucket": bucket, "submission_db_id": submission_db_id}
+            for bucket in lsh_buckets(fingerprint.signature)
+        ],
+    )
+
+
+def find_near_duplicates(
+    db: Session,
+    fingerprint: Fingerprint,
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+) -> List[NearDuplicate]:
+    """
+    在已有 submission 中查找近似重复，按相似度从高到低返回不低于 threshold 的结果。
+    只有与本文至少共享一个 LSH 桶的 submission 才会被取出签名比较，
+    查询成本取决于候选数而不是库中的总文档数。
+    """
+    shared = func.count(SubmissionLshBucketORM.id)
+    candidates = db.execute(
+        select(SubmissionLshBucketORM.submission_db_id)
+        .where(SubmissionLshBucketORM.bucket.in_(lsh_buckets(fingerprint.signature)))
+        .group_by(SubmissionLshBucketORM.submission_db_id)
+        .order_by(shared.desc())
+        .limit(NEAR_DUPLICATE_MAX_CANDIDATES)
+    ).scalars().all()
+    if not candidates:
+        return []
+
+    rows = db.execute(
+        select(SubmissionFingerprintORM.submission_db_id, SubmissionFingerprintORM.signature)
+        .where(SubmissionFingerprintORM.submission_db_id.in_(candidates))
+    ).all()
+
+    matches = []
+    for submission_db_id, data in rows:
+        similarity = estimate_similarity(fingerprint.signature, unpack_signature(data))
+        if similarity >= threshold:
+            matches.append(NearDuplicate(submission_db_id=submission_db_id, similarity=similarity))
+    matches.sort(key=lambda m: m.similarity, reverse=True)
+    if matches:
+        logger.info(
+            f"Near-duplicate candidates={len(rows)}, best submission_db_id={matches[0].submission_db_id} "
+            f"similarity={matches[0].similarity:.3f}"
+        )
+    return matches
@@ -0,0 +1,407 @@
+import argparse
+import csv
+import io
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from backend.app.serialization import dumps as dumps_json
+from backend.app.models import (
+    ExportWatermarkORM,
+    ReviewORM,
+    ReviewResultORM,
+    ScoreHistogramORM,
+    ScoreORM,
+    SubmissionORM,
+)
+
+logger = logging.getLogger("cspaper.export")
+
+# 每批从数据库取出并编码的审稿结果数：内存占用只与它有关，与导出总量无关
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet", "arrow")
+# parquet / arrow 需要可选依赖 pyarrow
+COLUMNAR_FORMATS = ("parquet", "arrow")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+FILE_EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+
+BASE_COLUMNS = ("review_result_id", "submission_id", "file_name", "file_size", "submitted_at", "generated_at")
+
+
+class ExportError(Exception):
+    pass
+
+
+def check_format(fmt: str) -> None:
+    """
+    导出前检查格式是否可用；列式格式在这里就报缺少 pyarrow，而不是响应已经开始之后。
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"unknown export format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    if fmt in COLUMNAR_FORMATS:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError(f"format {fmt} requires the pyarrow package")
+
+
+def export_upper_bound(db: Session) -> int:
+    """
+    本次导出的上界（当前最大的 review_results.id），也是下一次增量导出的水位。
+    导出开始后才写入的结果 id 都更大，留给下一次，两次导出之间不重不漏。
+    """
+    return db.execute(select(func.max(ReviewResultORM.id))).scalar() or 0
+
+
+def score_dimensions(db: Session) -> List[str]:
+    """
+    CSV / 列式格式的分数列。直方图只有几十行，比在 scores 上 DISTINCT 便宜得多。
+    """
+    return list(db.execute(select(ScoreHistogramORM.dimension).distinct().order_by(ScoreHistogramORM.dimension)).scalars())
+
+
+def iter_review_rows(db: Session, after: int, until: int, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[dict]]:
+    """
+    按 id 升序逐批产出 after < id <= until 的审稿结果，每条带上投稿信息、分数与审稿意见全文。
+    主查询用 yield_per 流式读取，不会一次性载入全部 ORM 对象；
+    每批的 scores / reviews 各用一条 IN 查询取回，没有逐行懒加载。
+    """
+    stmt = (
+        select(
+            ReviewResultORM.id,
+            ReviewResultORM.review_result_id,
+            ReviewResultORM.submission_id,
+            SubmissionORM.file_name,
+            SubmissionORM.file_size,
+            SubmissionORM.created_at,
+            ReviewResultORM.generated_at,
+        )
+        .join(SubmissionORM, SubmissionORM.id == ReviewResultORM.submission_db_id)
+        .where(ReviewResultORM.id > after, ReviewResultORM.id <= until)
+        .order_by(ReviewResultORM.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in db.execute(stmt).partitions():
+        ids = [row.id for row in partition]
+        scores: Dict[int, Dict[str, float]] = defaultdict(dict)
+        for result_id, dimension, value in db.execute(
+            select(ScoreORM.review_result_id, ScoreORM.dimension, ScoreORM.value)
+            .where(ScoreORM.review_result_id.in_(ids))
+            .order_by(ScoreORM.id)
+        ):
+            scores[result_id][dimension] = value
+        reviews: Dict[int, List[dict]] = defaultdict(list)
+        for result_id, reviewer_id, text in db.execute(
+            select(ReviewORM.review_result_id, ReviewORM.reviewer_id, ReviewORM.text)
+            .where(ReviewORM.review_result_id.in_(ids))
+            .order_by(ReviewORM.id)
+        ):
+            reviews[result_id].append({"reviewer_id": reviewer_id, "text": text})
+
+        yield [
+            {
+                "review_result_id": row.review_result_id,
+                "submission_id": row.submission_id,
+                "file_name": row.file_name,
+                "file_size": row.file_size,
+                "submitted_at": row.created_at,
+                "generated_at": row.generated_at,
+                "scores": scores.get(row.id, {}),
+                "reviews": reviews.get(row.id, []),
+            }
+            for row in partition
+        ]
+
+
+class _NdjsonWriter:
+    """每条审稿结果一行 JSON，分数为 {dimension: value}，审稿意见为数组。"""
+
+    def begin(self) -> bytes:
+        return b""
+
+    def write(self, rows: List[dict]) -> bytes:
+        lines = []
+        for row in rows:
+            row = {**row, "submitted_at": row["submitted_at"].isoformat(), "generated_at": row["generated_at"].isoformat()}
+            lines.append(dumps_json(row))
+        lines.append(b"")
+        return b"\n".join(lines)
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _CsvWriter:
+    """每条审稿结果一行：基本字段、每个维度一列 score_<dimension>，审稿意见以 JSON 数组放在 reviews 列。"""
+
+    def __init__(self, dimensions: Sequence[str]):
+        self.dimensions = list(dimensions)
+
+    def _encode(self, rows: List[Sequence]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def begin(self) -> bytes:
+        return self._encode([[*BASE_COLUMNS, *(f"score_{d}" for d in self.dimensions), "reviews"]])
+
+    def write(self, rows: List[dict]) -> bytes:
+        return self._encode(
+            [
+                [
+                    row["review_result_id"],
+                    row["submission_id"],
+                    row["file_name"],
+                    row["file_size"],
+                    row["submitted_at"].isoformat(),
+                    row["generated_at"].isoformat(),
+                    *(row["scores"].get(d, "") for d in self.dimensions),
+                    dumps_json(row["reviews"]).decode("utf-8"),
+                ]
+                for row in rows
+            ]
+        )
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    pyarrow 写入的目标：累积已编码的字节，由 drain() 取走，整个文件不会留在内存里。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _ArrowWriter:
+    """
+    列式格式：每批写成一个 row group（parquet）或 record batch（arrow IPC 流）。
+    分数为 score_<dimension> 列，审稿意见为 list<struct<reviewer_id, text>>。
+    """
+
+    def __init__(self, dimensions: Sequence[str], fmt: str):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.fmt = fmt
+        self.dimensions = list(dimensions)
+        timestamp = pa.timestamp("us", tz="UTC")
+        self.schema = pa.schema(
+            [
+                ("review_result_id", pa.string()),
+                ("submission_id", pa.string()),
+                ("file_name", pa.string()),
+                ("file_size", pa.int64()),
+                ("submitted_at", timestamp),
+                ("generated_at", timestamp),
+                *((f"score_{d}", pa.float64()) for d in self.dimensions),
+                ("reviews", pa.list_(pa.struct([("reviewer_id", pa.string()), ("text", pa.string())]))),
+            ]
+        )
+        self.sink = _ChunkSink()
+        self.writer = None
+
+    def begin(self) -> bytes:
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+        else:
+            self.writer = self.pa.ipc.new_stream(self.sink, self.schema)
+        return self.sink.drain()
+
+    def write(self, rows: List[dict]) -> bytes:
+        # SQLite 里存的是不带时区的 UTC 时间
+        flat = [
+            {
+                "review_result_id": row["review_result_id"],
+                "submission_id": row["submission_id"],
+                "file_name": row["file_name"],
+                "file_size": row["file_size"],
+                "submitted_at": row["submitted_at"].replace(tzinfo=timezone.utc),
+                "generated_at": row["generated_at"].replace(tzinfo=timezone.utc),
+                **{f"score_{d}": row["scores"].get(d) for d in self.dimensions},
+                "reviews": row["reviews"],
+            }
+            for row in rows
+        ]
+        self.writer.write_table(self.pa.Table.from_pylist(flat, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+def _make_writer(fmt: str, dimensions: Sequence[str]):
+    if fmt == "ndjson":
+        return _NdjsonWriter()
+    if fmt == "csv":
+        return _CsvWriter(dimensions)
+    return _ArrowWriter(dimensions, fmt)
+
+
+def stream_export(
+    db: Session,
+    fmt: str,
+    after: int,
+    until: int,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    stats: Optional[dict] = None,
+) -> Iterator[bytes]:
+    """
+    以 fmt 格式逐批产出 after < id <= until 的审稿结果的编码字节，可以直接写文件或作为 HTTP 响应体。
+    stats 不为 None 时写入导出的条数（rows）。调用方先用 check_format 检查格式。
+    """
+    writer = _make_writer(fmt, score_dimensions(db))
+    rows = 0
+    head = writer.begin()
+    if head:
+        yield head
+    for batch in iter_review_rows(db, after, until, batch_size):
+        rows += len(batch)
+        if stats is not None:
+            stats["rows"] = rows
+        yield writer.write(batch)
+    tail = writer.finish()
+    if tail:
+        yield tail
+
+
+def get_watermark(db: Session, name: str) -> int:
+    value = db.execute(
+        select(ExportWatermarkORM.review_result_db_id).where(ExportWatermarkORM.name == name)
+    ).scalar()
+    return value or 0
+
+
+def save_watermark(db: Session, name: str, review_result_db_id: int, exported_count: int) -> None:
+    """导出完整写出后再推进水位；中途失败时下次从原水位重新导出。"""
+    stmt = sqlite_insert(ExportWatermarkORM).values(
+        name=name,
+        review_result_db_id=review_result_db_id,
+        exported_count=exported_count,
+        updated_at=datetime.now(timezone.utc),
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                "review_result_db_id": stmt.excluded.review_result_db_id,
+                "exported_count": stmt.excluded.exported_count,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    )
+    db.commit()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行：python -m backend.app.export --format csv --output reviews.csv [--watermark nightly | --after N]
+    """
+    parser = argparse.ArgumentParser(description="Export review results, scores and review texts")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--output", default="-", help="file path, or - for stdout")
+    parser.add_argument(
+        "--watermark",
+        default=None,
+        help="named watermark: export only results newer than the last export under this name, then advance it",
+    )
+    parser.add_argument("--after", type=int, default=None, help="export results with review_results.id > AFTER")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.watermark is not None and args.after is not None:
+        parser.error("--watermark and --after are mutually exclusive")
+    if args.format in COLUMNAR_FORMATS and args.output == "-" and sys.stdout.isatty():
+        parser.error(f"refusing to write {args.format} to a terminal; use --output")
+    try:
+        check_format(args.format)
+    except ExportError as e:
+        parser.error(str(e))
+
+    from backend.app.db import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        after = get_watermark(db, args.watermark) if args.watermark is not None else (args.after or 0)
+        until = export_upper_bound(db)
+        stats = {"rows": 0}
+        started = time.perf_counter()
+
+        # 写到临时文件，完整写完再改名：中途失败不会留下截断的导出文件
+        if args.output == "-":
+            out, tmp_path = sys.stdout.buffer, None
+        else:
+            output = Path(args.output)
+            tmp_path = output.with_name(output.name + ".partial")
+            out = open(tmp_path, "wb")
+        try:
+            for chunk in stream_export(db, args.format, after, until, args.batch_size, stats):
+                out.write(chunk)
+            out.flush()
+        except BaseException:
+            if tmp_path is not None:
+                out.close()
+                tmp_path.unlink(missing_ok=True)
+            raise
+        if tmp_path is not None:
+            out.close()
+            os.replace(tmp_path, output)
+
+        # 结束读事务，再写水位
+        db.rollback()
+        if args.watermark is not None:
+            save_watermark(db, args.watermark, until, stats["rows"])
+    finally:
+        db.close()
+
+    print(
+        f"Exported {stats['rows']} review results (id {after} < id <= {until}) as {args.format} "
+        f"in {time.perf_counter() - started:.1f}s"
+        + (f"; watermark {args.watermark!r} is now {until}" if args.watermark is not None else ""),
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import exists, func, select, tuple_
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from backend.app.models import ReviewResultORM, ScoreORM, SubmissionORM
+from backend.app.schemas import (
+    ReviewResultPage,
+    ReviewResultSummary,
+    Score as ScoreSchema,
+    Submission as SubmissionSchema,
+    SubmissionPage,
+)
+
+# 每页条数的默认值与上限
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+def _to_db_time(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite 中存的是不带时区的 UTC 时间；带时区的查询参数先换算成 UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _keyset_before(ts_column, id_column, cursor: Optional[str]):
+    """
+    (ts, id) 倒序排列时，"排在游标之后" 的条件。
+    用行值比较 (ts, id) < (?, ?)：SQLite 能据此在联合索引上直接定位，
+    展开成 OR 的等价写法会退化为索引全扫描。
+    """
+    if cursor is None:
+        return None
+    ts, row_id = decode_cursor(cursor)
+    return tuple_(ts_column, id_column) < tuple_(ts, row_id)
+
+
+def list_submissions(
+    db: Session,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> SubmissionPage:
+    """
+    按上传时间倒序列出 submissions，keyset 分页：
+    next_cursor 为本页最后一条的 (created_at, id)，翻页成本与页码无关。
+    """
+    stmt = select(SubmissionORM)
+    condition = _keyset_before(SubmissionORM.created_at, SubmissionORM.id, cursor)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    if created_from is not None:
+        stmt = stmt.where(SubmissionORM.created_at >= _to_db_time(created_from))
+    if created_to is not None:
+        stmt = stmt.where(SubmissionORM.created_at < _to_db_time(created_to))
+    stmt = stmt.order_by(SubmissionORM.created_at.desc(), SubmissionORM.id.desc()).limit(limit + 1)
+
+    rows = db.execute(stmt).scalars().all()
+    page, more = rows[:limit], len(rows) > limit
+
+    return SubmissionPage(
+        items=[
+            SubmissionSchema(
+                submission_id=s.submission_id,
+                file_name=s.file_name,
+                file_size=s.file_size,
+                created_at=s.created_at.isoformat(),
+                text_preview=s.text_preview,
+            )
+            for s in page
+        ],
+        next_cursor=encode_cursor(page[-1].created_at, page[-1].id) if more else None,
+    )
+
+
+def list_review_results(
+    db: Session,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    generated_from: Optional[datetime] = None,
+    generated_to: Optional[datetime] = None,
+    submission_id: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    dimension: Optional[str] = None,
+) -> ReviewResultPage:
+    """
+    按生成时间倒序列出审稿结果（不含审稿意见全文），keyset 分页。
+    min_score / max_score 指定 dimension 时作用于该维度的分数，否则作用于各维度平均分。
+    一页的 submission 与 scores 各用一条查询批量加载，没有逐行懒加载。
+    """
+    stmt = select(ReviewResultORM)
+    condition = _keyset_before(ReviewResultORM.generated_at, ReviewResultORM.id, cursor)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    if generated_from is not None:
+        stmt = stmt.where(ReviewResultORM.generated_at >= _to_db_time(generated_from))
+    if generated_to is not None:
+        stmt = stmt.where(ReviewResultORM.generated_at < _to_db_time(generated_to))
+    if submission_id is not None:
+        stmt = stmt.where(ReviewResultORM.submission_id == submission_id)
+
+    if min_score is not None or max_score is not None:
+        if dimension is not None:
+            score_filter = [
+                ScoreORM.review_result_id == ReviewResultORM.id,
+                ScoreORM.dimension == dimension,
+            ]
+            if min_score is not None:
+                score_filter.append(ScoreORM.value >= min_score)
+            if max_score is not None:
+                score_filter.append(ScoreORM.value <= max_score)
+            stmt = stmt.where(exists().where(*score_filter))
+        else:
+            mean_score = (
+                select(func.avg(ScoreORM.value))
+                .where(ScoreORM.review_result_id == ReviewResultORM.id)
+                .correlate(ReviewResultORM)
+                .scalar_subquery()
+            )
+            if min_score is not None:
+                stmt = stmt.where(mean_score >= min_score)
+            if max_score is not None:
+                stmt = stmt.where(mean_score <= max_score)
+
+    stmt = (
+        stmt.options(joinedload(ReviewResultORM.submission), selectinload(ReviewResultORM.scores))
+        .order_by(ReviewResultORM.generated_at.desc(), ReviewResultORM.id.desc())
+        .limit(limit + 1)
+    )
+
+    rows = db.execute(stmt).unique().scalars().all()
+    page, more = rows[:limit], len(rows) > limit
+
+    items: List[ReviewResultSummary] = []
+    for rr in page:
+        scores = [ScoreSchema(dimension=s.dimension, value=s.value) for s in rr.scores]
+        items.append(
+            ReviewResultSummary(
+                review_result_id=rr.review_result_id,
+                submission_id=rr.submission_id,
+                file_name=rr.submission.file_name,
+                scores=scores,
+                mean_score=round(sum(s.value for s in scores) / len(scores), 3) if scores else None,
+                generated_at=rr.generated_at.isoformat(),
+            )
+        )
+
+    return ReviewResultPage(
+        items=items,
+        next_cursor=encode_cursor(page[-1].generated_at, page[-1].id) if more else None,
+    )
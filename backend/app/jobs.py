@@ -0,0 +1,351 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from backend.app.admission import PRIORITY_BACKGROUND, admission
+from backend.app.db import SessionLocal
+from backend.app.models import ReviewJobORM
+from backend.app.observability import format_trace, record_error, request_context, trace_logger
+from backend.app.pipeline import (
+    STAGE_EXTRACTING,
+    STAGE_CALLING_MODEL,
+    STAGE_PERSISTING,
+    ReviewPipelineError,
+    run_review_pipeline,
+)
+from backend.app.schemas import ApiError, ReviewJob
+from backend.app.uploads import UPLOAD_DIR, SpooledUpload
+
+logger = logging.getLogger("cspaper.jobs")
+
+STATUS_QUEUED = "queued"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 处理中的状态：进程重启时这些任务会被放回队列
+IN_PROGRESS_STATUSES = (STAGE_EXTRACTING, STAGE_CALLING_MODEL, STAGE_PERSISTING)
+
+# 各阶段对应的大致进度，供前端展示进度条
+STAGE_PROGRESS = {
+    STATUS_QUEUED: 0.0,
+    STAGE_EXTRACTING: 0.1,
+    STAGE_CALLING_MODEL: 0.3,
+    STAGE_PERSISTING: 0.9,
+    STATUS_DONE: 1.0,
+}
+
+# 每个服务进程内的后台 worker 数量；空闲时的轮询间隔（秒），用于发现其他进程提交的任务
+REVIEW_JOB_WORKERS = max(1, int(os.getenv("REVIEW_JOB_WORKERS", "2")))
+REVIEW_JOB_POLL_SECONDS = float(os.getenv("REVIEW_JOB_POLL_SECONDS", "2.0"))
+# 任务被领取的次数上限：进程在处理某篇稿件时反复崩溃，达到上限后标记失败，不再放回队列
+REVIEW_JOB_MAX_ATTEMPTS = max(1, int(os.getenv("REVIEW_JOB_MAX_ATTEMPTS", "3")))
+# worker 池启动时是否把处理中的任务放回队列。多进程部署时 backend.serve 在 fork 前统一放回一次并设为 0，
+# 否则每个 worker（包括崩溃后补 fork 的）启动时都会把兄弟进程正在处理的任务放回队列
+REVIEW_JOB_REQUEUE_ON_STARTUP = os.getenv("REVIEW_JOB_REQUEUE_ON_STARTUP", "1") != "0"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def job_to_schema(job: ReviewJobORM) -> ReviewJob:
+    error = None
+    if job.status == STATUS_FAILED:
+        error = ApiError(
+            code=job.error_code or "JOB_FAILED",
+            message=job.error_message or "",
+            details=json.loads(job.error_details) if job.error_details else None,
+        )
+    return ReviewJob(
+        job_id=job.job_id,
+        status=job.status,
+        progress=job.progress,
+        file_name=job.file_name,
+        file_size=job.file_size,
+        created_at=job.created_at.isoformat(),
+        started_at=_iso(job.started_at),
+        finished_at=_iso(job.finished_at),
+        review_result_id=job.review_result_id,
+        error=error,
+    )
+
+
+def create_job(db: Session, upload: SpooledUpload, refresh: bool = False, commit: bool = True) -> ReviewJobORM:
+    """
+    接管已落盘的上传文件并登记一条 queued 任务。PDF 存在磁盘上而不是内存里，
+    这样服务重启后排队中的任务仍然可以继续处理。
+    commit=False 时只 flush，由调用方与其他记录一起提交（批量提交时整批要么都入队、要么都不入队）。
+    """
+    job_id = f"job_{uuid4().hex[:12]}"
+    upload_path = UPLOAD_DIR / f"{job_id}.pdf"
+    upload.path.replace(upload_path)
+    upload.path = upload_path
+
+    job = ReviewJobORM(
+        job_id=job_id,
+        status=STATUS_QUEUED,
+        progress=0.0,
+        file_name=upload.file_name,
+        file_size=upload.size,
+        upload_path=str(upload_path),
+        refresh=refresh,
+    )
+    db.add(job)
+    if not commit:
+        db.flush()
+        return job
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: str) -> Optional[ReviewJobORM]:
+    return db.execute(
+        select(ReviewJobORM).where(ReviewJobORM.job_id == job_id)
+    ).scalar_one_or_none()
+
+
+def requeue_interrupted_jobs(db: Session) -> int:
+    """
+    启动时把上次进程退出时仍在处理中的任务放回队列；已领取 REVIEW_JOB_MAX_ATTEMPTS 次的任务
+    多半会让进程再次崩溃，改为标记失败（ATTEMPTS_EXHAUSTED）并删除上传文件。
+    只能在没有其他进程处理任务时调用：单进程时由 worker 池启动时调用，多进程时由 backend.serve 在 fork 前调用。
+    """
+    exhausted = db.execute(
+        select(ReviewJobORM.job_id, ReviewJobORM.attempts, ReviewJobORM.upload_path).where(
+            ReviewJobORM.status.in_(IN_PROGRESS_STATUSES),
+            ReviewJobORM.attempts >= REVIEW_JOB_MAX_ATTEMPTS,
+        )
+    ).all()
+    for job_id, attempts, _ in exhausted:
+        db.execute(
+            update(ReviewJobORM)
+            .where(ReviewJobORM.job_id == job_id)
+            .values(
+                status=STATUS_FAILED,
+                error_code="ATTEMPTS_EXHAUSTED",
+                error_message="审稿任务多次中断，已停止重试。",
+                error_details=json.dumps({"attempts": attempts}),
+                finished_at=_utcnow(),
+            )
+        )
+    result = db.execute(
+        update(ReviewJobORM)
+        .where(ReviewJobORM.status.in_(IN_PROGRESS_STATUSES))
+        .values(status=STATUS_QUEUED, progress=0.0)
+    )
+    db.commit()
+    for job_id, attempts, upload_path in exhausted:
+        logger.warning(f"Review job {job_id} interrupted {attempts} times; marked failed")
+        record_error("ATTEMPTS_EXHAUSTED")
+        _remove_upload(upload_path)
+    if result.rowcount:
+        logger.info(f"Requeued {result.rowcount} interrupted review jobs")
+    return result.rowcount
+
+
+def claim_next_job(db: Session) -> Optional[str]:
+    """
+    原子地领取最早的 queued 任务并置为 extracting。
+    条件 UPDATE 保证多个 worker（包括多个进程）不会领到同一个任务。
+    """
+    while True:
+        job_id = db.execute(
+            select(ReviewJobORM.job_id)
+            .where(ReviewJobORM.status == STATUS_QUEUED)
+            .order_by(ReviewJobORM.id.asc())
+            .limit(1)
+        ).scalar_one_or_none()
+        if job_id is None:
+            return None
+
+        result = db.execute(
+            update(ReviewJobORM)
+            .where(ReviewJobORM.job_id == job_id, ReviewJobORM.status == STATUS_QUEUED)
+            .values(
+                status=STAGE_EXTRACTING,
+                progress=STAGE_PROGRESS[STAGE_EXTRACTING],
+                started_at=_utcnow(),
+                attempts=ReviewJobORM.attempts + 1,
+            )
+        )
+        db.commit()
+        if result.rowcount == 1:
+            return job_id
+        # 被其他 worker 抢先领取，继续找下一个
+
+
+def _set_status(job_id: str, status: str, **values) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(ReviewJobORM)
+            .where(ReviewJobORM.job_id == job_id)
+            .values(status=status, progress=STAGE_PROGRESS.get(status, 0.0), **values)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _claim() -> Optional[ReviewJobORM]:
+    db = SessionLocal()
+    try:
+        job_id = claim_next_job(db)
+        if job_id is None:
+            return None
+        job = get_job(db, job_id)
+        db.expunge(job)
+        return job
+    finally:
+        db.close()
+
+
+def _remove_upload(path: str) -> None:
+    try:
+        Path(path).unlink(missing_ok=True)
+    except OSError:
+        logger.warning(f"Failed to remove job upload {path}")
+
+
+async def process_job(job: ReviewJobORM) -> None:
+    # 以 job_id 作为 request_id：任务执行期间的日志与阶段耗时都能按任务号检索
+    with request_context(job.job_id):
+        started = time.perf_counter()
+        await _run_job(job)
+        stages = format_trace()
+        if stages:
+            trace_logger.info(f"job {job.job_id} {(time.perf_counter() - started) * 1000:.0f}ms: {stages}")
+
+
+async def _run_job(job: ReviewJobORM) -> None:
+    async def on_stage(stage: str) -> None:
+        await run_in_threadpool(_set_status, job.job_id, stage)
+
+    try:
+        upload = await run_in_threadpool(SpooledUpload.from_path, Path(job.upload_path), job.file_name)
+        # 与在线请求共用并发名额，排在它们之后；任务不会因此被拒绝，只会晚一点开始
+        async with admission.admit(None, PRIORITY_BACKGROUND):
+            result, _ = await run_review_pipeline(upload, refresh=job.refresh, on_stage=on_stage)
+    except ReviewPipelineError as e:
+        logger.warning(f"Review job {job.job_id} failed: {e.code} {e.message}")
+        record_error(e.code)
+        await run_in_threadpool(
+            _set_status,
+            job.job_id,
+            STATUS_FAILED,
+            error_code=e.code,
+            error_message=e.message,
+            error_details=json.dumps(e.details, ensure_ascii=False) if e.details is not None else None,
+            finished_at=_utcnow(),
+        )
+    except Exception as e:
+        logger.exception(f"Review job {job.job_id} crashed: {type(e).__name__}: {e}")
+        record_error("INTERNAL_ERROR")
+        await run_in_threadpool(
+            _set_status,
+            job.job_id,
+            STATUS_FAILED,
+            error_code="INTERNAL_ERROR",
+            error_message="审稿任务执行异常。",
+            error_details=json.dumps({"reason": str(e)}, ensure_ascii=False),
+            finished_at=_utcnow(),
+        )
+    else:
+        await run_in_threadpool(
+            _set_status,
+            job.job_id,
+            STATUS_DONE,
+            review_result_id=result.review_result.review_result_id,
+            finished_at=_utcnow(),
+        )
+    await run_in_threadpool(_remove_upload, job.upload_path)
+
+
+class JobWorkerPool:
+    """
+    进程内的后台 worker 池，持续从 review_jobs 表中领取并处理任务。
+    新任务提交后调用 notify() 立即唤醒空闲 worker；
+    否则每 REVIEW_JOB_POLL_SECONDS 秒轮询一次。
+    """
+
+    def __init__(
+        self,
+        workers: int = REVIEW_JOB_WORKERS,
+        poll_seconds: float = REVIEW_JOB_POLL_SECONDS,
+        requeue_on_start: bool = REVIEW_JOB_REQUEUE_ON_STARTUP,
+    ):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.requeue_on_start = requeue_on_start
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        if self.requeue_on_start:
+            await run_in_threadpool(self._requeue)
+        self._tasks = [
+            asyncio.create_task(self._run(i), name=f"review-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} review job workers")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def _requeue() -> None:
+        db = SessionLocal()
+        try:
+            requeue_interrupted_jobs(db)
+        finally:
+            db.close()
+
+    async def _run(self, index: int) -> None:
+        while not self._stopping:
+            try:
+                job = await run_in_threadpool(_claim)
+            except Exception:
+                logger.exception(f"Worker {index} failed to claim a job")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info(f"Worker {index} processing {job.job_id}")
+            await process_job(job)
+
+
+job_pool = JobWorkerPool()
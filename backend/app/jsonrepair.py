@@ -0,0 +1,343 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# 审稿结果的固定结构：四个评分维度、四位审稿人
+REVIEW_DIMENSIONS = ("novelty", "technical_quality", "clarity", "significance")
+REVIEWER_IDS = ("reviewer_1", "reviewer_2", "reviewer_3", "reviewer_4")
+
+_OPEN_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_LEADING_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_BARE_KEY_RE = re.compile(r"[A-Za-z_]\w*\s*:")
+_UNICODE_ESCAPE_RE = re.compile(r"u[0-9A-Fa-f]{4}")
+# 字面量之外的裸词（未加引号的键、True / None 等 Python 写法）到此为止
+_TOKEN_END = set(" \t\r\n,:[]{}\"")
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+class _Frame:
+    __slots__ = ("kind", "state", "key_start")
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind  # "{" 或 "["
+        # 对象：key -> colon -> value -> comma；数组：value -> comma
+        self.state = "key" if kind == "{" else "value"
+        self.key_start = 0  # 当前键在输出中的位置，删除悬空的键时使用
+
+
+@dataclass
+class RepairResult:
+    text: str
+    # 输入在顶层对象闭合之前就结束了（多为输出达到 max_tokens 被截断）
+    truncated: bool
+
+
+def _next_significant(s: str, i: int) -> Tuple[int, str]:
+    n = len(s)
+    while i < n and s[i].isspace():
+        i += 1
+    return i, (s[i] if i < n else "")
+
+
+def _closes_string(s: str, i: int, frame: Optional[_Frame], is_key: bool) -> bool:
+    """
+    s[i-1] 是一个未转义的引号：判断它是字符串的结尾，还是模型忘了转义的正文引号。
+    看后面第一个非空白字符是否能接在字符串之后。
+    """
+    j, c = _next_significant(s, i)
+    if c == "":
+        return True
+    if is_key:
+        return c in ":,}"
+    if c == "}" or c == "]":
+        return True
+    if c == ",":
+        # 正文里的 `", ` 很常见：逗号后面还得像是下一个键 / 元素
+        k, after = _next_significant(s, j + 1)
+        if frame is not None and frame.kind == "{":
+            return after in ('"', "}", "") or _BARE_KEY_RE.match(s, k) is not None
+        return after == "" or after in '"{[]-0123456789tfn'
+    if c == '"':
+        # 漏了逗号、换行后紧跟下一个字符串
+        return "\n" in s[i:j]
+    return False
+
+
+def repair_json(content: str) -> RepairResult:
+    """
+    单遍修复模型输出的 JSON：去掉 Markdown 围栏与前后说明文字，修复多余 / 缺失的逗号、
+    字符串里未转义的引号与换行、未加引号的键、Python 风格的 True / None，
+    输出被截断时补齐未闭合的字符串与括号（截断的数字、悬空的键直接丢弃）。
+    只保证结果是合法 JSON，字段是否齐全由 extract_review 检查。
+    """
+    s = content
+    fence = _OPEN_FENCE_RE.search(s)
+    start = s.find("{", fence.end() if fence else 0)
+    if start == -1:
+        start = s.find("{")
+    if start == -1:
+        return RepairResult("", truncated=False)
+
+    out: List[str] = []
+    stack: List[_Frame] = []
+    in_string = False
+    string_is_key = False
+    i, n = start, len(s)
+
+    def before_value() -> bool:
+        # 返回 False 表示当前位置不能放值（例如对象里期望的是键），调用方丢弃该值
+        if not stack:
+            return True
+        top = stack[-1]
+        if top.kind == "[":
+            if top.state == "comma":
+                out.append(",")
+            top.state = "comma"
+            return True
+        if top.state == "colon":
+            out.append(":")
+        elif top.state != "value":
+            return False
+        top.state = "comma"
+        return True
+
+    def start_key() -> None:
+        top = stack[-1]
+        if top.state == "comma":
+            out.append(",")
+        top.key_start = len(out)
+        top.state = "colon"
+
+    def close_frame() -> None:
+        top = stack.pop()
+        if top.kind == "{" and top.state in ("colon", "value"):
+            # 只有键没有值：连同键一起删掉
+            del out[top.key_start:]
+        while out and out[-1] == ",":
+            out.pop()
+        out.append("}" if top.kind == "{" else "]")
+
+    while i < n:
+        ch = s[i]
+        if in_string:
+            if ch == "\\":
+                nxt = s[i + 1] if i + 1 < n else ""
+                if nxt and nxt in '"\\/bfnrt':
+                    out.append(s[i : i + 2])
+                    i += 2
+                elif _UNICODE_ESCAPE_RE.match(s, i + 1):
+                    out.append(s[i : i + 6])
+                    i += 6
+                else:
+                    # 非法转义（Windows 路径、LaTeX 命令等）按字面反斜杠处理；截断在反斜杠上则丢弃
+                    if nxt:
+                        out.append("\\\\")
+                    i += 1
+                continue
+            if ch == '"':
+                if _closes_string(s, i + 1, stack[-1] if stack else None, string_is_key):
+                    in_string = False
+                    out.append('"')
+                else:
+                    out.append('\\"')
+            elif ch < " ":
+                out.append(_CONTROL_ESCAPES.get(ch, f"\\u{ord(ch):04x}"))
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch.isspace():
+            i += 1
+        elif ch == '"':
+            if stack and stack[-1].kind == "{" and stack[-1].state in ("key", "comma"):
+                start_key()
+                string_is_key = True
+            elif before_value():
+                string_is_key = False
+            else:
+                # 无法放置的字符串：跳过到它的结尾
+                end = s.find('"', i + 1)
+                i = n if end == -1 else end + 1
+                continue
+            in_string = True
+            out.append('"')
+            i += 1
+        elif ch in "{[":
+            if stack and not before_value():
+                i += 1
+                continue
+            out.append(ch)
+            stack.append(_Frame(ch))
+            i += 1
+        elif ch in "}]":
+            if stack:
+                close_frame()
+            i += 1
+            if not stack:
+                break
+        elif ch == ",":
+            top = stack[-1] if stack else None
+            if top is not None and top.state == "comma":
+                out.append(",")
+                top.state = "key" if top.kind == "{" else "value"
+            i += 1
+        elif ch == ":":
+            top = stack[-1] if stack else None
+            if top is not None and top.kind == "{" and top.state == "colon":
+                out.append(":")
+                top.state = "value"
+            i += 1
+        else:
+            j = i
+            while j < n and s[j] not in _TOKEN_END:
+                j += 1
+            token = s[i:j] or ch
+            i = max(j, i + 1)
+            top = stack[-1] if stack else None
+            if top is not None and top.kind == "{" and top.state in ("key", "comma"):
+                start_key()
+                out.append(json.dumps(token))
+                continue
+            literal = _LITERALS.get(token)
+            if literal is None:
+                try:
+                    float(token)
+                    literal = token if json.loads(token) is not None else None
+                except ValueError:
+                    literal = None
+            if literal is None and i >= n:
+                continue  # 截断在数字 / 字面量中间，丢弃
+            if before_value():
+                out.append(literal if literal is not None else json.dumps(token))
+
+    truncated = bool(stack) or in_string
+    if in_string:
+        if string_is_key:
+            # 截断在键上：连同这个键一起丢弃
+            stack[-1].state = "colon"
+        else:
+            out.append('"')
+    while stack:
+        close_frame()
+    return RepairResult("".join(out), truncated=truncated)
+
+
+def loads_tolerant(content: str) -> Tuple[Any, bool]:
+    """
+    用 repair_json 修复后解析，返回 (解析结果, 是否被截断)；仍无法解析时抛出 ValueError。
+    """
+    repaired = repair_json(content)
+    if not repaired.text:
+        raise ValueError("no JSON object found")
+    return json.loads(repaired.text), repaired.truncated
+
+
+# ---------- 按审稿结果的结构抽取 ----------
+
+
+@dataclass
+class ExtractedReview:
+    scores: List[Dict[str, Any]] = field(default_factory=list)
+    reviews: List[Dict[str, Any]] = field(default_factory=list)
+    # 缺失或不完整（截断）的部分，作为补全请求的依据
+    missing_dimensions: List[str] = field(default_factory=list)
+    missing_reviewers: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing_dimensions and not self.missing_reviewers
+
+    def to_result(self) -> Dict[str, Any]:
+        return {"scores": self.scores, "reviews": self.reviews}
+
+    def merge(self, other: "ExtractedReview") -> "ExtractedReview":
+        """
+        用补全请求的结果替换缺失 / 不完整的部分，其余内容保持不变。
+        """
+        scores = {s["dimension"]: s for s in self.scores}
+        scores.update({s["dimension"]: s for s in other.scores if s["dimension"] in self.missing_dimensions})
+        reviews = {r["reviewer_id"]: r for r in self.reviews}
+        provided = {r["reviewer_id"]: r for r in other.reviews if r["reviewer_id"] in self.missing_reviewers}
+        reviews.update(provided)
+        return ExtractedReview(
+            scores=[scores[d] for d in REVIEW_DIMENSIONS if d in scores],
+            reviews=[reviews[r] for r in REVIEWER_IDS if r in reviews],
+            missing_dimensions=[d for d in REVIEW_DIMENSIONS if d not in scores],
+            missing_reviewers=[r for r in self.missing_reviewers if r not in provided],
+        )
+
+
+def _dimension_name(name: Any) -> str:
+    return re.sub(r"[\s\-]+", "_", str(name).strip().lower())
+
+
+def _score_value(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        # "4.0"、"4/5"、"3.5 (good)" 取开头的数字
+        m = _LEADING_NUMBER_RE.match(value.strip())
+        return float(m.group()) if m else None
+    return None
+
+
+def _find_section(obj: Any, key: str) -> Any:
+    if not isinstance(obj, dict):
+        return None
+    if key in obj:
+        return obj[key]
+    # 模型有时把结果包一层：{"review": {"scores": ..., "reviews": ...}}
+    for value in obj.values():
+        if isinstance(value, dict) and key in value:
+            return value[key]
+    return None
+
+
+def extract_review(obj: Any, truncated: bool = False) -> ExtractedReview:
+    """
+    从（修复后的）JSON 中按固定结构取出评分与审稿意见，兼容常见的变体：
+    scores 写成 {"novelty": 4.0, ...}、维度名带空格或连字符、分数是字符串，
+    reviews 写成 {"reviewer_1": "..."} 或用 comment / review 作为正文字段。
+    truncated 时最后一条审稿意见可能不完整，记为缺失，交给补全请求重新生成。
+    """
+    result = ExtractedReview()
+
+    raw_scores = _find_section(obj, "scores")
+    if isinstance(raw_scores, dict):
+        raw_scores = [{"dimension": k, "value": v} for k, v in raw_scores.items()]
+    found_scores: Dict[str, float] = {}
+    for item in raw_scores if isinstance(raw_scores, list) else []:
+        if not isinstance(item, dict):
+            continue
+        dimension = _dimension_name(item.get("dimension", item.get("name", "")))
+        value = _score_value(item.get("value", item.get("score")))
+        if dimension in REVIEW_DIMENSIONS and value is not None:
+            found_scores.setdefault(dimension, value)
+
+    raw_reviews = _find_section(obj, "reviews")
+    if isinstance(raw_reviews, dict):
+        raw_reviews = [{"reviewer_id": k, "text": v} for k, v in raw_reviews.items()]
+    found_reviews: Dict[str, str] = {}
+    for index, item in enumerate(raw_reviews if isinstance(raw_reviews, list) else []):
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict):
+            continue
+        reviewer_id = str(item.get("reviewer_id") or item.get("reviewer") or f"reviewer_{index + 1}")
+        text = item.get("text", item.get("comment", item.get("review")))
+        if reviewer_id in REVIEWER_IDS and isinstance(text, str) and text.strip():
+            found_reviews.setdefault(reviewer_id, text)
+
+    result.scores = [{"dimension": d, "value": found_scores[d]} for d in REVIEW_DIMENSIONS if d in found_scores]
+    result.reviews = [{"reviewer_id": r, "text": found_reviews[r]} for r in REVIEWER_IDS if r in found_reviews]
+    result.missing_dimensions = [d for d in REVIEW_DIMENSIONS if d not in found_scores]
+    result.missing_reviewers = [r for r in REVIEWER_IDS if r not in found_reviews]
+    if truncated and result.reviews:
+        last = result.reviews[-1]["reviewer_id"]
+        result.missing_reviewers = sorted(result.missing_reviewers + [last])
+    return result
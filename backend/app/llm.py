@@ -1,12 +1,32 @@
 import os
 import json
-from typing import Dict, Any
-from openai import OpenAI
+import asyncio
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
 import logging
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 import re
 
+# LLMError / CircuitOpenError 定义在 providers 中，其他模块仍从这里导入
+from backend.app.providers import (
+    LLM_PROVIDERS,
+    CircuitOpenError,
+    LLMError,
+    get_router,
+    provider_model,
+    track_answering_models,
+)
+from backend.app.jsonrepair import ExtractedReview, REVIEW_DIMENSIONS, REVIEWER_IDS, extract_review, loads_tolerant
+from backend.app.observability import (
+    STAGE_LLM_FIX,
+    STAGE_LLM_PARSE,
+    STAGE_LLM_REQUEST,
+    RequestIdFilter,
+    record_json_outcome,
+    span,
+)
+from backend.app.textnorm import TEXT_NORMALIZE
+
 logger = logging.getLogger("cspaper.llm")
 logger.setLevel(logging.INFO)
 if not logger.handlers:
@@ -16,11 +36,48 @@ if not logger.handlers:
         log_path, maxBytes=1_000_000, backupCount=3, encoding="utf-8"
     )
     formatter = logging.Formatter(
-        "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+        "%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s"
     )
     handler.setFormatter(formatter)
+    # 过滤器挂在 handler 上，子 logger 传播上来的记录同样带上 request_id
+    handler.addFilter(RequestIdFilter())
     logger.addHandler(handler)
 
+# 主服务的模型名，参与审稿缓存键；通过 LLM_PROVIDERS / DEEPSEEK_MODEL 等配置
+LLM_MODEL = provider_model(LLM_PROVIDERS[0]) if LLM_PROVIDERS else "deepseek-chat"
+LLM_TEMPERATURE = 0.1
+
+
+def answered_model(models: Set[str]) -> str:
+    """
+    Model name to record a review under, given the models that answered its
+    requests (track_answering_models). LLM_MODEL when the primary answered
+    everything; otherwise the answering models joined with "+", so a failover
+    or hedged answer is never cached or reused as the primary model's.
+    """
+    if not models or models == {LLM_MODEL}:
+        return LLM_MODEL
+    return "+".join(sorted(models))
+
+# build_review_prompt 的版本号：修改 prompt 内容时必须递增，审稿缓存以此区分新旧结果
+# v2：正文先经 textnorm 规整再送入模型；关闭规整（TEXT_NORMALIZE=0）时带 -raw 后缀
+PROMPT_VERSION = "v2" if TEXT_NORMALIZE else "v2-raw"
+
+# 审稿人并行模式：每位审稿人一个请求、评分一个请求，并发执行（见 areview_fanout_events）。
+# 总耗时约等于生成一条审稿意见的时间，而不是一次生成全部四条；输入 token 约为 5 倍，
+# 但各请求以相同的论文正文开头，DeepSeek / OpenAI 的自动前缀缓存会复用这部分
+REVIEW_FANOUT = os.getenv("REVIEW_FANOUT", "0") == "1"
+if REVIEW_FANOUT:
+    PROMPT_VERSION += "-fanout"
+
+# 审稿 JSON 本地修复后仍缺评分 / 审稿意见时，是否在原对话后追加一轮只要缺失部分的补全请求
+LLM_JSON_FIX = os.getenv("LLM_JSON_FIX", "1") != "0"
+
+# 同时在途的模型请求上限（每个 worker 进程 / 事件循环）；审稿人并行模式下一次审稿的全部请求只占一个名额
+LLM_MAX_CONCURRENCY = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "4")))
+
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
 def sanitize_llm_json(content: str) -> str:
     """
     Normalize LLM output to a clean JSON string:
@@ -51,8 +108,104 @@ def sanitize_llm_json(content: str) -> str:
 
     return s
 
-class LLMError(Exception):
-    pass
+# 流式输出中需要逐项抽取的数组字段
+STREAMED_ARRAY_KEYS = {"scores": "score", "reviews": "review"}
+
+_KEY_BEFORE_ARRAY_RE = re.compile(r'"(\w+)"\s*:\s*$')
+# 识别字段名时回看的字符数
+_KEY_TAIL_CHARS = 256
+
+
+class IncrementalReviewParser:
+    """
+    Incremental counterpart of sanitize_llm_json for streamed completions.
+
+    Feed content deltas as they arrive; every object inside the "scores" or
+    "reviews" arrays is returned as soon as its closing brace is seen, e.g.
+    ("score", {"dimension": "novelty", "value": 4.0}). Text outside the JSON
+    (Markdown fences, "JSON:" prefixes) is skipped because only braces and
+    brackets outside string literals drive the state machine.
+    Call finish() at the end to parse the complete document.
+    """
+
+    def __init__(self) -> None:
+        # 原始片段只追加到列表，content / finish() 时拼接一次；逐片段 += 会让长输出的耗时平方增长
+        self._chunks: List[str] = []
+        # 上文末尾的一小段，供识别 "[" 前面的字段名
+        self._tail = ""
+        self._in_string = False
+        self._escape = False
+        # 每层为 ("{", None) 或 ("[", 数组字段名)
+        self._stack: List[Tuple[str, Optional[str]]] = []
+        # 正在累积的数组元素：之前片段里的部分，以及在当前片段中的起点
+        self._item_parts: List[str] = []
+        self._item_start: Optional[int] = None
+        self._item_kind: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        self._chunks.append(chunk)
+        events: List[Tuple[str, Dict[str, Any]]] = []
+
+        # 只扫描新片段
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                # 只在 JSON 结构内部识别字符串，围栏外的引号忽略
+                if self._stack:
+                    self._in_string = True
+            elif ch == "[":
+                before = self._tail + chunk[max(0, i - _KEY_TAIL_CHARS) : i]
+                m = _KEY_BEFORE_ARRAY_RE.search(before)
+                self._stack.append(("[", m.group(1) if m else None))
+            elif ch == "{":
+                parent = self._stack[-1] if self._stack else None
+                if (
+                    parent is not None
+                    and parent[0] == "["
+                    and parent[1] in STREAMED_ARRAY_KEYS
+                    and len(self._stack) == 2
+                ):
+                    self._item_parts = []
+                    self._item_start = i
+                    self._item_kind = STREAMED_ARRAY_KEYS[parent[1]]
+                self._stack.append(("{", None))
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if ch == "}" and self._item_start is not None and len(self._stack) == 2:
+                    raw = "".join(self._item_parts) + chunk[self._item_start : i + 1]
+                    try:
+                        events.append((self._item_kind, json.loads(raw)))
+                    except json.JSONDecodeError:
+                        logger.info(f"Stream: skipped malformed {self._item_kind} item: {raw[:200]}")
+                    self._item_parts = []
+                    self._item_start = None
+                    self._item_kind = None
+
+        if self._item_start is not None:
+            # 元素跨片段：保存本片段中的部分，下一片段从头接上
+            self._item_parts.append(chunk[self._item_start :])
+            self._item_start = 0
+        self._tail = (self._tail + chunk[-_KEY_TAIL_CHARS:])[-_KEY_TAIL_CHARS:]
+        return events
+
+    @property
+    def content(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def finish(self) -> Dict[str, Any]:
+        return parse_review_json(self.content)
 
 
 def build_review_prompt(paper_text: str) -> str:
@@ -97,64 +250,482 @@ Return JSON with EXACT keys:
     return prompt
 
 
-def call_deepseek_for_review(paper_text: str) -> Dict[str, Any]:
+def build_chunk_review_prompt(chunk_text: str, part: int, total: int, sections: List[str]) -> str:
     """
-    Call DeepSeek via the official OpenAI-compatible client.
-    Expects the model to return a JSON string containing:
-    {
-      "scores": [...],
-      "reviews": [...]
-    }
+    Prompt for one chunk of a long paper (map step of the long-document mode).
+    Same JSON contract as build_review_prompt so chunk results can be merged.
     """
-    api_key = os.getenv("DEEPSEEK_API_KEY")
-    if not api_key:
-        logger.error("DEEPSEEK_API_KEY not set")
-        raise LLMError("DEEPSEEK_API_KEY not set")
+    section_list = ", ".join(sections) if sections else "unknown"
+    prompt = f"""
+You are an experienced reviewer for top-tier computer science conferences.
+
+The paper is too long to review at once. Below is part {part} of {total}, covering these sections: {section_list}.
+Review ONLY what this part shows; do not speculate about sections you cannot see.
+Requirements:
+1. Provide four scores (0.0 to 5.0, floating point) for dimensions:
+   - novelty
+   - technical_quality
+   - clarity
+   - significance
+2. Provide four review comments, labeled reviewer_1 to reviewer_4, each focusing on different aspects.
+   Keep each comment under 150 words.
+3. Return ONLY valid JSON. No extra text, no comments, no Markdown.
 
-    client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+Paper content (part {part} of {total}):
+"""
+    prompt += "\n" + chunk_text + "\n\n"
+    prompt += """
+Return JSON with EXACT keys:
 
-    messages = [
+{
+  "scores": [
+    { "dimension": "novelty", "value": 4.0 },
+    { "dimension": "technical_quality", "value": 3.5 },
+    { "dimension": "clarity", "value": 4.0 },
+    { "dimension": "significance", "value": 3.5 }
+  ],
+  "reviews": [
+    { "reviewer_id": "reviewer_1", "text": "..." },
+    { "reviewer_id": "reviewer_2", "text": "..." },
+    { "reviewer_id": "reviewer_3", "text": "..." },
+    { "reviewer_id": "reviewer_4", "text": "..." }
+  ]
+}
+"""
+    return prompt
+
+
+# 审稿人并行模式下各审稿人的关注点，顺序即结果中 reviews 的顺序
+REVIEWER_PERSONAS = [
+    ("reviewer_1", "novelty and originality: what is new compared with prior and related work"),
+    ("reviewer_2", "technical quality: correctness of the method, soundness of proofs, experimental design and baselines"),
+    ("reviewer_3", "clarity: writing, organization, figures and whether the work could be reproduced"),
+    ("reviewer_4", "significance: expected impact, limitations and who would build on this work"),
+]
+
+_REVIEWER_IDS = [reviewer_id for reviewer_id, _ in REVIEWER_PERSONAS]
+
+
+def _build_paper_prefix(paper_text: str) -> str:
+    """
+    Leading part shared by every fan-out request. Keep it byte-identical
+    across requests (no per-reviewer text before the paper) so providers
+    with automatic prefix caching only bill the paper once at full price.
+    """
+    return (
+        "You are an experienced reviewer for top-tier computer science conferences.\n\n"
+        "Paper content (may be long):\n\n" + paper_text + "\n\n"
+    )
+
+
+def build_persona_prompt(paper_text: str, reviewer_id: str, focus: str) -> str:
+    """
+    Fan-out prompt for a single reviewer comment.
+    """
+    return _build_paper_prefix(paper_text) + f"""
+Task: write the review comment of {reviewer_id}. Focus on {focus}.
+Be specific and refer to the paper's content. Keep the comment under 300 words.
+Return ONLY valid JSON. No extra text, no comments, no Markdown.
+
+{{ "reviewer_id": "{reviewer_id}", "text": "..." }}
+"""
+
+
+def build_scores_prompt(paper_text: str) -> str:
+    """
+    Fan-out prompt for the four scores only.
+    """
+    return _build_paper_prefix(paper_text) + """
+Task: score the paper from 0.0 to 5.0 (floating point) on novelty, technical_quality, clarity and significance.
+Return ONLY valid JSON. No extra text, no comments, no Markdown.
+
+{
+  "scores": [
+    { "dimension": "novelty", "value": 4.0 },
+    { "dimension": "technical_quality", "value": 3.5 },
+    { "dimension": "clarity", "value": 4.0 },
+    { "dimension": "significance", "value": 3.5 }
+  ]
+}
+"""
+
+
+def _build_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
         {
             "role": "system",
             "content": "You are an expert CS conference reviewer. Respond ONLY with valid JSON."
         },
         {
             "role": "user",
-            "content": build_review_prompt(paper_text)
+            "content": prompt
         },
     ]
 
-    # 调用前记录基本信息（模型与提示长度）
-    logger.info(f"Calling DeepSeek model=deepseek-chat, prompt_chars={len(paper_text)}")
 
-    try:
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=messages,
-            temperature=0.1,
-            stream=False,
-        )
-    except Exception as e:
-        logger.exception(f"DeepSeek API request failed: {type(e).__name__}: {e}")
-        raise LLMError(f"DeepSeek API request failed: {e}")
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """
+    Lazily create the semaphore inside the running event loop so the
+    module can be imported before uvicorn starts its loop.
+    """
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _llm_semaphore
 
-    try:
-        content = response.choices[0].message.content
-    except Exception as e:
-        logger.exception(f"Unexpected response format: {type(e).__name__}: {e}; raw_response={response}")
-        raise LLMError(f"Unexpected DeepSeek response format: {e}; raw={response}")
 
-    # 清洗内容后再解析 JSON
+class ReviewJSONError(LLMError):
+    """
+    The model output could not be turned into a complete review even after
+    local repair. Carries the raw content and whatever could be extracted,
+    so a follow-up request only has to ask for the missing parts.
+    """
+
+    def __init__(self, message: str, content: str, partial: ExtractedReview) -> None:
+        super().__init__(message)
+        self.content = content
+        self.partial = partial
+
+
+def _parse_json_object(content: str) -> Dict[str, Any]:
+    # 清洗内容后再解析 JSON；失败时用 jsonrepair 修复（多余逗号、未转义引号、截断等）
     sanitized = sanitize_llm_json(content)
 
     try:
         parsed = json.loads(sanitized)
     except json.JSONDecodeError as e:
-        logger.exception(f"JSON parse failed after sanitize: {e}; content_head={sanitized[:500]}")
-        raise LLMError(f"Failed to parse LLM JSON content: {e}; content={sanitized[:200]}")
+        try:
+            parsed, _ = loads_tolerant(content)
+        except ValueError:
+            logger.exception(f"JSON parse failed after sanitize and repair: {e}; content_head={sanitized[:500]}")
+            raise LLMError(f"Failed to parse LLM JSON content: {e}; content={sanitized[:200]}")
+        logger.info(f"Repaired malformed LLM JSON ({e})")
+
+    if not isinstance(parsed, dict):
+        raise LLMError(f"LLM JSON is not an object: {sanitized[:200]}")
+    return parsed
+
+
+def parse_review_json(content: str) -> Dict[str, Any]:
+    """
+    Strict parse first; if that fails or the keys are missing, repair the
+    JSON locally and extract scores / reviews by schema. Raises
+    ReviewJSONError when parts are still missing afterwards.
+    """
+    with span(STAGE_LLM_PARSE):
+        try:
+            parsed = json.loads(sanitize_llm_json(content))
+        except json.JSONDecodeError as e:
+            parsed, reason = None, f"invalid JSON: {e}"
+        else:
+            reason = "missing keys" if isinstance(parsed, dict) else "not a JSON object"
+        if isinstance(parsed, dict) and "scores" in parsed and "reviews" in parsed:
+            record_json_outcome("strict")
+            return parsed
+
+        try:
+            repaired, truncated = loads_tolerant(content)
+        except ValueError as e:
+            extracted = ExtractedReview(
+                missing_dimensions=list(REVIEW_DIMENSIONS), missing_reviewers=list(REVIEWER_IDS)
+            )
+            reason = f"{reason}; repair failed: {e}"
+        else:
+            extracted = extract_review(repaired, truncated)
+            if truncated:
+                reason = f"{reason}; output truncated"
+
+    if extracted.complete:
+        logger.info(f"Repaired LLM JSON locally ({reason})")
+        record_json_outcome("repaired")
+        return extracted.to_result()
+
+    logger.warning(
+        f"LLM JSON incomplete ({reason}): missing scores={extracted.missing_dimensions}, "
+        f"reviews={extracted.missing_reviewers}; content_head={content[:300]}"
+    )
+    raise ReviewJSONError(
+        f"LLM JSON incomplete ({reason}): missing scores={extracted.missing_dimensions}, "
+        f"reviews={extracted.missing_reviewers}; content={content[:200]}",
+        content,
+        extracted,
+    )
+
+
+def build_fix_prompt(partial: ExtractedReview) -> str:
+    """
+    Follow-up turn after a malformed or truncated review. It is appended to
+    the original conversation, so the paper text is a prefix the provider
+    has just cached, and the model only generates the missing parts.
+    """
+    missing = []
+    if partial.missing_dimensions:
+        missing.append("- scores for: " + ", ".join(partial.missing_dimensions))
+    if partial.missing_reviewers:
+        missing.append("- the complete review comments of: " + ", ".join(partial.missing_reviewers))
+    return (
+        "Your previous reply could not be used completely: the JSON was malformed or cut off.\n"
+        "Do NOT repeat the parts that were fine. Return ONLY valid JSON containing just these parts:\n"
+        + "\n".join(missing)
+        + """
+
+Use the same format (include only the requested entries):
+
+{
+  "scores": [ { "dimension": "...", "value": 3.5 } ],
+  "reviews": [ { "reviewer_id": "...", "text": "..." } ]
+}
+"""
+    )
 
-    if "scores" not in parsed or "reviews" not in parsed:
-        logger.error(f"LLM JSON missing keys: keys={list(parsed.keys())}")
+
+def _fix_messages(messages: List[Dict[str, str]], error: ReviewJSONError) -> List[Dict[str, str]]:
+    return messages + [
+        {"role": "assistant", "content": error.content},
+        {"role": "user", "content": build_fix_prompt(error.partial)},
+    ]
+
+
+def _merge_fix(error: ReviewJSONError, content: Optional[str]) -> Dict[str, Any]:
+    """
+    Merge the follow-up answer into what was already extracted. A review
+    with at least one score and one comment is still returned (the pipeline
+    stores whatever dimensions / reviewers it has); otherwise raise.
+    """
+    merged = error.partial
+    if content is not None:
+        try:
+            fixed, truncated = loads_tolerant(content)
+        except ValueError as e:
+            logger.warning(f"JSON fix-up reply unusable: {e}; content_head={content[:300]}")
+        else:
+            merged = merged.merge(extract_review(fixed, truncated))
+
+    if merged.complete:
+        logger.info("Review JSON completed by fix-up request")
+        record_json_outcome("fixed")
+        return merged.to_result()
+    if merged.scores and merged.reviews:
+        logger.warning(
+            f"Using partial review: missing scores={merged.missing_dimensions}, reviews={merged.missing_reviewers}"
+        )
+        record_json_outcome("partial")
+        return merged.to_result()
+    record_json_outcome("failed")
+    raise error
+
+
+async def _aparse_review_with_fix(messages: List[Dict[str, str]], content: str) -> Dict[str, Any]:
+    try:
+        return parse_review_json(content)
+    except ReviewJSONError as e:
+        if not LLM_JSON_FIX:
+            return _merge_fix(e, None)
+        error = e
+
+    router = get_router()
+    fixed: Optional[str] = None
+    try:
+        async with _get_llm_semaphore():
+            logger.info(
+                f"Requesting JSON fix-up: scores={error.partial.missing_dimensions}, "
+                f"reviews={error.partial.missing_reviewers}"
+            )
+            with span(STAGE_LLM_FIX):
+                fixed = await router.complete(_fix_messages(messages, error), LLM_TEMPERATURE)
+    except LLMError as e:
+        logger.warning(f"JSON fix-up request failed: {e}")
+    return _merge_fix(error, fixed)
+
+
+def call_deepseek_for_review(paper_text: str) -> Dict[str, Any]:
+    """
+    Blocking review call through the configured providers (DeepSeek by
+    default, see LLM_PROVIDERS). Expects the model to return a JSON string
+    containing:
+    {
+      "scores": [...],
+      "reviews": [...]
+    }
+    """
+    router = get_router()
+
+    # 调用前记录基本信息（模型与提示长度）
+    logger.info(f"Calling LLM model={router.primary.model}, prompt_chars={len(paper_text)}")
+
+    messages = _build_messages(build_review_prompt(paper_text))
+    with span(STAGE_LLM_REQUEST):
+        content = router.complete_sync(messages, LLM_TEMPERATURE)
+    try:
+        return parse_review_json(content)
+    except ReviewJSONError as e:
+        fixed = None
+        if LLM_JSON_FIX:
+            try:
+                with span(STAGE_LLM_FIX):
+                    fixed = router.complete_sync(_fix_messages(messages, e), LLM_TEMPERATURE)
+            except LLMError as fix_error:
+                logger.warning(f"JSON fix-up request failed: {fix_error}")
+        return _merge_fix(e, fixed)
+
+
+async def _acomplete_review_json(prompt: str, prompt_chars: int) -> Dict[str, Any]:
+    router = get_router()
+    messages = _build_messages(prompt)
+
+    async with _get_llm_semaphore():
+        logger.info(f"Calling LLM model={router.primary.model}, routing={router.policy}, prompt_chars={prompt_chars}")
+        with span(STAGE_LLM_REQUEST):
+            content = await router.complete(messages, LLM_TEMPERATURE)
+
+    return await _aparse_review_with_fix(messages, content)
+
+
+async def acall_deepseek_for_review(paper_text: str) -> Dict[str, Any]:
+    """
+    Async variant of call_deepseek_for_review for use inside request handlers.
+    At most LLM_MAX_CONCURRENCY calls are in flight at once; further callers
+    wait on the semaphore without blocking the event loop.
+    With REVIEW_FANOUT=1 the review is produced by acall_review_fanout.
+    """
+    if REVIEW_FANOUT:
+        return await acall_review_fanout(paper_text)
+    return await _acomplete_review_json(build_review_prompt(paper_text), len(paper_text))
+
+
+async def _acomplete_fanout_part(prompt: str, label: str) -> Dict[str, Any]:
+    # 并发名额由 areview_fanout_events 统一持有，这里不再单独申请
+    router = get_router()
+
+    logger.info(f"Calling LLM model={router.primary.model}, fanout={label}, prompt_chars={len(prompt)}")
+    with span(STAGE_LLM_REQUEST):
+        content = await router.complete(_build_messages(prompt), LLM_TEMPERATURE)
+
+    with span(STAGE_LLM_PARSE):
+        return _parse_json_object(content)
+
+
+async def _acall_persona(paper_text: str, reviewer_id: str, focus: str) -> Dict[str, Any]:
+    parsed = await _acomplete_fanout_part(build_persona_prompt(paper_text, reviewer_id, focus), reviewer_id)
+    text = parsed.get("text")
+    if not isinstance(text, str) and isinstance(parsed.get("reviews"), list):
+        # 模型没按单条格式返回而是给了完整审稿结果：取对应审稿人的那一条
+        text = next(
+            (r.get("text") for r in parsed["reviews"] if isinstance(r, dict) and r.get("reviewer_id") == reviewer_id),
+            None,
+        )
+    if not isinstance(text, str) or not text.strip():
+        raise LLMError(f"LLM JSON for {reviewer_id} has no review text: keys={list(parsed.keys())}")
+    return {"reviewer_id": reviewer_id, "text": text}
+
+
+async def _acall_scores(paper_text: str) -> List[Dict[str, Any]]:
+    parsed = await _acomplete_fanout_part(build_scores_prompt(paper_text), "scores")
+    scores = parsed.get("scores")
+    if not isinstance(scores, list):
         raise LLMError(f"LLM JSON missing keys: {parsed.keys()}")
+    return scores
+
+
+async def areview_fanout_events(paper_text: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Reviewer-parallel review: one request per reviewer persona plus one for
+    the scores, all running concurrently. The whole fan-out holds a single
+    slot of the LLM_MAX_CONCURRENCY semaphore, so the limit still counts
+    reviews in flight and one review never waits on its own parts.
+    Yields ("score", item) / ("review", item)
+    in completion order, the same events IncrementalReviewParser produces.
+
+    A failed persona is logged and left out of the result; a failed scores
+    request, or every persona failing, raises LLMError. Remaining requests
+    are cancelled when the consumer stops early or an error is raised.
+    """
+    async with _get_llm_semaphore():
+        async for event in _afanout_events(paper_text):
+            yield event
 
-    return parsed
\ No newline at end of file
+
+async def _afanout_events(paper_text: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    tasks: Dict[asyncio.Task, str] = {asyncio.create_task(_acall_scores(paper_text)): "scores"}
+    for reviewer_id, focus in REVIEWER_PERSONAS:
+        tasks[asyncio.create_task(_acall_persona(paper_text, reviewer_id, focus))] = reviewer_id
+
+    pending = set(tasks)
+    failed: List[str] = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                label = tasks[task]
+                try:
+                    result = task.result()
+                except LLMError as e:
+                    if label == "scores":
+                        raise
+                    logger.warning(f"Fan-out {label} failed, leaving it out of the review: {e}")
+                    failed.append(label)
+                    continue
+                if label == "scores":
+                    for item in result:
+                        yield "score", item
+                else:
+                    yield "review", result
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if len(failed) == len(REVIEWER_PERSONAS):
+        raise LLMError(f"All {len(failed)} reviewer requests failed")
+
+
+def sort_reviews(reviews: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # 并行模式下审稿意见按完成顺序到达，写库前恢复 reviewer_1..reviewer_4 的顺序
+    order = {reviewer_id: i for i, reviewer_id in enumerate(_REVIEWER_IDS)}
+    return sorted(reviews, key=lambda r: order.get(r.get("reviewer_id"), len(order)))
+
+
+async def acall_review_fanout(paper_text: str) -> Dict[str, Any]:
+    """
+    Collect areview_fanout_events into the usual {"scores", "reviews"} dict.
+    """
+    result: Dict[str, List[Dict[str, Any]]] = {"scores": [], "reviews": []}
+    async for kind, item in areview_fanout_events(paper_text):
+        result["scores" if kind == "score" else "reviews"].append(item)
+    result["reviews"] = sort_reviews(result["reviews"])
+    return result
+
+
+async def acall_deepseek_for_chunk(
+    chunk_text: str, part: int, total: int, sections: List[str]
+) -> Dict[str, Any]:
+    """
+    Review one chunk of a long paper; shares the concurrency limit with
+    whole-paper calls.
+    """
+    prompt = build_chunk_review_prompt(chunk_text, part, total, sections)
+    return await _acomplete_review_json(prompt, len(chunk_text))
+
+
+async def astream_deepseek_review(paper_text: str) -> AsyncIterator[str]:
+    """
+    Streaming variant of acall_deepseek_for_review: yields content deltas as
+    the model produces them. Pair with IncrementalReviewParser to pick out
+    completed scores and reviews early. Holds a concurrency slot until the
+    stream is fully consumed or closed.
+    """
+    router = get_router()
+
+    async with _get_llm_semaphore():
+        logger.info(f"Streaming LLM model={router.primary.model}, prompt_chars={len(paper_text)}")
+        # 包含调用方处理每个片段的时间；流被提前关闭时同样计时
+        with span(STAGE_LLM_REQUEST):
+            async for delta in router.stream(_build_messages(build_review_prompt(paper_text)), LLM_TEMPERATURE):
+                yield delta
+
+
+async def afinish_streamed_review(paper_text: str, content: str) -> Dict[str, Any]:
+    """
+    Parse the full text of a streamed review (astream_deepseek_review), with
+    the same repair and fix-up follow-up as the non-streaming calls.
+    """
+    return await _aparse_review_with_fix(_build_messages(build_review_prompt(paper_text)), content)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, DateTime, Boolean, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -20,6 +20,61 @@ class SubmissionORM(Base):
 
     review_results = relationship("ReviewResultORM", back_populates="submission")
 
+    # 历史列表按 (created_at, id) 倒序做 keyset 分页
+    __table_args__ = (Index("ix_submissions_created_at_id", "created_at", "id"),)
+
+class ReviewJobORM(Base):
+    """
+    异步审稿任务。上传的 PDF 暂存在 upload_path，
+    由后台 worker 依次处理：queued -> extracting -> calling_model -> persisting -> done / failed。
+    """
+    __tablename__ = "review_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(64), unique=True, index=True, nullable=False)
+    status = Column(String(32), index=True, nullable=False, default="queued")
+    progress = Column(Float, nullable=False, default=0.0)
+
+    file_name = Column(String(512), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    upload_path = Column(String(1024), nullable=False)
+    refresh = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    # 成功后指向生成的审稿结果（业务 ID）
+    review_result_id = Column(String(64), nullable=True)
+
+    error_code = Column(String(64), nullable=True)
+    error_message = Column(Text, nullable=True)
+    error_details = Column(Text, nullable=True)  # JSON
+
+    created_at = Column(DateTime(timezone=True), default=now_utc, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class ReviewBatchORM(Base):
+    """
+    一次批量提交（例如整个会议 track）。每个 PDF 仍是一条独立的 review_jobs 任务，
+    批次只记录归属关系，进度与结果从任务表汇总。
+    """
+    __tablename__ = "review_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(64), unique=True, index=True, nullable=False)
+    refresh = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), default=now_utc, nullable=False)
+
+    items = relationship("ReviewBatchItemORM", back_populates="batch", cascade="all, delete-orphan")
+
+class ReviewBatchItemORM(Base):
+    __tablename__ = "review_batch_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_db_id = Column(Integer, ForeignKey("review_batches.id"), index=True, nullable=False)
+    job_id = Column(String(64), index=True, nullable=False)
+
+    batch = relationship("ReviewBatchORM", back_populates="items")
+
 class ReviewResultORM(Base):
     __tablename__ = "review_results"
 
@@ -27,10 +82,10 @@ class ReviewResultORM(Base):
     review_result_id = Column(String(64), unique=True, index=True, nullable=False)
 
     # 业务上的 submission 标识，方便对齐接口
-    submission_id = Column(String(64), nullable=False)
+    submission_id = Column(String(64), index=True, nullable=False)
 
     # 数据库级外键，方便 join
-    submission_db_id = Column(Integer, ForeignKey("submissions.id"), nullable=False)
+    submission_db_id = Column(Integer, ForeignKey("submissions.id"), index=True, nullable=False)
 
     generated_at = Column(DateTime(timezone=True), default=now_utc, nullable=False)
 
@@ -38,22 +93,148 @@ class ReviewResultORM(Base):
     scores = relationship("ScoreORM", back_populates="review_result", cascade="all, delete-orphan")
     reviews = relationship("ReviewORM", back_populates="review_result", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ix_review_results_generated_at_id", "generated_at", "id"),)
+
 class ScoreORM(Base):
     __tablename__ = "scores"
 
     id = Column(Integer, primary_key=True, index=True)
-    review_result_id = Column(Integer, ForeignKey("review_results.id"), nullable=False)
+    review_result_id = Column(Integer, ForeignKey("review_results.id"), index=True, nullable=False)
     dimension = Column(String(64), nullable=False)
     value = Column(Float, nullable=False)
 
     review_result = relationship("ReviewResultORM", back_populates="scores")
 
+    # 按维度分数阈值筛选
+    __table_args__ = (Index("ix_scores_dimension_value", "dimension", "value", "review_result_id"),)
+
 class ReviewORM(Base):
     __tablename__ = "reviews"
 
     id = Column(Integer, primary_key=True, index=True)
-    review_result_id = Column(Integer, ForeignKey("review_results.id"), nullable=False)
+    review_result_id = Column(Integer, ForeignKey("review_results.id"), index=True, nullable=False)
     reviewer_id = Column(String(64), nullable=False)
     text = Column(Text, nullable=False)
 
-    review_result = relationship("ReviewResultORM", back_populates="reviews")
\ No newline at end of file
+    review_result = relationship("ReviewResultORM", back_populates="reviews")
+
+class ReviewCacheORM(Base):
+    """
+    内容寻址的审稿缓存：同一份 PDF + 同一模型配置 + 同一 prompt 版本
+    直接复用已有的 review_results 记录。
+    """
+    __tablename__ = "review_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+
+    # 原始 PDF 字节的 sha256
+    content_hash = Column(String(64), index=True, nullable=False)
+    model = Column(String(64), nullable=False)
+    temperature = Column(Float, nullable=False)
+    prompt_version = Column(String(32), nullable=False)
+
+    review_result_db_id = Column(Integer, ForeignKey("review_results.id"), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), default=now_utc, nullable=False)
+    last_hit_at = Column(DateTime(timezone=True), default=now_utc, index=True, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+
+    review_result = relationship("ReviewResultORM")
+
+class ExtractedTextORM(Base):
+    """
+    按 PDF 内容哈希寻址的全文（压缩存储）。同一份 PDF 再次审稿、换 prompt 重审时
+    直接读取，不再需要原始 PDF，也不再解析。
+    """
+    __tablename__ = "extracted_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 原始 PDF 字节的 sha256
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)
+    codec = Column(String(16), nullable=False)  # zstd / zlib
+    data = Column(LargeBinary, nullable=False)
+    char_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=now_utc, nullable=False)
+
+class SubmissionSourceORM(Base):
+    """
+    submission 对应的 PDF 内容哈希，用于找到它的全文。
+    """
+    __tablename__ = "submission_sources"
+
+    id = Column(Integer, primary_key=True, index=True)
+    submission_db_id = Column(Integer, ForeignKey("submissions.id"), unique=True, index=True, nullable=False)
+    content_hash = Column(String(64), index=True, nullable=False)
+
+class SubmissionFingerprintORM(Base):
+    """
+    submission 全文的 MinHash 签名，用于发现改名重传、v2 小改等近似重复投稿。
+    签名为 MINHASH_PERMUTATIONS 个 64 位整数按小端序打包。
+    """
+    __tablename__ = "submission_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    submission_db_id = Column(Integer, ForeignKey("submissions.id"), unique=True, index=True, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    shingle_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=now_utc, nullable=False)
+
+    submission = relationship("SubmissionORM")
+
+class SubmissionLshBucketORM(Base):
+    """
+    MinHash 签名的 LSH 分桶：每个 band 的哈希值一行，
+    查询时只比较至少有一个 band 落在同一桶里的候选。
+    """
+    __tablename__ = "submission_lsh_buckets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # band 序号已混入哈希值，不同 band 的桶不会相撞
+    bucket = Column(Integer, index=True, nullable=False)
+    submission_db_id = Column(Integer, ForeignKey("submissions.id"), index=True, nullable=False)
+
+class ScoreDailyStatORM(Base):
+    """
+    按天（UTC）、按维度汇总的分数：条数、和、平方和与最值。
+    写入审稿结果时在同一事务内增量更新，均值 / 标准差 / 趋势直接由这里算出，不扫描 scores 表。
+    """
+    __tablename__ = "score_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(String(10), nullable=False)  # YYYY-MM-DD
+    dimension = Column(String(64), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_sq_sum = Column(Float, nullable=False, default=0.0)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+
+    __table_args__ = (UniqueConstraint("day", "dimension", name="uq_score_daily_stats_day_dimension"),)
+
+class ScoreHistogramORM(Base):
+    """
+    各维度全部分数的直方图：0.0–5.0 按 0.1 分桶，与 score_daily_stats 同步更新。
+    百分位查询只读一个维度的几十行，与已存审稿结果数量无关。
+    """
+    __tablename__ = "score_histogram"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String(64), nullable=False)
+    bucket = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint("dimension", "bucket", name="uq_score_histogram_dimension_bucket"),)
+
+class ExportWatermarkORM(Base):
+    """
+    命名的增量导出水位：上次导出到的 review_results.id。
+    夜间任务用同一个名字反复导出，每次只读取比水位更新的审稿结果。
+    """
+    __tablename__ = "export_watermarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(64), unique=True, index=True, nullable=False)
+    review_result_db_id = Column(Integer, nullable=False, default=0)
+    exported_count = Column(Integer, nullable=False, default=0)  # 上一次导出的条数
+    updated_at = Column(DateTime(timezone=True), default=now_utc, nullable=False)
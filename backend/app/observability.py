@@ -0,0 +1,399 @@
+import abc
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+# cspaper.llm 的子 logger：每个请求 / 任务一行阶段耗时汇总，写入 llm.log
+trace_logger = logging.getLogger("cspaper.llm.trace")
+
+# 延迟分桶（秒）：覆盖毫秒级的 SQLite 查询到分钟级的模型调用
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# 流水线各阶段的 span 名
+STAGE_UPLOAD = "upload"
+STAGE_CACHE_LOOKUP = "cache_lookup"
+STAGE_PDF_EXTRACT = "pdf_extract"
+STAGE_TEXT_NORMALIZE = "text_normalize"
+STAGE_DEDUP = "dedup"
+STAGE_LLM_REQUEST = "llm_request"
+STAGE_LLM_PARSE = "llm_parse"
+STAGE_LLM_FIX = "llm_fix"
+STAGE_PERSIST = "persist"
+
+# 当前请求的 ID，由 RequestContextMiddleware / 任务执行器设置；日志通过 RequestIdFilter 带上它
+request_id_var: ContextVar[str] = ContextVar("cspaper_request_id", default="-")
+# 当前请求已结束的 span：[(阶段, 秒)]。线程池与子任务复制上下文时共享同一个列表
+_trace_var: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("cspaper_trace", default=None)
+
+# 客户端可以通过 X-Request-ID 传入自己的 ID；不合规的值忽略并重新生成
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    给日志记录加上 request_id 字段，格式串里用 %(request_id)s 输出。
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+# ---------- Prometheus 文本格式的指标 ----------
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各分桶计数（非累计）..., +Inf 计数], 总和
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.label_names, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    进程内的指标集合。每个 uvicorn worker 进程各自计数，多 worker 部署时由 Prometheus 分别抓取后聚合。
+    """
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "cspaper_stage_seconds", "Time spent in each review pipeline stage.", ["stage"]
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "cspaper_http_requests_total", "HTTP requests by route and status code.", ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "cspaper_http_request_seconds", "HTTP request latency until the response body is sent.", ["method", "route"]
+)
+ERRORS = REGISTRY.counter(
+    "cspaper_errors_total", "Errors returned to clients or recorded on jobs, by error code.", ["code"]
+)
+# 命中率：sum(rate(cspaper_review_cache_total{result=~"hit|near-hit"}[5m])) / sum(rate(cspaper_review_cache_total[5m]))
+REVIEW_CACHE = REGISTRY.counter(
+    "cspaper_review_cache_total", "Review pipeline runs by cache outcome (hit, near-hit, miss, refresh).", ["result"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "cspaper_llm_tokens_total",
+    "Tokens reported by the model API; cached_prompt is the part of prompt served from the provider's prefix cache.",
+    ["provider", "type"],
+)
+LLM_JSON = REGISTRY.counter(
+    "cspaper_llm_json_total",
+    "Review JSON outcomes: strict, repaired (locally), fixed (follow-up request), partial, failed.",
+    ["outcome"],
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "cspaper_db_query_seconds", "SQLite statement execution time by statement type.", ["statement"]
+)
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "cspaper_admission_in_flight", "Review requests and jobs currently holding an admission slot."
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "cspaper_admission_queue_depth", "Review requests and jobs waiting for an admission slot, by priority.", ["priority"]
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "cspaper_admission_wait_seconds", "Time spent waiting for an admission slot, by priority.", ["priority"]
+)
+ADMISSION_SERVICE_SECONDS = REGISTRY.gauge(
+    "cspaper_admission_service_seconds",
+    "Moving average of how long an admitted request holds its slot; basis of Retry-After.",
+)
+# 拒绝原因：client_limit（429）、queue_full / wait_too_long / queue_timeout（503）
+ADMISSION_REJECTED = REGISTRY.counter(
+    "cspaper_admission_rejected_total", "Requests shed by admission control, by reason.", ["reason"]
+)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def record_error(code: str) -> None:
+    ERRORS.inc(code=code)
+
+
+def record_cache(result: str) -> None:
+    REVIEW_CACHE.inc(result=result)
+
+
+def record_json_outcome(outcome: str) -> None:
+    LLM_JSON.inc(outcome=outcome)
+
+
+def record_llm_usage(provider: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> None:
+    LLM_TOKENS.inc(prompt_tokens, provider=provider, type="prompt")
+    LLM_TOKENS.inc(completion_tokens, provider=provider, type="completion")
+    if cached_tokens:
+        LLM_TOKENS.inc(cached_tokens, provider=provider, type="cached_prompt")
+    trace_logger.info(
+        f"LLM usage provider={provider}, prompt_tokens={prompt_tokens}, "
+        f"completion_tokens={completion_tokens}, cached_prompt_tokens={cached_tokens}"
+    )
+
+
+def record_db_query(statement: str, seconds: float) -> None:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if keyword not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA"):
+        keyword = "OTHER"
+    DB_QUERY_SECONDS.observe(seconds, statement=keyword)
+
+
+# ---------- span 与请求上下文 ----------
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    记录一个阶段的耗时：计入 cspaper_stage_seconds，并追加到当前请求的阶段汇总。
+    异常同样计时（例如模型调用超时前等待的时间）。
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _trace_var.get()
+        if trace is not None:
+            trace.append((stage, elapsed))
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    if incoming and _REQUEST_ID_RE.match(incoming):
+        return incoming
+    return uuid4().hex[:16]
+
+
+@contextmanager
+def request_context(request_id: str) -> Iterator[None]:
+    """
+    在这个上下文里产生的日志带上 request_id，span 汇总到同一个请求下。
+    """
+    id_token = request_id_var.set(request_id)
+    trace_token = _trace_var.set([])
+    try:
+        yield
+    finally:
+        _trace_var.reset(trace_token)
+        request_id_var.reset(id_token)
+
+
+def format_trace() -> str:
+    """
+    当前请求的阶段耗时，按首次出现顺序合并同名阶段，例如
+    "upload=12ms pdf_extract=830ms llm_request=4100ms(x5) persist=35ms"。
+    """
+    totals: Dict[str, List[float]] = {}
+    for stage, seconds in _trace_var.get() or []:
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    return " ".join(
+        f"{stage}={seconds * 1000:.0f}ms" + (f"(x{count})" if count > 1 else "")
+        for stage, (seconds, count) in totals.items()
+    )
+
+
+def _route_template(scope) -> str:
+    # 用路由模板（/api/reviews/{review_result_id}）而不是实际路径作标签，避免标签数量无限增长
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestContextMiddleware:
+    """
+    ASGI 中间件：为每个 HTTP 请求分配 request_id（响应头 X-Request-ID），
+    统计请求数与耗时（流式响应计到最后一块发送完），并把阶段耗时汇总写入 llm.log。
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(b"x-request-id", b"").decode("latin-1")
+        request_id = new_request_id(incoming)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        with request_context(request_id):
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                elapsed = time.perf_counter() - started
+                method = scope["method"]
+                route = _route_template(scope)
+                HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+                HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route)
+                stages = format_trace()
+                if stages:
+                    trace_logger.info(f"{method} {route} {status} {elapsed * 1000:.0f}ms: {stages}")
@@ -1,6 +1,56 @@
+import asyncio
+import logging
+import multiprocessing
+import itertools
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import Tuple
-from pypdf import PdfReader
+from typing import TYPE_CHECKING, Any, Callable, Deque, Iterator, Optional, Tuple
+
+from backend.app.observability import STAGE_PDF_EXTRACT, span
+
+# pypdf 只在真正解析时导入：服务进程本身不解析 PDF（页数统计与逐页解析都交给进程池），导入它会拖慢启动
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+logger = logging.getLogger("cspaper.pdf")
+
+# PDF 解析是纯 CPU 任务，放进独立进程池，避免占住事件循环和 GIL
+PDF_MAX_WORKERS = max(1, int(os.getenv("PDF_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))))
+
+# 单页解析超时（秒）；超时的页按空文本处理，不拖垮整个请求
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "10"))
+
+# 截断阈值：最多解析的页数与最多保留的字符数，0 表示不限制
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "1000000"))
+
+# 预览截断长度，你可以根据需要调
+PREVIEW_LEN = 800
+
+# 父进程等待结果时检查 worker 是否卡死的间隔（秒）
+_STUCK_CHECK_SECONDS = 1.0
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+# 与进程池共享的 [task_id, 开始时间] * PDF_MAX_WORKERS：worker 开始处理某个任务时写入自己的槽位，
+# 父进程据此只从任务真正开始时计算兜底超时，在队列里等待的时间不算
+_pdf_clock: Optional[Any] = None
+_pool_lock = threading.Lock()
+_task_ids = itertools.count(1)
+
+# 每个 worker 进程缓存最近打开的 PdfReader，同一文档的后续页无需重新解析 xref
+_worker_reader: Optional[Tuple[str, "PdfReader"]] = None
+_worker_clock: Optional[Any] = None
+_worker_slot = 0
+
+
+class PageTimeout(Exception):
+    pass
 
 
 def extract_text_from_pdf(file_bytes: bytes) -> Tuple[str, str]:
@@ -8,7 +58,10 @@ def extract_text_from_pdf(file_bytes: bytes) -> Tuple[str, str]:
     输入整份 PDF 的二进制，返回：
     - full_text: 整篇文本（按页拼接）
     - preview: 截取前一小段，用于存库调试
+    单进程逐页解析，适合小文件与离线脚本；服务端请使用 extract_text_from_path。
     """
+    from pypdf import PdfReader
+
     reader = PdfReader(BytesIO(file_bytes))
     texts = []
     for page in reader.pages:
@@ -19,9 +72,260 @@ def extract_text_from_pdf(file_bytes: bytes) -> Tuple[str, str]:
         texts.append(page_text)
 
     full_text = "\n\n".join(texts).strip()
+    preview = full_text[:PREVIEW_LEN]
+
+    return full_text, preview
+
+
+def _init_worker(clock, next_slot) -> None:
+    global _worker_clock, _worker_slot
+    # pypdf 对不规范的 PDF 会逐页打印大量警告，worker 里只保留错误
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    with next_slot.get_lock():
+        _worker_slot = next_slot.value % PDF_MAX_WORKERS
+        next_slot.value += 1
+    _worker_clock = clock
+
+
+def _pool_and_clock() -> Tuple[ProcessPoolExecutor, Any]:
+    global _pdf_pool, _pdf_clock
+    with _pool_lock:
+        if _pdf_pool is None:
+            context = multiprocessing.get_context("spawn")
+            _pdf_clock = context.Array("d", 2 * PDF_MAX_WORKERS)
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_MAX_WORKERS,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(_pdf_clock, context.Value("i", 0)),
+            )
+        return _pdf_pool, _pdf_clock
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """
+    懒加载的进程池，最多 PDF_MAX_WORKERS 个进程。
+    使用 spawn 启动方式，避免在多线程的服务进程里 fork。
+    """
+    return _pool_and_clock()[0]
+
+
+def shutdown_pdf_pool(kill: bool = False) -> None:
+    """
+    关闭进程池。kill=True 时直接终止子进程，用于某页卡死、
+    连 SIGALRM 都无法打断的情况。
+    """
+    global _pdf_pool, _pdf_clock
+    with _pool_lock:
+        pool, _pdf_pool, _pdf_clock = _pdf_pool, None, None
+    if pool is None:
+        return
+    if kill:
+        # ProcessPoolExecutor 没有公开的终止接口，只能直接结束其子进程
+        for proc in list(getattr(pool, "_processes", {}).values()):
+            proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def preload_pdf_reader() -> None:
+    """
+    导入 pypdf 并解析一页空白 PDF，把首次解析才加载的模块提前加载好。
+    不创建进程池，可以在 fork 出 worker 之前调用。
+    """
+    from pypdf import PdfWriter
+
+    buffer = BytesIO()
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    writer.write(buffer)
+    extract_text_from_pdf(buffer.getvalue())
+
+
+def warm_pdf_pool() -> None:
+    """
+    预先拉起进程池的全部 worker（每个都要 spawn 新解释器并导入 pypdf），不等待完成；
+    首个上传不再承担这段启动时间。
+    """
+    pool = get_pdf_pool()
+    for _ in range(PDF_MAX_WORKERS):
+        pool.submit(preload_pdf_reader)
+
+
+def _on_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def _mark_task(task_id: int) -> None:
+    if _worker_clock is None:
+        return
+    with _worker_clock.get_lock():
+        _worker_clock[2 * _worker_slot] = task_id
+        _worker_clock[2 * _worker_slot + 1] = time.time()
+
+
+def _task_started_at(clock: Any, task_id: int) -> Optional[float]:
+    with clock.get_lock():
+        for slot in range(0, len(clock), 2):
+            if clock[slot] == task_id:
+                return clock[slot + 1]
+    return None
 
-    # 预览截断长度，你可以根据需要调
-    preview_len = 800
-    preview = full_text[:preview_len]
 
-    return full_text, preview
\ No newline at end of file
+def _worker_reader_for(path: str) -> "PdfReader":
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != path:
+        from pypdf import PdfReader
+
+        _worker_reader = (path, PdfReader(path))
+    return _worker_reader[1]
+
+
+def _count_pages(path: str, task_id: int) -> int:
+    _mark_task(task_id)
+    try:
+        return len(_worker_reader_for(path).pages)
+    finally:
+        _mark_task(0)
+
+
+def _hard_timeout(page_timeout: float) -> Optional[float]:
+    # 父进程侧的兜底等待时间：正常情况下 worker 会在 page_timeout 内自行返回
+    return page_timeout * 2 + 5 if page_timeout > 0 else None
+
+
+def _wait(future: Future, clock: Any, task_id: int, hard_timeout: Optional[float], label: str) -> Any:
+    """
+    等待进程池任务的结果。兜底超时从 worker 开始处理该任务时算起，排队时间不计入；
+    超时说明 worker 卡死在 SIGALRM 也打断不了的地方，只有这时才回收整个进程池。
+    """
+    if hard_timeout is None:
+        return future.result()
+    while True:
+        try:
+            return future.result(timeout=min(_STUCK_CHECK_SECONDS, hard_timeout))
+        except FutureTimeoutError:
+            started = _task_started_at(clock, task_id)
+            if started is not None and time.time() - started > hard_timeout:
+                logger.warning(f"{label} exceeded hard timeout; recycling worker pool")
+                shutdown_pdf_pool(kill=True)
+                raise
+
+
+def _submit(pool: ProcessPoolExecutor, fn: Callable[..., Any], *args: Any) -> Tuple[Future, int]:
+    task_id = next(_task_ids)
+    return pool.submit(fn, *args, task_id), task_id
+
+
+def count_pdf_pages(path: str, page_timeout: float = PDF_PAGE_TIMEOUT_SECONDS) -> int:
+    """
+    在进程池中统计页数（打开文档要解析 xref，大文件也是 CPU 活）；
+    worker 缓存打开的 PdfReader，随后解析第一页时不必重新打开。
+    """
+    pool, clock = _pool_and_clock()
+    future, task_id = _submit(pool, _count_pages, path)
+    return _wait(future, clock, task_id, _hard_timeout(page_timeout), f"PDF page count of {path}")
+
+
+def _extract_page(path: str, index: int, timeout: float, task_id: int = 0) -> Tuple[str, bool]:
+    """
+    在 worker 进程中解析单页，返回 (text, timed_out)。
+    worker 进程的任务运行在主线程，可以用 SIGALRM 打断耗时过长的页。
+    开始与结束时在共享时钟中登记 task_id，供父进程判断是否卡死。
+    """
+    _mark_task(task_id)
+    try:
+        return _extract_page_text(path, index, timeout)
+    finally:
+        _mark_task(0)
+
+
+def _extract_page_text(path: str, index: int, timeout: float) -> Tuple[str, bool]:
+    reader = _worker_reader_for(path)
+
+    use_alarm = timeout > 0 and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_page_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return reader.pages[index].extract_text() or "", False
+    except PageTimeout:
+        return "", True
+    except Exception:
+        return "", False
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def iter_pdf_pages(
+    path: str,
+    max_pages: int = PDF_MAX_PAGES,
+    max_chars: int = PDF_MAX_CHARS,
+    page_timeout: float = PDF_PAGE_TIMEOUT_SECONDS,
+) -> Iterator[str]:
+    """
+    按页顺序产出文本的生成器，页面在进程池中并行解析。
+    同时最多有 2 * PDF_MAX_WORKERS 页在途，调用方可以边读边处理后续阶段。
+    达到 max_pages / max_chars 后停止调度剩余页面；超时的页产出空字符串。
+    """
+    total_pages = count_pdf_pages(path, page_timeout)
+    if max_pages > 0:
+        total_pages = min(total_pages, max_pages)
+
+    pool, clock = _pool_and_clock()
+    window = 2 * PDF_MAX_WORKERS
+    pending: Deque[Tuple[int, Future, int]] = deque()
+    next_index = 0
+    chars = 0
+    hard_timeout = _hard_timeout(page_timeout)
+
+    try:
+        while next_index < total_pages or pending:
+            while next_index < total_pages and len(pending) < window:
+                future, task_id = _submit(pool, _extract_page, path, next_index, page_timeout)
+                pending.append((next_index, future, task_id))
+                next_index += 1
+
+            index, future, task_id = pending.popleft()
+            text, timed_out = _wait(future, clock, task_id, hard_timeout, f"PDF page {index}")
+            if timed_out:
+                logger.warning(f"PDF page {index} timed out after {page_timeout}s; skipped")
+
+            if max_chars > 0 and chars + len(text) >= max_chars:
+                yield text[: max_chars - chars]
+                logger.info(f"PDF text truncated at {max_chars} chars (page {index + 1}/{total_pages})")
+                return
+            chars += len(text)
+            yield text
+    finally:
+        for _, future, _ in pending:
+            future.cancel()
+
+
+def extract_text_from_path(
+    path: str,
+    max_pages: int = PDF_MAX_PAGES,
+    max_chars: int = PDF_MAX_CHARS,
+    page_timeout: float = PDF_PAGE_TIMEOUT_SECONDS,
+) -> Tuple[str, str]:
+    """
+    与 extract_text_from_pdf 返回值相同，但从磁盘文件读取并按页并行解析。
+    阻塞调用，应在线程池中执行。
+    """
+    texts = list(iter_pdf_pages(path, max_pages, max_chars, page_timeout))
+    full_text = "\n\n".join(texts).strip()
+    return full_text, full_text[:PREVIEW_LEN]
+
+
+async def extract_text_from_path_async(path: str) -> Tuple[str, str]:
+    """
+    在线程中调度 extract_text_from_path，页面解析在进程池中完成，不阻塞事件循环。
+    """
+    try:
+        with span(STAGE_PDF_EXTRACT):
+            return await asyncio.to_thread(extract_text_from_path, path)
+    except BrokenProcessPool:
+        # 子进程异常退出（例如被 OOM kill）后进程池不可再用，丢弃以便下次重建
+        shutdown_pdf_pool()
+        raise
@@ -0,0 +1,624 @@
+import math
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from backend.app.analytics import record_scores
+from backend.app.cache import (
+    lookup_cached_review,
+    lookup_cached_review_for_submission,
+    make_cache_key,
+    store_cached_review,
+)
+from backend.app.chunking import NoReviewableTextError, is_long_document, review_long_document
+from backend.app.db import SessionLocal
+from backend.app.dedup import Fingerprint, compute_fingerprint, find_near_duplicates, store_fingerprint
+from backend.app.llm import (
+    LLM_MODEL,
+    REVIEW_FANOUT,
+    IncrementalReviewParser,
+    LLMError,
+    acall_deepseek_for_review,
+    afinish_streamed_review,
+    answered_model,
+    areview_fanout_events,
+    astream_deepseek_review,
+    sort_reviews,
+    track_answering_models,
+)
+from backend.app.observability import (
+    STAGE_CACHE_LOOKUP,
+    STAGE_DEDUP,
+    STAGE_PERSIST,
+    STAGE_TEXT_NORMALIZE,
+    record_cache,
+    span,
+)
+from backend.app.models import SubmissionORM, ReviewResultORM, ScoreORM, ReviewORM, now_utc
+from backend.app.pdf_utils import PREVIEW_LEN, extract_text_from_path_async
+from backend.app.schemas import ReviewResponse
+from backend.app.schemas import Submission as SubmissionSchema
+from backend.app.schemas import ReviewResult as ReviewResultSchema
+from backend.app.schemas import Score as ScoreSchema
+from backend.app.schemas import Review as ReviewSchema
+from backend.app.textnorm import prepare_prompt_text
+from backend.app.textstore import link_submission, load_text, store_text, submission_content_hash
+from backend.app.uploads import SpooledUpload
+
+# 流水线阶段名，同时用作异步任务的状态值
+STAGE_EXTRACTING = "extracting"
+STAGE_CALLING_MODEL = "calling_model"
+STAGE_PERSISTING = "persisting"
+
+StageCallback = Callable[[str], Awaitable[None]]
+
+
+class ReviewPipelineError(Exception):
+    """
+    流水线中可预期的失败，携带对外暴露的错误码与 HTTP 状态码，
+    由接口层转换为 {"error": {...}} 结构，由任务队列写入任务记录。
+    """
+
+    def __init__(self, status_code: int, code: str, message: str, details: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.details = details
+
+    def to_error(self) -> Dict[str, Any]:
+        return {"code": self.code, "message": self.message, "details": self.details}
+
+
+def build_review_response(
+    db_submission: SubmissionORM,
+    db_review_result: ReviewResultORM,
+) -> ReviewResponse:
+    # 组装成 Pydantic 的 ReviewResponse 返回
+    submission_schema = SubmissionSchema(
+        submission_id=db_submission.submission_id,
+        file_name=db_submission.file_name,
+        file_size=db_submission.file_size,
+        created_at=db_submission.created_at.isoformat(),
+        text_preview=db_submission.text_preview,
+    )
+
+    score_schemas = [
+        ScoreSchema(dimension=s.dimension, value=s.value)
+        for s in db_review_result.scores
+    ]
+
+    review_schemas = [
+        ReviewSchema(reviewer_id=r.reviewer_id, text=r.text)
+        for r in db_review_result.reviews
+    ]
+
+    review_result_schema = ReviewResultSchema(
+        review_result_id=db_review_result.review_result_id,
+        submission_id=db_review_result.submission_id,
+        scores=score_schemas,
+        reviews=review_schemas,
+        generated_at=db_review_result.generated_at.isoformat(),
+    )
+
+    return ReviewResponse(
+        submission=submission_schema,
+        review_result=review_result_schema,
+    )
+
+
+def load_review_response(db: Session, review_result_id: str) -> Optional[ReviewResponse]:
+    # submission 用 JOIN、scores / reviews 各一条 IN 查询预加载，避免组装时逐个懒加载
+    db_review_result = db.execute(
+        select(ReviewResultORM)
+        .where(ReviewResultORM.review_result_id == review_result_id)
+        .options(
+            joinedload(ReviewResultORM.submission),
+            selectinload(ReviewResultORM.scores),
+            selectinload(ReviewResultORM.reviews),
+        )
+    ).scalar_one_or_none()
+    if db_review_result is None:
+        return None
+    return build_review_response(db_review_result.submission, db_review_result)
+
+
+def lookup_cached_response(db: Session, cache_key: str) -> Optional[ReviewResponse]:
+    cached = lookup_cached_review(db, cache_key)
+    if cached is None:
+        return None
+    return build_review_response(cached.submission, cached)
+
+
+def lookup_near_duplicate_response(
+    db: Session,
+    fingerprint: Fingerprint,
+    cache_key: str,
+    pdf_hash: str,
+) -> Optional[ReviewResponse]:
+    """
+    全文与已审稿件近似重复（改名重传、小幅修订）时返回那份稿件的审稿结果，
+    并把新 PDF 的哈希登记到同一结果上，之后原样重传可直接命中精确缓存。
+    """
+    for match in find_near_duplicates(db, fingerprint):
+        prior = lookup_cached_review_for_submission(db, match.submission_db_id)
+        if prior is None:
+            continue
+        store_cached_review(db, cache_key, pdf_hash, prior.id)
+        db.commit()
+        return load_review_response(db, prior.review_result_id)
+    return None
+
+
+def _clean_scores(scores_data: List[Dict[str, Any]]) -> List[Tuple[str, float]]:
+    scores: List[Tuple[str, float]] = []
+    for item in scores_data:
+        dimension = str(item.get("dimension", "")).strip()
+        value_raw = item.get("value", 0.0)
+        try:
+            value = float(value_raw)
+        except Exception:
+            value = 0.0
+        if not math.isfinite(value):
+            # 模型输出的 NaN / Infinity 能通过 json 解析与 float()，按无法解析的分数处理
+            value = 0.0
+
+        if not dimension:
+            continue
+        scores.append((dimension, value))
+    return scores
+
+
+def _clean_reviews(reviews_data: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    reviews: List[Tuple[str, str]] = []
+    for item in reviews_data:
+        reviewer_id = str(item.get("reviewer_id", "")).strip() or "reviewer"
+        text = str(item.get("text", "")).strip()
+        if not text:
+            continue
+        reviews.append((reviewer_id, text))
+    return reviews
+
+
+def persist_review(
+    db: Session,
+    file_name: str,
+    file_size: int,
+    preview: str,
+    llm_result: Dict[str, Any],
+    cache_key: Optional[str] = None,
+    pdf_hash: Optional[str] = None,
+    fingerprint: Optional[Fingerprint] = None,
+    model: str = LLM_MODEL,
+) -> ReviewResponse:
+    """
+    写入数据库四张表（submissions/review_results/scores/reviews），
+    并组装成 ReviewResponse。在线程池中调用。
+    传入 cache_key 时，同一事务内登记审稿缓存（model 为实际应答的模型，见 _answer_cache_key）；
+    传入 fingerprint 时一并写入全文签名。
+    全部写入在一个事务内完成：两条 INSERT ... RETURNING 取主键，
+    scores / reviews 各一次 executemany；响应直接用写入的数据组装，
+    不再 refresh 或触发关系懒加载。传入 pdf_hash 时记录 submission 与全文的对应关系。
+    """
+    scores = _clean_scores(llm_result.get("scores", []))
+    reviews = _clean_reviews(llm_result.get("reviews", []))
+
+    # 写入数据库：submission + review_result + scores + reviews
+    submission_id = f"sub_{uuid4().hex[:12]}"
+    # SQLite 存储时丢弃时区信息，这里与读回的值保持一致
+    now = now_utc().replace(tzinfo=None)
+
+    submission_db_id = db.execute(
+        insert(SubmissionORM)
+        .values(
+            submission_id=submission_id,
+            file_name=file_name,
+            file_size=file_size,
+            created_at=now,
+            text_preview=preview,
+        )
+        .returning(SubmissionORM.id)
+    ).scalar_one()
+
+    review_result_id, review_result_db_id = _insert_review_result(
+        db, submission_db_id, submission_id, scores, reviews, now
+    )
+
+    if cache_key is not None and pdf_hash is not None:
+        store_cached_review(db, cache_key, pdf_hash, review_result_db_id, model)
+    if pdf_hash is not None:
+        link_submission(db, submission_db_id, pdf_hash)
+    if fingerprint is not None:
+        store_fingerprint(db, submission_db_id, fingerprint)
+
+    db.commit()
+
+    return ReviewResponse(
+        submission=SubmissionSchema(
+            submission_id=submission_id,
+            file_name=file_name,
+            file_size=file_size,
+            created_at=now.isoformat(),
+            text_preview=preview,
+        ),
+        review_result=_review_result_schema(review_result_id, submission_id, scores, reviews, now),
+    )
+
+
+def _insert_review_result(
+    db: Session,
+    submission_db_id: int,
+    submission_id: str,
+    scores: List[Tuple[str, float]],
+    reviews: List[Tuple[str, str]],
+    now: datetime,
+) -> Tuple[str, int]:
+    """
+    写入 review_result 及其 scores / reviews，并累加分数汇总表，返回 (review_result_id, 主键)。不提交事务。
+    """
+    review_result_id = f"rev_{uuid4().hex[:12]}"
+    review_result_db_id = db.execute(
+        insert(ReviewResultORM)
+        .values(
+            review_result_id=review_result_id,
+            submission_id=submission_id,
+            submission_db_id=submission_db_id,
+            generated_at=now,
+        )
+        .returning(ReviewResultORM.id)
+    ).scalar_one()
+
+    if scores:
+        db.execute(
+            insert(ScoreORM),
+            [
+                {"review_result_id": review_result_db_id, "dimension": dimension, "value": value}
+                for dimension, value in scores
+            ],
+        )
+        record_scores(db, scores, now)
+    if reviews:
+        db.execute(
+            insert(ReviewORM),
+            [
+                {"review_result_id": review_result_db_id, "reviewer_id": reviewer_id, "text": text}
+                for reviewer_id, text in reviews
+            ],
+        )
+    return review_result_id, review_result_db_id
+
+
+def _review_result_schema(
+    review_result_id: str,
+    submission_id: str,
+    scores: List[Tuple[str, float]],
+    reviews: List[Tuple[str, str]],
+    now: datetime,
+) -> ReviewResultSchema:
+    return ReviewResultSchema(
+        review_result_id=review_result_id,
+        submission_id=submission_id,
+        scores=[ScoreSchema(dimension=d, value=v) for d, v in scores],
+        reviews=[ReviewSchema(reviewer_id=r, text=t) for r, t in reviews],
+        generated_at=now.isoformat(),
+    )
+
+
+def persist_rereview(
+    db: Session,
+    submission_db_id: int,
+    llm_result: Dict[str, Any],
+    pdf_hash: str,
+    model: str = LLM_MODEL,
+) -> ReviewResponse:
+    """
+    为已有 submission 追加一份新的审稿结果（不新建 submission），
+    并以当前模型配置登记审稿缓存，之后上传同一份 PDF 会命中这份新结果
+    （由备用模型应答时登记在该模型名下，不会被当作主模型的结果命中）。
+    """
+    submission = db.get(SubmissionORM, submission_db_id)
+    scores = _clean_scores(llm_result.get("scores", []))
+    reviews = _clean_reviews(llm_result.get("reviews", []))
+    now = now_utc().replace(tzinfo=None)
+
+    review_result_id, review_result_db_id = _insert_review_result(
+        db, submission_db_id, submission.submission_id, scores, reviews, now
+    )
+    store_cached_review(db, make_cache_key(pdf_hash, model=model), pdf_hash, review_result_db_id, model)
+    db.commit()
+
+    return ReviewResponse(
+        submission=SubmissionSchema(
+            submission_id=submission.submission_id,
+            file_name=submission.file_name,
+            file_size=submission.file_size,
+            created_at=submission.created_at.isoformat(),
+            text_preview=submission.text_preview,
+        ),
+        review_result=_review_result_schema(review_result_id, submission.submission_id, scores, reviews, now),
+    )
+
+
+def _with_session(fn: Callable[..., Any], *args: Any) -> Any:
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def _check_cache(upload: SpooledUpload, refresh: bool) -> Tuple[str, Optional[ReviewResponse]]:
+    """
+    按 PDF 内容哈希（落盘时已计算）查审稿缓存，返回 (cache_key, 命中的结果或 None)。
+    """
+    cache_key = make_cache_key(upload.sha256)
+    if refresh:
+        return cache_key, None
+    with span(STAGE_CACHE_LOOKUP):
+        cached = await run_in_threadpool(_with_session, lookup_cached_response, cache_key)
+    return cache_key, cached
+
+
+def _save_text(db: Session, content_hash: str, full_text: str) -> None:
+    store_text(db, content_hash, full_text)
+    db.commit()
+
+
+async def _extract_text(upload: SpooledUpload) -> Tuple[str, str]:
+    """
+    返回 (full_text, preview)。同一份 PDF 解析过就直接读已保存的全文；
+    否则解析并保存，之后重审、模型调用失败后重试都不用再解析。
+    """
+    stored = await run_in_threadpool(_with_session, load_text, upload.sha256)
+    if stored is not None:
+        return stored, stored[:PREVIEW_LEN]
+
+    try:
+        full_text, preview = await extract_text_from_path_async(str(upload.path))
+    except Exception as e:
+        raise ReviewPipelineError(
+            500, "FORMAT_FAILED", "PDF 解析失败，请检查文件是否损坏。", {"reason": str(e)}
+        )
+
+    if not full_text.strip():
+        raise ReviewPipelineError(400, "EMPTY_TEXT", "无法从 PDF 中提取有效文本。")
+    await run_in_threadpool(_with_session, _save_text, upload.sha256, full_text)
+    return full_text, preview
+
+
+async def _check_near_duplicate(
+    full_text: str,
+    upload: SpooledUpload,
+    cache_key: str,
+    refresh: bool,
+) -> Tuple[Optional[Fingerprint], Optional[ReviewResponse]]:
+    """
+    计算全文签名并查找近似重复的已审稿件，返回 (签名, 可复用的结果或 None)。
+    refresh 时只计算签名，不复用。
+    """
+    with span(STAGE_DEDUP):
+        fingerprint = await run_in_threadpool(compute_fingerprint, full_text)
+        if refresh or fingerprint is None:
+            return fingerprint, None
+        prior = await run_in_threadpool(
+            _with_session, lookup_near_duplicate_response, fingerprint, cache_key, upload.sha256
+        )
+    return fingerprint, prior
+
+
+def _model_error(e: LLMError) -> ReviewPipelineError:
+    if isinstance(e, NoReviewableTextError):
+        # 论文本身的问题，重试也不会成功，不按模型故障返回 502
+        return ReviewPipelineError(
+            400, "NO_REVIEWABLE_TEXT", "未能从论文中识别出可审阅的正文章节。", {"reason": str(e)}
+        )
+    return ReviewPipelineError(
+        502, "MODEL_ERROR", "审稿模型调用失败，请稍后重试。", {"reason": str(e)}
+    )
+
+
+async def _prompt_text(full_text: str) -> str:
+    # 去掉页眉页脚、页码、参考文献列表等，再决定是否走长文档模式
+    with span(STAGE_TEXT_NORMALIZE):
+        return await run_in_threadpool(prepare_prompt_text, full_text)
+
+
+def _answer_cache_key(pdf_hash: str, models: Set[str]) -> Tuple[str, str]:
+    """
+    按实际应答的模型生成缓存键，返回 (cache_key, model)。
+    故障切换或对冲请求由备用模型应答时，结果登记在备用模型名下，查缓存与近似重复复用都不会把它当作主模型的结果。
+    """
+    model = answered_model(models)
+    return make_cache_key(pdf_hash, model=model), model
+
+
+async def _call_model(full_text: str) -> Dict[str, Any]:
+    # 超长论文走分段审稿 + 合并，其余整篇一次调用
+    text = await _prompt_text(full_text)
+    if is_long_document(text):
+        return await review_long_document(text)
+    return await acall_deepseek_for_review(text)
+
+
+async def run_review_pipeline(
+    upload: SpooledUpload,
+    refresh: bool = False,
+    on_stage: Optional[StageCallback] = None,
+) -> Tuple[ReviewResponse, str]:
+    """
+    审稿主流程：查缓存 -> PDF 转文本 -> 查近似重复 -> 调用模型 -> 写库。
+    返回 (ReviewResponse, cache_status)，cache_status 为 hit / near-hit / miss / refresh，
+    near-hit 表示复用了全文近似重复的已审稿件的结果。
+    on_stage 在进入每个阶段时被调用，用于上报任务进度。
+    调用方负责在结束后清理 upload 对应的临时文件。
+    失败时抛出 ReviewPipelineError。
+    """
+
+    async def stage(name: str) -> None:
+        if on_stage is not None:
+            await on_stage(name)
+
+    # 1. 查审稿缓存，命中则跳过解析与模型调用
+    cache_key, cached = await _check_cache(upload, refresh)
+    if cached is not None:
+        record_cache("hit")
+        return cached, "hit"
+
+    # 2. PDF 转文本
+    await stage(STAGE_EXTRACTING)
+    full_text, preview = await _extract_text(upload)
+
+    # 3. 改名重传、小幅修订的稿件直接复用已有结果
+    fingerprint, prior = await _check_near_duplicate(full_text, upload, cache_key, refresh)
+    if prior is not None:
+        record_cache("near-hit")
+        return prior, "near-hit"
+
+    # 4. 调用 DeepSeek 模型得到 scores + reviews
+    await stage(STAGE_CALLING_MODEL)
+    models = track_answering_models()
+    try:
+        llm_result = await _call_model(full_text)
+    except LLMError as e:
+        raise _model_error(e)
+    cache_key, model = _answer_cache_key(upload.sha256, models)
+
+    # 5. 写库与组装响应是同步 SQLAlchemy 调用，放到线程池里执行
+    await stage(STAGE_PERSISTING)
+    with span(STAGE_PERSIST):
+        result = await run_in_threadpool(
+            _with_session,
+            persist_review,
+            upload.file_name,
+            upload.size,
+            preview,
+            llm_result,
+            cache_key,
+            upload.sha256,
+            fingerprint,
+            model,
+        )
+    cache_status = "refresh" if refresh else "miss"
+    record_cache(cache_status)
+    return result, cache_status
+
+
+def _load_submission_text(db: Session, submission_id: str) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+    submission_db_id = db.execute(
+        select(SubmissionORM.id).where(SubmissionORM.submission_id == submission_id)
+    ).scalar_one_or_none()
+    if submission_db_id is None:
+        return None, None, None
+    content_hash = submission_content_hash(db, submission_db_id)
+    full_text = load_text(db, content_hash) if content_hash is not None else None
+    return submission_db_id, content_hash, full_text
+
+
+async def rereview_submission(submission_id: str) -> ReviewResponse:
+    """
+    用保存的全文重新审阅一份历史 submission（例如换了 prompt 或模型），不需要原始 PDF。
+    新结果追加到同一个 submission 下。失败时抛出 ReviewPipelineError。
+    """
+    submission_db_id, content_hash, full_text = await run_in_threadpool(
+        _with_session, _load_submission_text, submission_id
+    )
+    if submission_db_id is None:
+        raise ReviewPipelineError(404, "SUBMISSION_NOT_FOUND", "投稿记录不存在。", {"submission_id": submission_id})
+    if full_text is None:
+        raise ReviewPipelineError(
+            409,
+            "TEXT_NOT_AVAILABLE",
+            "该投稿没有保存全文，请重新上传 PDF。",
+            {"submission_id": submission_id},
+        )
+
+    models = track_answering_models()
+    try:
+        llm_result = await _call_model(full_text)
+    except LLMError as e:
+        raise _model_error(e)
+    model = answered_model(models)
+
+    with span(STAGE_PERSIST):
+        return await run_in_threadpool(
+            _with_session, persist_rereview, submission_db_id, llm_result, content_hash, model
+        )
+
+
+async def stream_review_pipeline(
+    upload: SpooledUpload,
+    refresh: bool = False,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    流式版本的审稿流程，逐个产出 (event, payload)：
+    - stage:  {"stage": ...}，进入新阶段
+    - token:  {"text": ...}，模型原始输出片段
+    - score / review: 单条评分 / 审稿意见，在 JSON 中闭合后立即产出
+      （长文档模式不产出 token，合并完成后逐条产出 score / review；
+      审稿人并行模式不产出 token，每个请求完成即产出对应的 score / review）
+    - result: 写库后的完整 ReviewResponse（缓存或近似重复命中时直接产出）
+    失败时抛出 ReviewPipelineError。
+    """
+    cache_key, cached = await _check_cache(upload, refresh)
+    if cached is not None:
+        record_cache("hit")
+        yield "result", cached.model_dump()
+        return
+
+    yield "stage", {"stage": STAGE_EXTRACTING}
+    full_text, preview = await _extract_text(upload)
+
+    fingerprint, prior = await _check_near_duplicate(full_text, upload, cache_key, refresh)
+    if prior is not None:
+        record_cache("near-hit")
+        yield "result", prior.model_dump()
+        return
+
+    yield "stage", {"stage": STAGE_CALLING_MODEL}
+    text = await _prompt_text(full_text)
+    models = track_answering_models()
+    try:
+        if is_long_document(text):
+            # 长文档分块并发调用，没有单一的 token 流，合并后一次性产出各条结果
+            llm_result = await review_long_document(text)
+            for item in llm_result.get("scores", []):
+                yield "score", item
+            for item in llm_result.get("reviews", []):
+                yield "review", item
+        elif REVIEW_FANOUT:
+            llm_result = {"scores": [], "reviews": []}
+            async for kind, item in areview_fanout_events(text):
+                llm_result["scores" if kind == "score" else "reviews"].append(item)
+                yield kind, item
+            llm_result["reviews"] = sort_reviews(llm_result["reviews"])
+        else:
+            parser = IncrementalReviewParser()
+            async for delta in astream_deepseek_review(text):
+                yield "token", {"text": delta}
+                for event in parser.feed(delta):
+                    yield event
+            llm_result = await afinish_streamed_review(text, parser.content)
+    except LLMError as e:
+        raise _model_error(e)
+    cache_key, model = _answer_cache_key(upload.sha256, models)
+
+    yield "stage", {"stage": STAGE_PERSISTING}
+    with span(STAGE_PERSIST):
+        result = await run_in_threadpool(
+            _with_session,
+            persist_review,
+            upload.file_name,
+            upload.size,
+            preview,
+            llm_result,
+            cache_key,
+            upload.sha256,
+            fingerprint,
+            model,
+        )
+    record_cache("refresh" if refresh else "miss")
+    yield "result", result.model_dump()
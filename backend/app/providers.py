@@ -0,0 +1,822 @@
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar,
+)
+
+import httpx
+
+from backend.app.observability import record_llm_usage
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger("cspaper.llm")
+
+# 模型服务配置；LLM_PROVIDERS 按顺序列出可用的服务，第一个为主服务
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+DEEPSEEK_MODEL = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+OPENAI_COMPAT_BASE_URL = os.getenv("OPENAI_COMPAT_BASE_URL", "https://api.openai.com/v1")
+OPENAI_COMPAT_MODEL = os.getenv("OPENAI_COMPAT_MODEL", "gpt-4o-mini")
+FAKE_LLM_MODEL = "fake-reviewer"
+LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "deepseek").split(",") if p.strip()]
+
+# 路由策略：failover 依次尝试；hedge 在主服务超过 p95 延迟仍未返回时向备用服务再发一次
+LLM_ROUTING = os.getenv("LLM_ROUTING", "failover")
+# 延迟样本不足 LLM_HEDGE_MIN_SAMPLES 时使用的对冲等待时间，以及等待时间下限（秒）
+LLM_HEDGE_DEFAULT_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_SECONDS", "30"))
+LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# 本地假服务：输出由 prompt 决定；延迟 = 固定延迟 + 抖动，按比例注入慢请求与失败
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "1.0"))
+FAKE_LLM_JITTER_SECONDS = float(os.getenv("FAKE_LLM_JITTER_SECONDS", "0"))
+FAKE_LLM_SLOW_RATE = float(os.getenv("FAKE_LLM_SLOW_RATE", "0"))
+FAKE_LLM_SLOW_SECONDS = float(os.getenv("FAKE_LLM_SLOW_SECONDS", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+# HTTP 连接池与超时（秒）：客户端全进程共享，连接与 TLS 会话在请求之间复用。
+# 审稿人并行模式（llm.REVIEW_FANOUT）下一个并发名额同时发出 4 位审稿人 + 评分共 5 个请求
+_REQUESTS_PER_SLOT = 5 if os.getenv("REVIEW_FANOUT", "0") == "1" else 1
+LLM_POOL_MAX_CONNECTIONS = int(
+    os.getenv(
+        "LLM_POOL_MAX_CONNECTIONS", str(2 * _REQUESTS_PER_SLOT * int(os.getenv("LLM_MAX_CONCURRENCY", "4")))
+    )
+)
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "300"))
+
+# 429 / 5xx / 连接错误的重试：指数退避 + 全抖动，单次等待不超过上限
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+
+# 流式请求带上 stream_options.include_usage，最后一个分片返回 token 用量；不支持该参数的兼容服务设为 0
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "1") != "0"
+
+# 熔断：连续失败达到阈值后在冷却期内直接失败，冷却结束放行一个探测请求
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+T = TypeVar("T")
+
+Messages = List[Dict[str, str]]
+
+
+class LLMError(Exception):
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker, one per provider.
+
+    closed:    calls go through; each retryable failure bumps the counter.
+    open:      after failure_threshold consecutive failures, calls fail fast
+               with CircuitOpenError until reset_seconds have passed.
+    half_open: one probe call is let through; success closes the circuit,
+               failure opens it again for another reset_seconds.
+    """
+
+    def __init__(
+        self,
+        name: str = "llm",
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half_open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = self._clock()
+            remaining = self.reset_seconds - (now - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"{self.name} circuit open after {self._failures} consecutive failures; "
+                    f"retry in {remaining:.0f}s"
+                )
+            # 探测请求若被取消而没有回报结果，超过一个冷却期后允许新的探测
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_seconds:
+                raise CircuitOpenError(f"{self.name} circuit half-open; probe request in flight")
+            self._probe_started_at = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"{self.name} circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            probing = self._probe_started_at is not None
+            self._probe_started_at = None
+            if probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                logger.warning(
+                    f"{self.name} circuit opened: failures={self._failures}, cooldown={self.reset_seconds}s"
+                )
+
+
+class LatencyTracker:
+    """
+    Sliding window of recent successful call latencies (seconds).
+    """
+
+    def __init__(self, maxlen: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=maxlen)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+        return ordered[index]
+
+
+def _openai_errors() -> Tuple[Tuple[type, ...], Tuple[type, ...]]:
+    """
+    (APIConnectionError, APIStatusError) for isinstance checks. The openai SDK
+    is imported lazily; while it is not loaded no exception can come from it,
+    so FakeProvider failures never pull it in.
+    """
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return (), ()
+    return (openai.APIConnectionError,), (openai.APIStatusError,)
+
+
+def _is_retryable(e: Exception) -> bool:
+    connection_errors, status_errors = _openai_errors()
+    # APITimeoutError 是 APIConnectionError 的子类
+    if isinstance(e, connection_errors):
+        return True
+    if isinstance(e, status_errors):
+        return e.status_code == 429 or e.status_code >= 500
+    return False
+
+
+def _retry_after_seconds(e: Exception) -> Optional[float]:
+    if not isinstance(e, _openai_errors()[1]):
+        return None
+    value = e.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff_delay(attempt: int, e: Exception) -> float:
+    """
+    Full-jitter exponential backoff; a Retry-After header from the provider
+    is used as a lower bound. Never exceeds LLM_BACKOFF_MAX_SECONDS.
+    """
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    retry_after = _retry_after_seconds(e)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(delay, LLM_BACKOFF_MAX_SECONDS)
+
+
+def _describe(e: Exception) -> str:
+    if isinstance(e, _openai_errors()[1]):
+        return f"HTTP {e.status_code}"
+    return type(e).__name__
+
+
+def _on_attempt_failed(e: Exception, attempt: int, label: str, breaker: CircuitBreaker) -> float:
+    """
+    Record the failure with the circuit breaker and return how long to wait
+    before the next attempt, or raise LLMError when no retry is left.
+    """
+    retryable = _is_retryable(e)
+    if retryable:
+        breaker.record_failure()
+    else:
+        # 4xx（除 429）说明服务可达，只是请求本身有问题，不计入熔断
+        breaker.record_success()
+
+    if not retryable or attempt >= LLM_MAX_RETRIES:
+        logger.exception(f"{label} failed after {attempt + 1} attempt(s): {type(e).__name__}: {e}")
+        raise LLMError(f"{label} failed: {e}")
+
+    delay = _backoff_delay(attempt, e)
+    logger.warning(f"{label} failed ({_describe(e)}); retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.2f}s")
+    return delay
+
+
+async def _acall_with_retries(label: str, breaker: CircuitBreaker, request: Callable[[], Awaitable[T]]) -> T:
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = await request()
+        except Exception as e:
+            delay = _on_attempt_failed(e, attempt, label, breaker)
+        else:
+            breaker.record_success()
+            return result
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _call_with_retries(label: str, breaker: CircuitBreaker, request: Callable[[], T]) -> T:
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = request()
+        except Exception as e:
+            delay = _on_attempt_failed(e, attempt, label, breaker)
+        else:
+            breaker.record_success()
+            return result
+        time.sleep(delay)
+        attempt += 1
+
+
+def _message_content(response: Any, label: str) -> str:
+    try:
+        return response.choices[0].message.content
+    except Exception as e:
+        logger.exception(f"Unexpected response format: {type(e).__name__}: {e}; raw_response={response}")
+        raise LLMError(f"Unexpected {label} response format: {e}; raw={response}")
+
+
+def _record_usage(provider: str, usage: Any) -> None:
+    if usage is None:
+        return
+    # DeepSeek 返回 prompt_cache_hit_tokens；OpenAI 放在 prompt_tokens_details.cached_tokens
+    cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+    record_llm_usage(
+        provider,
+        getattr(usage, "prompt_tokens", None) or 0,
+        getattr(usage, "completion_tokens", None) or 0,
+        cached or 0,
+    )
+
+
+class LLMProvider(abc.ABC):
+    """
+    A chat-completion backend. complete() / stream() / complete_sync() take
+    OpenAI-style messages and return the assistant text; every failure is
+    raised as LLMError so the router can fail over.
+    """
+
+    name: str = "provider"
+    model: str = ""
+
+    @abc.abstractmethod
+    async def complete(self, messages: Messages, temperature: float) -> str:
+        ...
+
+    @abc.abstractmethod
+    def complete_sync(self, messages: Messages, temperature: float) -> str:
+        ...
+
+    @abc.abstractmethod
+    def stream(self, messages: Messages, temperature: float) -> AsyncIterator[str]:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Any endpoint speaking the OpenAI chat completions API (DeepSeek included).
+
+    Clients are created once and reused so connections and TLS sessions stay
+    warm. Transient failures are retried with jittered backoff, and each
+    provider has its own circuit breaker.
+    """
+
+    def __init__(self, name: str, base_url: str, model: str, api_key_env: str) -> None:
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.api_key_env = api_key_env
+        self.breaker = CircuitBreaker(name)
+        # 异步客户端的连接绑定在创建它的事件循环上，因此同时记录循环
+        self._async_client: Optional[Tuple[asyncio.AbstractEventLoop, "AsyncOpenAI"]] = None
+        self._sync_client: Optional["OpenAI"] = None
+        self._lock = threading.Lock()
+
+    def _api_key(self) -> str:
+        api_key = os.getenv(self.api_key_env)
+        if not api_key:
+            logger.error(f"{self.api_key_env} not set")
+            raise LLMError(f"{self.api_key_env} not set")
+        return api_key
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_POOL_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        return httpx.Timeout(
+            LLM_READ_TIMEOUT_SECONDS,
+            connect=LLM_CONNECT_TIMEOUT_SECONDS,
+            pool=LLM_CONNECT_TIMEOUT_SECONDS,
+        )
+
+    def async_client(self) -> "AsyncOpenAI":
+        # 重试由本模块负责，关闭 SDK 自带的重试，避免次数叠加
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client[0] is not loop:
+            from openai import AsyncOpenAI
+
+            if self._async_client is not None:
+                self._close_stale_client(*self._async_client)
+
+            client = AsyncOpenAI(
+                api_key=self._api_key(),
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=self._limits(), timeout=self._timeout()),
+            )
+            self._async_client = (loop, client)
+        return self._async_client[1]
+
+    def _close_stale_client(self, loop: asyncio.AbstractEventLoop, client: "AsyncOpenAI") -> None:
+        """
+        Close a client left behind by another event loop. Its connections
+        belong to that loop, so the close has to run there; a loop that is
+        already closed can no longer run it, and its sockets are released
+        when the client is garbage-collected.
+        """
+        if loop.is_closed() or not loop.is_running():
+            logger.debug(f"{self.name}: dropping async client of a stopped event loop")
+            return
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+
+    def sync_client(self) -> "OpenAI":
+        with self._lock:
+            if self._sync_client is None:
+                from openai import OpenAI
+
+                self._sync_client = OpenAI(
+                    api_key=self._api_key(),
+                    base_url=self.base_url,
+                    max_retries=0,
+                    http_client=httpx.Client(limits=self._limits(), timeout=self._timeout()),
+                )
+            return self._sync_client
+
+    async def complete(self, messages: Messages, temperature: float) -> str:
+        client = self.async_client()
+        label = f"{self.name} API request"
+        response = await _acall_with_retries(
+            label,
+            self.breaker,
+            lambda: client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                stream=False,
+            ),
+        )
+        _record_usage(self.name, getattr(response, "usage", None))
+        return _message_content(response, self.name)
+
+    def complete_sync(self, messages: Messages, temperature: float) -> str:
+        client = self.sync_client()
+        label = f"{self.name} API request"
+        response = _call_with_retries(
+            label,
+            self.breaker,
+            lambda: client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                stream=False,
+            ),
+        )
+        _record_usage(self.name, getattr(response, "usage", None))
+        return _message_content(response, self.name)
+
+    async def stream(self, messages: Messages, temperature: float) -> AsyncIterator[str]:
+        """
+        Yields content deltas. Failures are retried only until the first
+        delta has been yielded; after that they surface as LLMError.
+        """
+        client = self.async_client()
+        label = f"{self.name} streaming request"
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            started = False
+            try:
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                    **({"stream_options": {"include_usage": True}} if LLM_STREAM_USAGE else {}),
+                )
+                async for chunk in stream:
+                    _record_usage(self.name, getattr(chunk, "usage", None))
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        started = True
+                        yield delta
+            except Exception as e:
+                if started:
+                    if _is_retryable(e):
+                        self.breaker.record_failure()
+                    logger.exception(f"{label} failed mid-stream: {type(e).__name__}: {e}")
+                    raise LLMError(f"{label} failed: {e}")
+                delay = _on_attempt_failed(e, attempt, label, self.breaker)
+            else:
+                self.breaker.record_success()
+                return
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        async_client, self._async_client = self._async_client, None
+        with self._lock:
+            sync_client, self._sync_client = self._sync_client, None
+        if async_client is not None:
+            if async_client[0] is asyncio.get_running_loop():
+                await async_client[1].close()
+            else:
+                self._close_stale_client(*async_client)
+        if sync_client is not None:
+            sync_client.close()
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic offline provider for load tests and local development.
+
+    The review is derived from a hash of the prompt, so the same paper always
+    gets the same scores. Latency (latency + uniform jitter, plus slow_seconds
+    for a slow_rate share of calls) and injected failures come from a
+    generator seeded with `seed`, so a run with the same call order is
+    reproducible while two calls for the same prompt (e.g. a hedge) can differ.
+    """
+
+    DIMENSIONS = ["novelty", "technical_quality", "clarity", "significance"]
+
+    def __init__(
+        self,
+        latency: float = FAKE_LLM_LATENCY_SECONDS,
+        jitter: float = FAKE_LLM_JITTER_SECONDS,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+        slow_rate: float = FAKE_LLM_SLOW_RATE,
+        slow_seconds: float = FAKE_LLM_SLOW_SECONDS,
+        seed: int = FAKE_LLM_SEED,
+        name: str = "fake",
+    ) -> None:
+        self.name = name
+        self.model = FAKE_LLM_MODEL
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self._rng = random.Random(seed)
+
+    def _plan(self, messages: Messages) -> Tuple[float, bool, str]:
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+        if self._rng.random() < self.slow_rate:
+            delay += self.slow_seconds
+        fail = self._rng.random() < self.error_rate
+
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        review = {
+            "scores": [
+                {"dimension": d, "value": rng.choice([2.5, 3.0, 3.5, 4.0, 4.5])}
+                for d in self.DIMENSIONS
+            ],
+            "reviews": [
+                {
+                    "reviewer_id": f"reviewer_{i}",
+                    "text": f"Fake review {i} for a {len(prompt)}-character prompt.",
+                }
+                for i in range(1, 5)
+            ],
+        }
+        return delay, fail, json.dumps(review)
+
+    def _record_usage(self, messages: Messages, content: str) -> None:
+        # 按 4 个字符 1 个 token 估算，离线时 /metrics 也有 token 用量
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        record_llm_usage(self.name, prompt_chars // 4, len(content) // 4)
+
+    async def complete(self, messages: Messages, temperature: float) -> str:
+        delay, fail, content = self._plan(messages)
+        await asyncio.sleep(delay)
+        if fail:
+            raise LLMError("injected failure")
+        self._record_usage(messages, content)
+        return content
+
+    def complete_sync(self, messages: Messages, temperature: float) -> str:
+        delay, fail, content = self._plan(messages)
+        time.sleep(delay)
+        if fail:
+            raise LLMError("injected failure")
+        self._record_usage(messages, content)
+        return content
+
+    async def stream(self, messages: Messages, temperature: float) -> AsyncIterator[str]:
+        delay, fail, content = self._plan(messages)
+        pieces = [content[i : i + 40] for i in range(0, len(content), 40)]
+        # 首包前等待一半延迟，其余均匀分布在各片段之间
+        await asyncio.sleep(delay / 2)
+        if fail:
+            raise LLMError("injected failure")
+        for piece in pieces:
+            await asyncio.sleep(delay / 2 / len(pieces))
+            yield piece
+        self._record_usage(messages, content)
+
+
+def build_provider(name: str) -> LLMProvider:
+    if name == "deepseek":
+        return OpenAICompatibleProvider("deepseek", DEEPSEEK_BASE_URL, DEEPSEEK_MODEL, "DEEPSEEK_API_KEY")
+    if name == "openai":
+        return OpenAICompatibleProvider(
+            "openai", OPENAI_COMPAT_BASE_URL, OPENAI_COMPAT_MODEL, "OPENAI_COMPAT_API_KEY"
+        )
+    if name == "fake":
+        return FakeProvider()
+    raise ValueError(f"Unknown LLM provider: {name!r} (expected deepseek, openai or fake)")
+
+
+# 当前审稿中实际给出应答的模型；track_answering_models 开启登记，路由器在请求成功时写入。
+# 集合对象随上下文传给 gather 出来的子任务，分块 / 并行请求的应答都记在同一个集合里
+_answering_models: ContextVar[Optional[Set[str]]] = ContextVar("cspaper_answering_models", default=None)
+
+
+def track_answering_models() -> Set[str]:
+    """
+    Start recording which models answer the requests made from the current
+    context (failover and hedging may hand them to a secondary provider).
+    Returns the set that the router fills in.
+    """
+    models: Set[str] = set()
+    _answering_models.set(models)
+    return models
+
+
+def _record_answer(provider: LLMProvider) -> None:
+    models = _answering_models.get()
+    if models is not None:
+        models.add(provider.model)
+
+
+def provider_model(name: str) -> str:
+    return {"deepseek": DEEPSEEK_MODEL, "openai": OPENAI_COMPAT_MODEL, "fake": FAKE_LLM_MODEL}.get(name, name)
+
+
+def _all_failed(errors: List[Tuple[LLMProvider, LLMError]]) -> LLMError:
+    message = "All LLM providers failed: " + "; ".join(f"{p.name}: {e}" for p, e in errors)
+    # 所有服务都处于熔断状态时保留 CircuitOpenError，方便调用方区分“快速失败”
+    if errors and all(isinstance(e, CircuitOpenError) for _, e in errors):
+        return CircuitOpenError(message)
+    return LLMError(message)
+
+
+class LLMRouter:
+    """
+    Sends each call to an ordered list of providers.
+
+    failover: try providers in order until one succeeds.
+    hedge:    start the primary; if it has not answered after its observed
+              p95 latency (LLM_HEDGE_DEFAULT_SECONDS until enough samples),
+              send the same request to the next provider (or the primary
+              again when there is only one) and take whichever answers
+              first. The loser is cancelled. Streaming and sync calls always
+              use failover.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        policy: str = LLM_ROUTING,
+        hedge_default_seconds: float = LLM_HEDGE_DEFAULT_SECONDS,
+        hedge_min_seconds: float = LLM_HEDGE_MIN_SECONDS,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+    ) -> None:
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        if policy not in ("failover", "hedge"):
+            raise ValueError(f"Unknown LLM routing policy: {policy!r} (expected failover or hedge)")
+        self.providers = providers
+        self.policy = policy
+        self.hedge_default_seconds = hedge_default_seconds
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.latency: Dict[str, LatencyTracker] = {p.name: LatencyTracker() for p in providers}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    @property
+    def primary(self) -> LLMProvider:
+        return self.providers[0]
+
+    def hedge_delay(self) -> float:
+        tracker = self.latency[self.primary.name]
+        if len(tracker) < self.hedge_min_samples:
+            return self.hedge_default_seconds
+        return max(self.hedge_min_seconds, tracker.percentile(0.95) or 0.0)
+
+    async def _timed(self, provider: LLMProvider, messages: Messages, temperature: float) -> str:
+        started = time.perf_counter()
+        content = await provider.complete(messages, temperature)
+        self.latency[provider.name].observe(time.perf_counter() - started)
+        return content
+
+    async def _failover(self, providers: List[LLMProvider], messages: Messages, temperature: float) -> str:
+        errors: List[Tuple[LLMProvider, LLMError]] = []
+        for provider in providers:
+            try:
+                content = await self._timed(provider, messages, temperature)
+            except LLMError as e:
+                errors.append((provider, e))
+                logger.warning(f"LLM provider {provider.name} failed: {e}")
+            else:
+                _record_answer(provider)
+                return content
+        raise _all_failed(errors)
+
+    async def _hedged(self, messages: Messages, temperature: float) -> str:
+        primary = self.primary
+        backup = self.providers[1] if len(self.providers) > 1 else primary
+        delay = self.hedge_delay()
+
+        first = asyncio.create_task(self._timed(primary, messages, temperature))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                try:
+                    content = first.result()
+                    _record_answer(primary)
+                    return content
+                except LLMError as e:
+                    logger.warning(f"LLM provider {primary.name} failed: {e}")
+                    return await self._failover(self.providers[1:] or [primary], messages, temperature)
+
+            self.hedges_sent += 1
+            logger.info(f"Hedging LLM request to {backup.name} after {delay:.1f}s")
+            second = asyncio.create_task(self._timed(backup, messages, temperature))
+            tasks.add(second)
+            errors: List[str] = []
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedges_won += 1
+                        _record_answer(backup if task is second else primary)
+                        return task.result()
+                    errors.append(str(task.exception()))
+            raise LLMError(f"Hedged LLM request failed: {'; '.join(errors)}")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def complete(self, messages: Messages, temperature: float) -> str:
+        if self.policy == "hedge":
+            return await self._hedged(messages, temperature)
+        return await self._failover(self.providers, messages, temperature)
+
+    def complete_sync(self, messages: Messages, temperature: float) -> str:
+        errors: List[Tuple[LLMProvider, LLMError]] = []
+        for provider in self.providers:
+            try:
+                content = provider.complete_sync(messages, temperature)
+            except LLMError as e:
+                errors.append((provider, e))
+                logger.warning(f"LLM provider {provider.name} failed: {e}")
+            else:
+                _record_answer(provider)
+                return content
+        raise _all_failed(errors)
+
+    async def stream(self, messages: Messages, temperature: float) -> AsyncIterator[str]:
+        # 首个片段产出前失败可以切换服务；之后失败只能上抛
+        errors: List[Tuple[LLMProvider, LLMError]] = []
+        for provider in self.providers:
+            started = False
+            try:
+                async for delta in provider.stream(messages, temperature):
+                    started = True
+                    yield delta
+                _record_answer(provider)
+                return
+            except LLMError as e:
+                if started:
+                    raise
+                errors.append((provider, e))
+                logger.warning(f"LLM provider {provider.name} failed before streaming: {e}")
+        raise _all_failed(errors)
+
+    async def aclose(self) -> None:
+        for provider in self.providers:
+            await provider.aclose()
+
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter([build_provider(name) for name in LLM_PROVIDERS])
+        return _router
+
+
+def set_router(router: Optional[LLMRouter]) -> None:
+    """
+    Replace the process-wide router (benchmarks, offline runs).
+    """
+    global _router
+    with _router_lock:
+        _router = router
+
+
+async def aclose_llm_clients() -> None:
+    """
+    Close every provider's clients and connection pools (app shutdown).
+    """
+    with _router_lock:
+        router = _router
+    if router is not None:
+        await router.aclose()
+
+
+def preload_llm_sdk() -> None:
+    """
+    Import the openai SDK and the chat completion resources it loads on first
+    use (about half a second of imports), so the first review does not pay
+    for them. No request is sent and no connection is opened, so this is
+    safe to call before forking workers.
+    """
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(api_key="preload", base_url="http://127.0.0.1")
+    # 访问属性即触发 chat / completions 资源模块的导入
+    client.chat.completions
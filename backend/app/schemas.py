@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 
 
 class Score(BaseModel):
@@ -40,4 +40,103 @@ class ApiError(BaseModel):
 
 
 class ErrorEnvelope(BaseModel):
-    error: ApiError
\ No newline at end of file
+    error: ApiError
+
+
+class ReviewJob(BaseModel):
+    job_id: str
+    status: str
+    progress: float
+    file_name: str
+    file_size: int
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    review_result_id: Optional[str] = None
+    error: Optional[ApiError] = None
+
+
+class ReviewBatch(BaseModel):
+    batch_id: str
+    created_at: str
+    total: int
+    # 各状态的任务数：queued / extracting / calling_model / persisting / done / failed
+    status_counts: Dict[str, int]
+    finished: bool
+    # 已完成篇数 / 从首个任务开始到最近一个任务结束的分钟数
+    papers_per_minute: Optional[float] = None
+    jobs: List[ReviewJob]
+
+
+class SubmissionPage(BaseModel):
+    items: List[Submission]
+    next_cursor: Optional[str] = None
+
+
+class ReviewResultSummary(BaseModel):
+    review_result_id: str
+    submission_id: str
+    file_name: str
+    scores: List[Score]
+    mean_score: Optional[float] = None
+    generated_at: str
+
+
+class ReviewResultPage(BaseModel):
+    items: List[ReviewResultSummary]
+    next_cursor: Optional[str] = None
+
+
+class SearchHit(BaseModel):
+    kind: str  # review / submission
+    submission_id: str
+    file_name: str
+    review_result_id: Optional[str] = None
+    reviewer_id: Optional[str] = None
+    snippet: str
+    rank: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    order: str  # relevance / recent
+    total: int
+    items: List[SearchHit]
+
+
+class DimensionScoreStats(BaseModel):
+    dimension: str
+    count: int
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    # p25 / p50 / p75 / p90，由直方图得出，精度为一个分桶
+    quantiles: Dict[str, float]
+    # 第 i 个元素是分数约为 i * bucket_width 的条数
+    histogram: List[int]
+
+
+class DailyScoreStats(BaseModel):
+    day: str
+    dimension: str
+    count: int
+    mean: float
+    std: float
+
+
+class ScoreAnalytics(BaseModel):
+    bucket_width: float
+    dimensions: List[DimensionScoreStats]
+    # 最近 days 天的逐日统计，按日期升序
+    daily: List[DailyScoreStats]
+
+
+class ScoreRank(BaseModel):
+    dimension: str
+    value: float
+    count: int
+    # 低于该分数的比例（同分计一半），0–100
+    percentile: float
+    # 分数不低于该值的比例，即 "前 x%"，0–100
+    top_percent: float
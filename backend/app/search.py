@@ -0,0 +1,251 @@
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from backend.app.schemas import SearchHit, SearchResponse
+
+logger = logging.getLogger("cspaper.search")
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# 结果摘要中命中词的标记与摘要长度（token 数）
+SNIPPET_OPEN = "**"
+SNIPPET_CLOSE = "**"
+SNIPPET_TOKENS = 16
+
+SEARCH_SCOPES = ("all", "reviews", "submissions")
+
+# 命中数超过该值时不再按相关度排序，改按时间倒序（见 search）
+SEARCH_RANK_MAX_HITS = int(os.getenv("SEARCH_RANK_MAX_HITS", "20000"))
+
+# 外部内容（external content）FTS5 表：索引只存倒排信息，正文仍在原表。
+# porter 词干化让 "ablation" 也能命中 "ablations"。
+_FTS_TABLES = {
+    "reviews_fts": (
+        "CREATE VIRTUAL TABLE reviews_fts USING fts5("
+        "text, content='reviews', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')"
+    ),
+    "submissions_fts": (
+        "CREATE VIRTUAL TABLE submissions_fts USING fts5("
+        "file_name, text_preview, content='submissions', content_rowid='id', "
+        "tokenize='porter unicode61 remove_diacritics 2')"
+    ),
+}
+
+# 触发器让索引与原表同步：任何写入路径（ORM、批量 executemany、手工 SQL）都会触发
+_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS reviews_fts_ai AFTER INSERT ON reviews BEGIN
+        INSERT INTO reviews_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_fts_ad AFTER DELETE ON reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_fts_au AFTER UPDATE ON reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO reviews_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS submissions_fts_ai AFTER INSERT ON submissions BEGIN
+        INSERT INTO submissions_fts(rowid, file_name, text_preview)
+        VALUES (new.id, new.file_name, new.text_preview);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS submissions_fts_ad AFTER DELETE ON submissions BEGIN
+        INSERT INTO submissions_fts(submissions_fts, rowid, file_name, text_preview)
+        VALUES ('delete', old.id, old.file_name, old.text_preview);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS submissions_fts_au AFTER UPDATE ON submissions BEGIN
+        INSERT INTO submissions_fts(submissions_fts, rowid, file_name, text_preview)
+        VALUES ('delete', old.id, old.file_name, old.text_preview);
+        INSERT INTO submissions_fts(rowid, file_name, text_preview)
+        VALUES (new.id, new.file_name, new.text_preview);
+    END""",
+]
+
+_TERM_RE = re.compile(r"\w+\*?", re.UNICODE)
+
+
+class EmptySearchQuery(ValueError):
+    pass
+
+
+def ensure_search_schema(conn: Connection) -> None:
+    """
+    建立 FTS5 表与同步触发器（幂等）。首次建表时顺带回填已有数据。
+    仅对 SQLite 生效。
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    existing = {
+        row[0]
+        for row in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('reviews_fts', 'submissions_fts')"
+        )
+    }
+    created = []
+    for name, ddl in _FTS_TABLES.items():
+        if name not in existing:
+            conn.exec_driver_sql(ddl)
+            created.append(name)
+    for ddl in _FTS_TRIGGERS:
+        conn.exec_driver_sql(ddl)
+    for name in created:
+        conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+        logger.info(f"Search index {name} created and backfilled")
+
+
+def rebuild_search_index(conn: Connection) -> None:
+    """
+    按原表内容重建全部 FTS5 索引，并合并索引段。
+    用于回填旧数据或怀疑索引与原表不一致时。
+    """
+    ensure_search_schema(conn)
+    for name in _FTS_TABLES:
+        conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+        conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('optimize')")
+
+
+def build_match_query(q: str) -> str:
+    """
+    把用户输入转成安全的 FTS5 查询：每个词加引号后取 AND，
+    词尾的 * 保留为前缀匹配；引号、括号、NEAR 等 FTS 语法一律按普通文本处理。
+    """
+    terms = []
+    for term in _TERM_RE.findall(q):
+        prefix = term.endswith("*")
+        word = term.rstrip("*")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    if not terms:
+        raise EmptySearchQuery(q)
+    return " AND ".join(terms)
+
+
+# 每个来源各取前 offset + limit 条（FTS5 对 ORDER BY ... LIMIT 做了 top-N 优化），再在内存里合并
+_REVIEWS_SQL = """
+    SELECT 'review' AS kind, s.submission_id AS submission_id, s.file_name AS file_name,
+           rr.review_result_id AS review_result_id, r.reviewer_id AS reviewer_id,
+           snippet(reviews_fts, 0, :open, :close, '…', :tokens) AS snippet,
+           bm25(reviews_fts) AS rank, rr.generated_at AS at
+    FROM reviews_fts
+    JOIN reviews r ON r.id = reviews_fts.rowid
+    JOIN review_results rr ON rr.id = r.review_result_id
+    JOIN submissions s ON s.id = rr.submission_db_id
+    WHERE reviews_fts MATCH :match
+    ORDER BY {order}
+    LIMIT :n
+"""
+
+_SUBMISSIONS_SQL = """
+    SELECT 'submission' AS kind, s.submission_id AS submission_id, s.file_name AS file_name,
+           NULL AS review_result_id, NULL AS reviewer_id,
+           snippet(submissions_fts, -1, :open, :close, '…', :tokens) AS snippet,
+           bm25(submissions_fts, 2.0, 1.0) AS rank, s.created_at AS at
+    FROM submissions_fts
+    JOIN submissions s ON s.id = submissions_fts.rowid
+    WHERE submissions_fts MATCH :match
+    ORDER BY {order}
+    LIMIT :n
+"""
+
+_SCOPE_SOURCES = {
+    "reviews": [("reviews_fts", _REVIEWS_SQL)],
+    "submissions": [("submissions_fts", _SUBMISSIONS_SQL)],
+    "all": [("reviews_fts", _REVIEWS_SQL), ("submissions_fts", _SUBMISSIONS_SQL)],
+}
+
+
+def search(
+    db: Session,
+    q: str,
+    scope: str = "all",
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
+) -> SearchResponse:
+    """
+    全文检索，scope 为 reviews / submissions / all。
+    命中数不超过 SEARCH_RANK_MAX_HITS 时按 BM25 相关度排序（rank 越大越相关）；
+    超过时说明检索词几乎出现在所有文档中，BM25 区分度接近 0 而计算量与命中数成正比，
+    此时改为按时间倒序返回（order = "recent"）。
+    """
+    match = build_match_query(q)
+    sources = _SCOPE_SOURCES[scope]
+
+    total = 0
+    for table, _ in sources:
+        total += db.execute(
+            text(f"SELECT count(*) FROM {table} WHERE {table} MATCH :match"), {"match": match}
+        ).scalar_one()
+    ranked = total <= SEARCH_RANK_MAX_HITS
+
+    params = {
+        "match": match,
+        "open": SNIPPET_OPEN,
+        "close": SNIPPET_CLOSE,
+        "tokens": SNIPPET_TOKENS,
+        "n": offset + limit,
+    }
+    rows = []
+    for table, sql in sources:
+        order = "rank" if ranked else f"{table}.rowid DESC"
+        rows.extend(db.execute(text(sql.format(order=order)), params).mappings().all())
+
+    if ranked:
+        rows.sort(key=lambda row: row["rank"])
+    else:
+        rows.sort(key=lambda row: row["at"], reverse=True)
+    rows = rows[offset : offset + limit]
+
+    return SearchResponse(
+        query=q,
+        order="relevance" if ranked else "recent",
+        total=total,
+        items=[
+            SearchHit(
+                kind=row["kind"],
+                submission_id=row["submission_id"],
+                file_name=row["file_name"],
+                review_result_id=row["review_result_id"],
+                reviewer_id=row["reviewer_id"],
+                snippet=row["snippet"],
+                rank=round(-row["rank"], 4),
+            )
+            for row in rows
+        ],
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行：python -m backend.app.search rebuild
+    """
+    parser = argparse.ArgumentParser(description="Manage the full-text search index")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args(argv)
+
+    from backend.app.db import engine, init_db
+
+    if args.command == "rebuild":
+        init_db()
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            rebuild_search_index(conn)
+            counts = {
+                name: conn.exec_driver_sql(f"SELECT count(*) FROM {name}").scalar()
+                for name in ("reviews", "submissions")
+            }
+        print(
+            f"Rebuilt search index in {time.perf_counter() - started:.2f}s "
+            f"({counts['reviews']} reviews, {counts['submissions']} submissions)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
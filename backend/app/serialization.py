@@ -0,0 +1,18 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时用标准库 json
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    序列化为 UTF-8 JSON（不转义非 ASCII 字符），装了 orjson 时用 orjson，快数倍。
+    用于绕过 response_model 的路径：SSE 事件、NDJSON 导出。
+    带 response_model 的接口由 FastAPI 经 pydantic-core 直接生成 JSON 字节，不经过这里。
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
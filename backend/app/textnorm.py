@@ -0,0 +1,165 @@
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+# cspaper.llm 的子 logger：统计信息与模型调用日志一起写入 llm.log
+logger = logging.getLogger("cspaper.llm.textnorm")
+
+# 送入模型前是否规整文本；llm.PROMPT_VERSION 随之变化，审稿缓存不会混用两种结果
+TEXT_NORMALIZE = os.getenv("TEXT_NORMALIZE", "1") != "0"
+# 是否把参考文献列表压缩成一行条目数说明
+TEXT_NORMALIZE_DROP_REFERENCES = os.getenv("TEXT_NORMALIZE_DROP_REFERENCES", "1") != "0"
+
+# 出现至少这么多次的短行视为页眉 / 页脚 / 图中重复标签
+REPEATED_LINE_MIN_COUNT = 3
+REPEATED_LINE_MAX_CHARS = 80
+
+# pypdf 对缺少 ToUnicode 映射的字形输出 /uniXXXX
+_GLYPH_NAME_RE = re.compile(r"/uni([0-9A-Fa-f]{4})")
+# 连字与 LaTeX 常见字体里被错误映射的符号（\times 被提取成 ⇥）
+_CHAR_MAP = str.maketrans(
+    {
+        "\ufb00": "ff",
+        "\ufb01": "fi",
+        "\ufb02": "fl",
+        "\ufb03": "ffi",
+        "\ufb04": "ffl",
+        "\ufb05": "ft",
+        "\ufb06": "st",
+        "\u21e5": "\u00d7",
+    }
+)
+# 制表符、不换行空格及各种宽度的空格
+_SPACES_RE = re.compile(r"[ \t\u00a0\u2000-\u200a\u202f\u3000]+")
+_PAGE_NUMBER_RE = re.compile(r"^(?:page\s+)?\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?$", re.IGNORECASE)
+_LETTER_RUN_RE = re.compile(r"[^\W\d_]{2,}")
+_DIGITS_RE = re.compile(r"\d+")
+_DECIMAL_RE = re.compile(r"\d[.,]\d|\d%")
+# 代码与公式里常见的运算符：带这些字符的行不当作重复标签或碎片删除
+_CODE_CHARS_RE = re.compile(r"[=<>|&;{}]")
+# 行尾连字符断词：learn-\ning -> learning（中间可能隔着被删掉的页眉页脚留下的空行）
+_HYPHEN_BREAK_RE = re.compile(r"([a-z])-\n+([a-z])")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_REFERENCE_ENTRY_RE = re.compile(r"^\s*\[\d+\]", re.MULTILINE)
+
+
+@dataclass
+class NormalizationStats:
+    chars_before: int
+    chars_after: int = 0
+    # 各规则删除的行数，便于排查误删
+    dropped_lines: Dict[str, int] = field(default_factory=dict)
+    reference_chars: int = 0
+
+    @property
+    def reduction(self) -> float:
+        return 1 - self.chars_after / self.chars_before if self.chars_before else 0.0
+
+
+def _clean_chars(text: str) -> str:
+    text = _GLYPH_NAME_RE.sub(lambda m: chr(int(m.group(1), 16)), text)
+    text = text.translate(_CHAR_MAP)
+    # 控制字符、格式字符（软连字符、零宽空格等）、私用区字符（字体里的自定义符号）、代理对残片
+    return "".join(
+        ch for ch in text
+        if ch in "\n\t" or unicodedata.category(ch) not in ("Cc", "Co", "Cs", "Cf")
+    )
+
+
+def _is_noise_line(line: str) -> bool:
+    # 坐标轴刻度、公式编号等：没有任何两个字母以上的词，也不像代码或等式
+    return not _LETTER_RUN_RE.search(line) and not _CODE_CHARS_RE.search(line)
+
+
+def _is_repeated_line(line: str, repeated: Counter) -> bool:
+    # 页眉页脚与图中反复出现的标签；代码行（如多处出现的 "x = 0"）保留
+    return (
+        len(line) <= REPEATED_LINE_MAX_CHARS
+        and repeated[_repeat_key(line)] >= REPEATED_LINE_MIN_COUNT
+        and not _CODE_CHARS_RE.search(line)
+    )
+
+
+def _repeat_key(line: str) -> str:
+    # 页眉页脚里的页码、年份各页不同，比较前抹掉数字；
+    # 带小数或百分比的行多是表格数据，只有逐字重复才算
+    return line if _DECIMAL_RE.search(line) else _DIGITS_RE.sub("#", line)
+
+
+def _drop_lines(text: str, stats: NormalizationStats) -> str:
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in text.splitlines()]
+    repeated = Counter(_repeat_key(line) for line in lines if 0 < len(line) <= REPEATED_LINE_MAX_CHARS)
+    dropped = Counter()
+    kept: List[str] = []
+    for line in lines:
+        if not line:
+            kept.append(line)
+        elif _PAGE_NUMBER_RE.match(line):
+            dropped["page_number"] += 1
+        elif _is_repeated_line(line, repeated):
+            dropped["repeated"] += 1
+        elif _is_noise_line(line):
+            dropped["noise"] += 1
+        else:
+            kept.append(line)
+    stats.dropped_lines = dict(dropped)
+    return "\n".join(kept)
+
+
+def _condense_references(text: str, stats: NormalizationStats) -> str:
+    # chunking 依赖 llm，而 llm 在导入时读取本模块的开关，这里延迟导入避免循环
+    from backend.app.chunking import split_sections
+
+    sections = split_sections(text)
+    if not any(s.kind == "references" for s in sections):
+        return text
+    parts = []
+    for section in sections:
+        if section.kind == "references":
+            entries = len(_REFERENCE_ENTRY_RE.findall(section.text))
+            summary = f"[{entries} entries omitted]" if entries else "[list omitted]"
+            stats.reference_chars += len(section.text)
+            parts.append(f"{section.title}\n{summary}")
+        else:
+            parts.append(section.text)
+    return "\n\n".join(parts)
+
+
+def normalize_paper_text(text: str) -> Tuple[str, NormalizationStats]:
+    """
+    在不改变论文内容的前提下压缩 pypdf 的原始输出：
+    修复连字与 /uniXXXX 字形名，去掉控制字符、页码、重复出现的页眉页脚与图中标签、
+    没有文字的公式 / 刻度碎片，合并行尾连字符断词，参考文献列表压缩为条目数。
+    保留换行结构，章节标题检测（长文档分块）不受影响。
+    """
+    stats = NormalizationStats(chars_before=len(text))
+    text = _clean_chars(text)
+    text = _drop_lines(text, stats)
+    text = _HYPHEN_BREAK_RE.sub(r"\1\2", text)
+    if TEXT_NORMALIZE_DROP_REFERENCES:
+        text = _condense_references(text, stats)
+    text = _BLANK_LINES_RE.sub("\n\n", text).strip()
+    stats.chars_after = len(text)
+    return text, stats
+
+
+def prepare_prompt_text(text: str) -> str:
+    """
+    流水线在调用模型前使用：按 TEXT_NORMALIZE 规整文本，并把前后字符数、估算 token 数写入 llm.log。
+    """
+    if not TEXT_NORMALIZE:
+        return text
+    from backend.app.chunking import estimate_tokens
+
+    normalized, stats = normalize_paper_text(text)
+    logger.info(
+        f"Normalized paper text: chars_before={stats.chars_before}, chars_after={stats.chars_after}, "
+        f"est_tokens_before={estimate_tokens(text)}, est_tokens_after={estimate_tokens(normalized)}, "
+        f"reduction={stats.reduction:.1%}, dropped_lines={stats.dropped_lines}, "
+        f"reference_chars={stats.reference_chars}"
+    )
+    return normalized
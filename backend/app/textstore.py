@@ -0,0 +1,100 @@
+import logging
+import os
+import zlib
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from backend.app.models import ExtractedTextORM, SubmissionSourceORM
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时用标准库 zlib
+    zstandard = None
+
+logger = logging.getLogger("cspaper.textstore")
+
+# 新写入全文的压缩算法：装了 zstandard 默认 zstd，否则 zlib。读取时按每行记录的 codec 解压
+TEXT_STORE_CODEC = os.getenv("TEXT_STORE_CODEC", "zstd" if zstandard is not None else "zlib")
+TEXT_STORE_ZSTD_LEVEL = int(os.getenv("TEXT_STORE_ZSTD_LEVEL", "10"))
+TEXT_STORE_ZLIB_LEVEL = int(os.getenv("TEXT_STORE_ZLIB_LEVEL", "6"))
+
+
+class TextStoreError(Exception):
+    pass
+
+
+def compress_text(text: str, codec: str = TEXT_STORE_CODEC) -> Tuple[str, bytes]:
+    raw = text.encode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise TextStoreError("codec zstd requires the zstandard package")
+        return codec, zstandard.ZstdCompressor(level=TEXT_STORE_ZSTD_LEVEL).compress(raw)
+    if codec == "zlib":
+        return codec, zlib.compress(raw, TEXT_STORE_ZLIB_LEVEL)
+    raise TextStoreError(f"unknown codec: {codec}")
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise TextStoreError("codec zstd requires the zstandard package")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise TextStoreError(f"unknown codec: {codec}")
+    return raw.decode("utf-8")
+
+
+def load_text(db: Session, content_hash: str) -> Optional[str]:
+    """
+    按 PDF 内容哈希读取全文；没有记录或无法解压（例如缺少 zstandard）时返回 None，
+    调用方回退为重新解析 PDF。
+    """
+    row = db.execute(
+        select(ExtractedTextORM.codec, ExtractedTextORM.data)
+        .where(ExtractedTextORM.content_hash == content_hash)
+    ).one_or_none()
+    if row is None:
+        return None
+    try:
+        return decompress_text(row.codec, row.data)
+    except Exception as e:
+        logger.warning(f"Stored text {content_hash[:12]} unreadable ({row.codec}): {e}")
+        return None
+
+
+def store_text(db: Session, content_hash: str, text: str) -> None:
+    """
+    写入全文；同一内容哈希已存在时保持原记录。不提交事务，由调用方提交。
+    """
+    codec, data = compress_text(text)
+    db.execute(
+        sqlite_insert(ExtractedTextORM)
+        .values(content_hash=content_hash, codec=codec, data=data, char_count=len(text))
+        .on_conflict_do_nothing(index_elements=[ExtractedTextORM.content_hash])
+    )
+    logger.info(
+        f"Stored text {content_hash[:12]}: {len(text)} chars -> {len(data)} bytes ({codec})"
+    )
+
+
+def link_submission(db: Session, submission_db_id: int, content_hash: str) -> None:
+    """
+    记录 submission 的 PDF 内容哈希。不提交事务。
+    """
+    db.execute(
+        sqlite_insert(SubmissionSourceORM)
+        .values(submission_db_id=submission_db_id, content_hash=content_hash)
+        .on_conflict_do_nothing(index_elements=[SubmissionSourceORM.submission_db_id])
+    )
+
+
+def submission_content_hash(db: Session, submission_db_id: int) -> Optional[str]:
+    return db.execute(
+        select(SubmissionSourceORM.content_hash)
+        .where(SubmissionSourceORM.submission_db_id == submission_db_id)
+    ).scalar_one_or_none()
@@ -0,0 +1,296 @@
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import python_multipart
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.multipart import parse_options_header
+
+from backend.app.db import BASE_DIR
+
+# 上传内容落盘目录：请求处理中的临时文件与排队任务的 PDF 都放在这里
+UPLOAD_DIR = BASE_DIR / "instance" / "uploads"
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+# 每个上传文件在内存里最多缓冲这么多字节，超过后写入落盘文件；单个请求的峰值内存与文件大小无关
+UPLOAD_BUFFER_BYTES = int(os.getenv("UPLOAD_BUFFER_BYTES", str(CHUNK_SIZE)))
+# multipart 边界、各部分头部与零散表单字段的余量
+MULTIPART_OVERHEAD = 64 * 1024
+# 规范允许 %PDF- 前有少量垃圾字节，阅读器在前 1024 字节内查找文件头
+PDF_HEADER_WINDOW = 1024
+# 最后一次修订的 startxref 与 %%EOF 应位于文件末尾
+PDF_TRAILER_WINDOW = 8 * 1024
+
+_PDF_MAGIC = b"%PDF-"
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)\s*%%EOF")
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"upload exceeds {limit} bytes")
+        self.size = size
+        self.limit = limit
+
+
+class InvalidUpload(Exception):
+    """
+    请求体不是合格的 PDF 上传：缺少文件、文件头不是 %PDF、文件尾缺少 xref、文件数超限等。
+    """
+    def __init__(self, code: str, message: str, details: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = details
+
+
+@dataclass
+class SpooledUpload:
+    """
+    已落盘的上传文件。流水线只持有路径与元数据，不把整份 PDF 留在内存里。
+    """
+    path: Path
+    file_name: str
+    size: int
+    sha256: str
+
+    def cleanup(self) -> None:
+        try:
+            self.path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    @classmethod
+    def from_path(cls, path: Path, file_name: str) -> "SpooledUpload":
+        """
+        从已有文件构造（例如排队任务重启后重新加载），流式计算哈希。
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        return cls(path=Path(path), file_name=file_name, size=size, sha256=digest.hexdigest())
+
+
+def _new_spool_file():
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(prefix="upload_", suffix=".pdf", dir=UPLOAD_DIR)
+    return os.fdopen(fd, "wb"), Path(name)
+
+
+def _check_pdf_trailer(tail: bytes, size: int) -> bool:
+    """
+    文件尾应有 startxref <偏移> %%EOF，且偏移落在文件内。
+    中途断开的上传、截断的下载在这里就能发现，不必等到解析阶段。
+    """
+    matches = list(_STARTXREF_RE.finditer(tail))
+    return bool(matches) and int(matches[-1].group(1)) < size
+
+
+class _FilePart:
+    """
+    正在接收的一个文件部分：数据先进内存缓冲，攒满 UPLOAD_BUFFER_BYTES 后在线程池里
+    写入落盘文件并更新 sha256；只保留文件尾最后 PDF_TRAILER_WINDOW 字节用于检查 xref。
+    """
+    def __init__(self, file_name: str, max_bytes: int):
+        self.file_name = file_name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.buffer = bytearray()
+        self.sniffed = False
+        self.digest = hashlib.sha256()
+        self.tail = b""
+        self.out, self.path = _new_spool_file()
+
+    def feed(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(self.size, self.max_bytes)
+        self.buffer += data
+        if not self.sniffed and len(self.buffer) >= PDF_HEADER_WINDOW:
+            self.sniff()
+
+    def sniff(self) -> None:
+        # 不信任客户端声明的 Content-Type，只看文件头
+        if _PDF_MAGIC not in self.buffer[:PDF_HEADER_WINDOW]:
+            raise InvalidUpload(
+                "INVALID_FILE_TYPE",
+                "仅支持上传 PDF 文件。",
+                {"file_name": self.file_name, "reason": "missing %PDF header"},
+            )
+        self.sniffed = True
+
+    def flush(self) -> None:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.digest.update(data)
+        self.out.write(data)
+        self.tail = (self.tail + data[-PDF_TRAILER_WINDOW:])[-PDF_TRAILER_WINDOW:]
+
+    def finish(self) -> SpooledUpload:
+        if not self.sniffed:
+            self.sniff()
+        self.flush()
+        self.out.close()
+        if not _check_pdf_trailer(self.tail, self.size):
+            raise InvalidUpload(
+                "INVALID_PDF",
+                "PDF 文件不完整或已损坏（文件尾缺少 xref 信息）。",
+                {"file_name": self.file_name, "size": self.size},
+            )
+        return SpooledUpload(path=self.path, file_name=self.file_name, size=self.size, sha256=self.digest.hexdigest())
+
+    def discard(self) -> None:
+        self.out.close()
+        self.path.unlink(missing_ok=True)
+
+
+class _UploadReceiver:
+    """
+    流式解析 multipart 请求体：字段名为 field 的文件部分边收边落盘，其余部分直接丢弃。
+    解析回调里只做内存操作；磁盘写入在每块数据喂给解析器之后统一放进线程池。
+    """
+    def __init__(self, field: str, max_files: int, max_bytes: int):
+        self.field = field
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.files = 0
+        self.current: Optional[_FilePart] = None
+        self.to_finish: List[_FilePart] = []
+        self.open_parts: List[_FilePart] = []
+        self.uploads: List[SpooledUpload] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self) -> None:
+        self.current = None
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if options.get(b"name", b"").decode("utf-8", "replace") != self.field or b"filename" not in options:
+            return
+        self.files += 1
+        if self.files > self.max_files:
+            raise InvalidUpload(
+                "TOO_MANY_FILES",
+                f"单次请求最多包含 {self.max_files} 个文件。",
+                {"limit": self.max_files},
+            )
+        file_name = options[b"filename"].decode("utf-8", "replace") or "paper.pdf"
+        self.current = _FilePart(file_name, self.max_bytes)
+        self.open_parts.append(self.current)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self.current is not None:
+            self.current.feed(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self.current is not None:
+            self.to_finish.append(self.current)
+            self.current = None
+
+    async def drain(self) -> None:
+        part = self.current
+        # 文件头检查之前不落盘，保证嗅探看到的是文件最前面的字节
+        if part is not None and part.sniffed and len(part.buffer) >= UPLOAD_BUFFER_BYTES:
+            await run_in_threadpool(part.flush)
+        for part in self.to_finish:
+            self.uploads.append(await run_in_threadpool(part.finish))
+            self.open_parts.remove(part)
+        self.to_finish.clear()
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+
+def _content_length(request: Request) -> Optional[int]:
+    try:
+        return int(request.headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def receive_pdf_uploads(
+    request: Request,
+    field: str,
+    max_bytes: int,
+    max_files: int = 1,
+) -> List[SpooledUpload]:
+    """
+    直接从请求体流中接收 multipart 上传的 PDF，不经过 UploadFile（它要等整个请求体收完才交给接口）：
+    Content-Length 超限时不读请求体直接拒绝；接收中任一文件超过 max_bytes 立即中止；
+    收到前 1KB 即检查 %PDF 文件头，文件收完检查文件尾的 startxref / %%EOF。
+    数据按 UPLOAD_BUFFER_BYTES 分块写入 UPLOAD_DIR，单个请求的内存占用与文件大小无关。
+    失败时删除已落盘的部分并抛出 UploadTooLarge / InvalidUpload；成功时调用方负责 cleanup()。
+    """
+    max_body = max_files * max_bytes + MULTIPART_OVERHEAD
+    declared = _content_length(request)
+    if declared is not None and declared > max_body:
+        raise UploadTooLarge(declared, max_body)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise InvalidUpload("MISSING_FILE", f"必须以 multipart/form-data 上传名为 {field} 的 PDF 文件。")
+
+    receiver = _UploadReceiver(field, max_files, max_bytes)
+    parser = python_multipart.MultipartParser(params[b"boundary"], receiver.callbacks())
+    received = 0
+    try:
+        # 没有 Content-Length（分块传输）时按实际收到的字节数限制
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise UploadTooLarge(received, max_body)
+            parser.write(chunk)
+            await receiver.drain()
+        parser.finalize()
+        await receiver.drain()
+    except python_multipart.exceptions.FormParserError as e:
+        _discard(receiver)
+        raise InvalidUpload("INVALID_MULTIPART", "上传请求体格式错误。", {"reason": str(e)})
+    except BaseException:
+        _discard(receiver)
+        raise
+
+    if receiver.open_parts:
+        # 请求体在某个文件中途结束（客户端断开或边界缺失）
+        _discard(receiver)
+        raise InvalidUpload("INVALID_MULTIPART", "上传请求体不完整。")
+    if not receiver.uploads:
+        raise InvalidUpload("MISSING_FILE", f"必须提供一个名为 {field} 的 PDF 文件。")
+    return receiver.uploads
+
+
+def _discard(receiver: _UploadReceiver) -> None:
+    for part in receiver.open_parts:
+        part.discard()
+    for upload in receiver.uploads:
+        upload.cleanup()
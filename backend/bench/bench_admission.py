@@ -0,0 +1,161 @@
+"""
+Overload behaviour of POST /api/review with and without admission control.
+
+Requests arrive open-loop at --rate per second for --duration seconds, spread
+over --clients client addresses, in-process over ASGI. The model is the
+FakeProvider (--llm-latency seconds per call) behind LLM_MAX_CONCURRENCY =
+--capacity, so the service can finish about capacity / latency reviews per
+second; pick --rate above that to overload it.
+
+For each run the script reports, per outcome:
+
+  * ok: p50/p99 latency, and goodput - answers that arrived within
+    --client-timeout, i.e. before a real client would have given up;
+  * rejected (429/503): how fast the rejection came back and the median
+    Retry-After.
+
+Without admission control every request queues on the model semaphore and the
+queue grows for as long as the overload lasts, so latency keeps climbing. With
+it, at most --capacity reviews run, a bounded queue waits at most --max-wait
+seconds and the rest are turned away within milliseconds.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_admission --rate 8 --duration 15 --capacity 4 --llm-latency 1.0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_PDF = REPO_ROOT / "https:arxiv.org:pdf:1512.pdf"
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+async def _run(pdf_bytes: bytes, args) -> Dict[str, list]:
+    import httpx
+    from backend import main
+
+    clients = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app, client=(f"10.0.0.{i + 1}", 40000)),
+            base_url="http://bench",
+            timeout=None,
+        )
+        for i in range(args.clients)
+    ]
+    outcomes: Dict[str, list] = {"ok": [], "rejected": [], "retry_after": [], "failed": []}
+
+    async def one(client) -> None:
+        started = time.perf_counter()
+        resp = await client.post(
+            "/api/review?refresh=true", files={"file": ("paper.pdf", pdf_bytes, "application/pdf")}
+        )
+        elapsed = time.perf_counter() - started
+        if resp.status_code == 200:
+            outcomes["ok"].append(elapsed)
+        elif resp.status_code in (429, 503):
+            outcomes["rejected"].append(elapsed)
+            outcomes["retry_after"].append(int(resp.headers.get("Retry-After", "0")))
+        else:
+            outcomes["failed"].append(elapsed)
+
+    try:
+        await one(clients[0])  # 预热：进程池、数据库连接
+        for key in outcomes:
+            outcomes[key].clear()
+        tasks = []
+        total = int(args.rate * args.duration)
+        started = time.perf_counter()
+        for i in range(total):
+            delay = started + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(clients[i % len(clients)])))
+        await asyncio.gather(*tasks)
+    finally:
+        for client in clients:
+            await client.aclose()
+    return outcomes
+
+
+def _report(label: str, outcomes: Dict[str, list], args) -> None:
+    ok = outcomes["ok"]
+    rejected = outcomes["rejected"]
+    good = sum(1 for t in ok if t <= args.client_timeout)
+    print(label)
+    if ok:
+        print(
+            f"  ok        {len(ok):4d}  p50 {_percentile(ok, 0.5):6.2f}s  p99 {_percentile(ok, 0.99):6.2f}s  "
+            f"max {max(ok):6.2f}s  within {args.client_timeout:.0f}s: {good} "
+            f"({good / args.duration:.2f}/s goodput)"
+        )
+    if rejected:
+        print(
+            f"  rejected  {len(rejected):4d}  p50 {_percentile(rejected, 0.5) * 1000:6.1f}ms  "
+            f"p99 {_percentile(rejected, 0.99) * 1000:6.1f}ms  "
+            f"median Retry-After {statistics.median(outcomes['retry_after']):.0f}s"
+        )
+    if outcomes["failed"]:
+        print(f"  failed    {len(outcomes['failed']):4d}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, default=DEFAULT_PDF)
+    parser.add_argument("--rate", type=float, default=8.0, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of arrivals")
+    parser.add_argument("--clients", type=int, default=20, help="distinct client addresses")
+    parser.add_argument("--capacity", type=int, default=4, help="LLM_MAX_CONCURRENCY and admission in-flight cap")
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=5.0)
+    parser.add_argument("--client-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-admission-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.capacity)
+
+    from backend.app.admission import admission
+    from backend.app.db import init_db
+    from backend.app.pdf_utils import shutdown_pdf_pool
+    from backend.app.providers import FakeProvider, LLMRouter, set_router
+
+    init_db()
+    set_router(LLMRouter([FakeProvider(latency=args.llm_latency, jitter=0.0, error_rate=0.0)]))
+    pdf_bytes = args.pdf.read_bytes()
+    print(
+        f"{args.rate:.1f} req/s for {args.duration:.0f}s against ~{args.capacity / args.llm_latency:.1f} req/s "
+        f"of capacity ({args.capacity} x {args.llm_latency:.1f}s model calls)"
+    )
+    try:
+        for label, max_in_flight in (("without admission control", 0), ("with admission control", args.capacity)):
+            admission.max_in_flight = max_in_flight
+            admission.max_per_client = 2
+            admission.max_queue = args.max_queue
+            admission.max_wait = args.max_wait
+            admission.service_seconds = args.llm_latency
+            _report(label, asyncio.run(_run(pdf_bytes, args)), args)
+    finally:
+        shutdown_pdf_pool()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Score analytics: scanning `scores` vs the incrementally maintained summary tables.
+
+Seeds a temporary SQLite database with --reviews results (four scores each, the
+same data as bench_history), backfills score_daily_stats / score_histogram,
+then times for both approaches:
+
+  * the percentile rank of one score in one dimension;
+  * the full dashboard payload: per-dimension mean/std/quantiles and 30 days of
+    daily trends.
+
+It also measures what the summary costs on the write path, by timing
+--writes persist_review calls with and without the aggregate update.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_analytics --reviews 200000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from backend.bench.bench_history import _seed
+
+_SCAN_RANK = (
+    "SELECT COUNT(*), SUM(value < :v), SUM(value = :v) FROM scores WHERE dimension = :d"
+)
+_SCAN_SUMMARY = (
+    "SELECT dimension, COUNT(*), AVG(value), AVG(value * value) - AVG(value) * AVG(value), MIN(value), MAX(value) "
+    "FROM scores GROUP BY dimension"
+)
+_SCAN_QUANTILES = "SELECT dimension, value, COUNT(*) FROM scores GROUP BY dimension, value"
+_SCAN_DAILY = (
+    "SELECT date(r.generated_at) AS day, s.dimension, COUNT(*), AVG(s.value) "
+    "FROM scores s JOIN review_results r ON r.id = s.review_result_id "
+    "WHERE r.generated_at >= (SELECT datetime(MAX(generated_at), '-30 days') FROM review_results) "
+    "GROUP BY day, s.dimension"
+)
+
+
+def _best(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _persist_many(count: int) -> float:
+    from backend.app.db import SessionLocal
+    from backend.app.pipeline import persist_review
+
+    llm_result = {
+        "scores": [
+            {"dimension": d, "value": 3.5}
+            for d in ("novelty", "technical_quality", "clarity", "significance")
+        ],
+        "reviews": [{"reviewer_id": f"reviewer_{k}", "text": "review text " * 40} for k in range(1, 5)],
+    }
+    started = time.perf_counter()
+    for _ in range(count):
+        db = SessionLocal()
+        try:
+            persist_review(db, "paper.pdf", 1000, "preview", llm_result)
+        finally:
+            db.close()
+    return (time.perf_counter() - started) / count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=200000)
+    parser.add_argument("--writes", type=int, default=300, help="persist_review calls per write-path variant")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-analytics-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/analytics.db"
+    try:
+        from sqlalchemy import text
+
+        from backend.app import pipeline
+        from backend.app.analytics import rebuild_score_stats, score_analytics, score_rank
+        from backend.app.db import SessionLocal, engine, init_db
+
+        init_db()
+        started = time.perf_counter()
+        _seed(engine, args.reviews)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+        print(f"seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            rebuild_score_stats(conn)
+        print(f"backfilled summary tables in {time.perf_counter() - started:.2f}s")
+
+        db = SessionLocal()
+        try:
+            params = {"d": "clarity", "v": 4.0}
+            rows = [
+                ("rank, scan", lambda: db.execute(text(_SCAN_RANK), params).all()),
+                ("rank, summary", lambda: score_rank(db, "clarity", 4.0)),
+                (
+                    "dashboard, scan",
+                    lambda: [db.execute(text(q)).all() for q in (_SCAN_SUMMARY, _SCAN_QUANTILES, _SCAN_DAILY)],
+                ),
+                # 种子数据的时间从 2024 年开始，回看足够长以覆盖最近 30 天的数据量
+                ("dashboard, summary", lambda: score_analytics(db, 3650)),
+            ]
+            for label, fn in rows:
+                print(f"{label:<22} {_best(fn) * 1000:9.2f} ms")
+        finally:
+            db.close()
+
+        with_stats = _persist_many(args.writes)
+        record_scores = pipeline.record_scores
+        pipeline.record_scores = lambda db, scores, generated_at: None
+        try:
+            without_stats = _persist_many(args.writes)
+        finally:
+            pipeline.record_scores = record_scores
+        print(
+            f"persist_review: {without_stats * 1000:.2f} ms without aggregates, "
+            f"{with_stats * 1000:.2f} ms with aggregates"
+        )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
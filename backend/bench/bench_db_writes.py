@@ -0,0 +1,136 @@
+"""
+Write-throughput benchmark for review persistence on SQLite.
+
+Compares two setups on fresh temporary databases:
+
+- legacy: default SQLite settings (rollback journal, synchronous=FULL) and the
+  old ORM write path (flush after each parent row, one add per score/review,
+  refresh before building the response)
+- tuned:  WAL + busy_timeout + synchronous=NORMAL (backend.app.db pragmas) and
+  pipeline.persist_review (INSERT ... RETURNING + executemany, no refresh)
+
+Each setup is run with --writers threads, each persisting --reviews-per-writer
+reviews, and reports reviews/s plus how many writes failed with
+"database is locked".
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_db_writes --writers 8 --reviews-per-writer 100
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.db import Base, apply_sqlite_pragmas
+from backend.app.models import ReviewORM, ReviewResultORM, ScoreORM, SubmissionORM
+from backend.app.pipeline import build_review_response, persist_review
+
+LLM_RESULT = {
+    "scores": [
+        {"dimension": "novelty", "value": 4.0},
+        {"dimension": "technical_quality", "value": 3.5},
+        {"dimension": "clarity", "value": 4.0},
+        {"dimension": "significance", "value": 3.5},
+    ],
+    "reviews": [
+        {"reviewer_id": f"reviewer_{i}", "text": "A reasonably long review comment. " * 30}
+        for i in range(1, 5)
+    ],
+}
+PREVIEW = "Deep Residual Learning for Image Recognition " * 18
+
+
+def _persist_legacy(db, file_name, file_size, preview, llm_result):
+    # 优化前的写法：逐行 add + 两次 flush + refresh 后懒加载关系组装响应
+    sub = SubmissionORM(
+        submission_id=f"sub_{time.perf_counter_ns()}_{threading.get_ident()}",
+        file_name=file_name,
+        file_size=file_size,
+        text_preview=preview,
+    )
+    db.add(sub)
+    db.flush()
+    rr = ReviewResultORM(
+        review_result_id=f"rev_{time.perf_counter_ns()}_{threading.get_ident()}",
+        submission_id=sub.submission_id,
+        submission_db_id=sub.id,
+    )
+    db.add(rr)
+    db.flush()
+    for item in llm_result["scores"]:
+        db.add(ScoreORM(review_result_id=rr.id, dimension=item["dimension"], value=item["value"]))
+    for item in llm_result["reviews"]:
+        db.add(ReviewORM(review_result_id=rr.id, reviewer_id=item["reviewer_id"], text=item["text"]))
+    db.commit()
+    db.refresh(sub)
+    db.refresh(rr)
+    return build_review_response(sub, rr)
+
+
+def _run(name: str, tuned: bool, writers: int, per_writer: int, tmp_dir: Path) -> None:
+    engine = create_engine(
+        f"sqlite:///{tmp_dir / (name + '.db')}",
+        connect_args={"check_same_thread": False},
+    )
+    if tuned:
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    persist = persist_review if tuned else _persist_legacy
+
+    locked = 0
+    lock = threading.Lock()
+
+    def writer() -> None:
+        nonlocal locked
+        for _ in range(per_writer):
+            db = Session()
+            try:
+                persist(db, "paper.pdf", 123456, PREVIEW, LLM_RESULT)
+            except OperationalError as e:
+                db.rollback()
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    locked += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    total = writers * per_writer
+    written = total - locked
+    print(
+        f"{name:<7} {written}/{total} reviews in {elapsed:.2f}s "
+        f"({written / elapsed:.0f} reviews/s), database is locked: {locked}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--reviews-per-writer", type=int, default=100)
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="cspaper-bench-db-"))
+    _run("legacy", False, args.writers, args.reviews_per_writer, tmp_dir)
+    _run("tuned", True, args.writers, args.reviews_per_writer, tmp_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
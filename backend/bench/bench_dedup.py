@@ -0,0 +1,146 @@
+"""
+Near-duplicate lookup cost and detection quality.
+
+Seeds a temporary database with --papers random documents and their MinHash
+fingerprints / LSH buckets, then:
+
+- times compute_fingerprint on a paper-sized text;
+- times find_near_duplicates (LSH candidates only) against a linear scan
+  comparing the query signature with every stored signature;
+- reports how often a revised copy of a stored paper (a fraction of the text
+  rewritten in 40-word passages) is found above NEAR_DUPLICATE_THRESHOLD.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_dedup --papers 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def _document(rng: random.Random, vocab, words: int):
+    return [rng.choice(vocab) for _ in range(words)]
+
+
+def _revise(rng: random.Random, vocab, words, fraction: float, span: int = 40):
+    # 修订通常是改写整段：随机挑若干段连续的 span 个词替换掉
+    revised = list(words)
+    for _ in range(max(1, int(len(words) * fraction) // span)):
+        start = rng.randrange(len(revised) - span)
+        revised[start : start + span] = _document(rng, vocab, span)
+    return revised
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=8000, help="words per synthetic paper")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-dedup-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/dedup.db"
+
+    from sqlalchemy import select
+
+    from backend.app.db import SessionLocal, engine, init_db
+    from backend.app.dedup import (
+        compute_fingerprint,
+        estimate_similarity,
+        find_near_duplicates,
+        lsh_buckets,
+        pack_signature,
+        unpack_signature,
+    )
+    from backend.app.models import SubmissionFingerprintORM, SubmissionLshBucketORM, SubmissionORM
+
+    rng = random.Random(0)
+    vocab = [f"w{i}" for i in range(20000)]
+    init_db()
+
+    # 只保留前 --queries 篇的原文用于构造修订版，其余只写签名
+    originals = []
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        batch = 1000
+        for offset in range(0, args.papers, batch):
+            ids = range(offset + 1, min(args.papers, offset + batch) + 1)
+            fingerprints = []
+            for i in ids:
+                # 库里的大部分论文用短文本生成签名，控制造数时间；签名长度与原文长度无关
+                words = _document(rng, vocab, args.words if i <= args.queries else 300)
+                if i <= args.queries:
+                    originals.append(words)
+                fingerprints.append(compute_fingerprint(" ".join(words)))
+            conn.execute(
+                SubmissionORM.__table__.insert(),
+                [
+                    {"id": i, "submission_id": f"sub_{i:012x}", "file_name": f"paper_{i}.pdf",
+                     "file_size": 1000, "text_preview": ""}
+                    for i in ids
+                ],
+            )
+            conn.execute(
+                SubmissionFingerprintORM.__table__.insert(),
+                [
+                    {"submission_db_id": i, "signature": pack_signature(fp.signature), "shingle_count": fp.shingle_count}
+                    for i, fp in zip(ids, fingerprints)
+                ],
+            )
+            conn.execute(
+                SubmissionLshBucketORM.__table__.insert(),
+                [
+                    {"bucket": bucket, "submission_db_id": i}
+                    for i, fp in zip(ids, fingerprints)
+                    for bucket in lsh_buckets(fp.signature)
+                ],
+            )
+    print(f"seeded {args.papers} fingerprints in {time.perf_counter() - started:.1f}s")
+
+    text = " ".join(originals[0])
+    started = time.perf_counter()
+    for _ in range(5):
+        compute_fingerprint(text)
+    print(f"compute_fingerprint ({args.words} words): {(time.perf_counter() - started) / 5 * 1000:.1f} ms")
+
+    db = SessionLocal()
+    try:
+        query = compute_fingerprint(" ".join(_revise(rng, vocab, originals[0], 0.01)))
+
+        started = time.perf_counter()
+        for _ in range(20):
+            find_near_duplicates(db, query)
+        lsh_ms = (time.perf_counter() - started) / 20 * 1000
+
+        started = time.perf_counter()
+        rows = db.execute(
+            select(SubmissionFingerprintORM.submission_db_id, SubmissionFingerprintORM.signature)
+            .order_by(SubmissionFingerprintORM.submission_db_id)
+        ).all()
+        best = max(rows, key=lambda row: estimate_similarity(query.signature, unpack_signature(row[1])))
+        scan_ms = (time.perf_counter() - started) * 1000
+        print(f"lookup: LSH {lsh_ms:.2f} ms   linear scan {scan_ms:.1f} ms (best match id={best[0]})")
+
+        for fraction in (0.01, 0.03, 0.05, 0.1, 0.2):
+            found = 0
+            similarity = 0.0
+            for i, words in enumerate(originals, start=1):
+                revised = compute_fingerprint(" ".join(_revise(rng, vocab, words, fraction)))
+                similarity += estimate_similarity(revised.signature, unpack_signature(rows[i - 1][1]))
+                matches = find_near_duplicates(db, revised)
+                found += bool(matches and matches[0].submission_db_id == i)
+            print(
+                f"{fraction:>4.0%} of text rewritten: mean similarity {similarity / len(originals):.3f}, "
+                f"reused {found}/{len(originals)}"
+            )
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
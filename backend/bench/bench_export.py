@@ -0,0 +1,166 @@
+"""
+Bulk export: loading ReviewResultORM objects vs the streaming exporter.
+
+Seeds a temporary SQLite database with --reviews results (four scores and four
+review texts each, the same data as bench_history) and writes every result as
+NDJSON to /dev/null in three ways:
+
+  * orm: the ad-hoc script the exporter replaces - query(ReviewResultORM).all(),
+    then touch the lazy submission / scores / reviews relationships per row;
+  * stream ndjson / stream csv: export.stream_export with yield_per batches of
+    --batch-size.
+
+For each it reports wall-clock time, rows per second and, from a second run,
+the peak Python heap (tracemalloc), which for the streaming variants should stay flat as --reviews
+grows. Finally it checks that an incremental export after the watermark only
+reads the rows added since.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_export --reviews 10000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from backend.bench.bench_history import _seed
+
+
+def _orm_export(db, out) -> int:
+    from backend.app.models import ReviewResultORM
+
+    rows = 0
+    for rr in db.query(ReviewResultORM).order_by(ReviewResultORM.id).all():
+        row = {
+            "review_result_id": rr.review_result_id,
+            "submission_id": rr.submission_id,
+            "file_name": rr.submission.file_name,
+            "file_size": rr.submission.file_size,
+            "submitted_at": rr.submission.created_at.isoformat(),
+            "generated_at": rr.generated_at.isoformat(),
+            "scores": {s.dimension: s.value for s in rr.scores},
+            "reviews": [{"reviewer_id": r.reviewer_id, "text": r.text} for r in rr.reviews],
+        }
+        out.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+        rows += 1
+    return rows
+
+
+def _measure(label: str, fn, reviews: int) -> None:
+    # tracemalloc 会让分配密集的代码慢好几倍：计时与测峰值分两次运行
+    started = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - started
+    assert rows == reviews, f"{label}: exported {rows} of {reviews}"
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {elapsed:7.2f}s  {rows / elapsed:9.0f} rows/s  peak heap {peak / 2**20:8.1f} MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--skip-orm", action="store_true", help="skip the ORM baseline (slow for large --reviews)")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-export-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/export.db"
+    try:
+        from backend.app.analytics import rebuild_score_stats
+        from backend.app.db import SessionLocal, engine, init_db
+        from backend.app.export import export_upper_bound, stream_export
+
+        init_db()
+        started = time.perf_counter()
+        _seed(engine, args.reviews)
+        with engine.begin() as conn:
+            rebuild_score_stats(conn)  # CSV 的分数列取自直方图
+        print(f"seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+
+        def streamed(fmt: str):
+            def run() -> int:
+                stats = {"rows": 0}
+                db = SessionLocal()
+                try:
+                    with open(os.devnull, "wb") as out:
+                        for chunk in stream_export(db, fmt, 0, export_upper_bound(db), args.batch_size, stats):
+                            out.write(chunk)
+                finally:
+                    db.close()
+                return stats["rows"]
+
+            return run
+
+        def orm() -> int:
+            db = SessionLocal()
+            try:
+                with open(os.devnull, "wb") as out:
+                    return _orm_export(db, out)
+            finally:
+                db.close()
+
+        if not args.skip_orm:
+            _measure("orm", orm, args.reviews)
+        _measure("stream ndjson", streamed("ndjson"), args.reviews)
+        _measure("stream csv", streamed("csv"), args.reviews)
+
+        # 增量导出：水位之后再写入 1% 的结果，只应读到这些
+        db = SessionLocal()
+        try:
+            watermark = export_upper_bound(db)
+        finally:
+            db.close()
+        added = max(1, args.reviews // 100)
+        from backend.app.models import ReviewResultORM, SubmissionORM
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        with engine.begin() as conn:
+            first = watermark + 1
+            conn.execute(
+                SubmissionORM.__table__.insert(),
+                [
+                    {
+                        "id": i, "submission_id": f"sub_new_{i}", "file_name": f"new_{i}.pdf", "file_size": 1,
+                        "created_at": now, "text_preview": "",
+                    }
+                    for i in range(first, first + added)
+                ],
+            )
+            conn.execute(
+                ReviewResultORM.__table__.insert(),
+                [
+                    {
+                        "id": i, "review_result_id": f"rev_new_{i}", "submission_id": f"sub_new_{i}",
+                        "submission_db_id": i, "generated_at": now,
+                    }
+                    for i in range(first, first + added)
+                ],
+            )
+        db = SessionLocal()
+        try:
+            stats = {"rows": 0}
+            started = time.perf_counter()
+            for _ in stream_export(db, "ndjson", watermark, export_upper_bound(db), args.batch_size, stats):
+                pass
+            print(
+                f"incremental export after watermark {watermark}: {stats['rows']} rows "
+                f"(expected {added}) in {(time.perf_counter() - started) * 1000:.1f} ms"
+            )
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
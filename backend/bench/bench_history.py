@@ -0,0 +1,138 @@
+"""
+Latency of the history endpoints on a large database.
+
+Seeds a temporary SQLite database with --reviews submissions/results (four
+scores and four reviews each), then times the queries behind
+GET /api/submissions, GET /api/reviews (first page, a page deep into the
+history, date range, per-dimension and mean score thresholds) and
+GET /api/reviews/{id}.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_history --reviews 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _seed(engine, count: int) -> None:
+    from backend.app.models import ReviewORM, ReviewResultORM, ScoreORM, SubmissionORM
+
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    batch = 5000
+    dims = ["novelty", "technical_quality", "clarity", "significance"]
+    with engine.begin() as conn:
+        for offset in range(0, count, batch):
+            n = min(batch, count - offset)
+            ids = range(offset + 1, offset + n + 1)
+            times = [start + timedelta(minutes=3 * i) for i in ids]
+            conn.execute(
+                SubmissionORM.__table__.insert(),
+                [
+                    {
+                        "id": i,
+                        "submission_id": f"sub_{i:012x}",
+                        "file_name": f"paper_{i}.pdf",
+                        "file_size": 100000 + i,
+                        "created_at": t,
+                        "text_preview": "preview " * 20,
+                    }
+                    for i, t in zip(ids, times)
+                ],
+            )
+            conn.execute(
+                ReviewResultORM.__table__.insert(),
+                [
+                    {
+                        "id": i,
+                        "review_result_id": f"rev_{i:012x}",
+                        "submission_id": f"sub_{i:012x}",
+                        "submission_db_id": i,
+                        "generated_at": t,
+                    }
+                    for i, t in zip(ids, times)
+                ],
+            )
+            conn.execute(
+                ScoreORM.__table__.insert(),
+                [
+                    {"review_result_id": i, "dimension": d, "value": rng.choice([2.0, 2.5, 3.0, 3.5, 4.0, 4.5])}
+                    for i in ids
+                    for d in dims
+                ],
+            )
+            conn.execute(
+                ReviewORM.__table__.insert(),
+                [
+                    {"review_result_id": i, "reviewer_id": f"reviewer_{k}", "text": "review text " * 40}
+                    for i in ids
+                    for k in range(1, 5)
+                ],
+            )
+
+
+def _time(label: str, fn, repeat: int = 5) -> None:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    size = len(result.items) if hasattr(result, "items") else 1
+    print(f"{label:<38} {best * 1000:8.2f} ms  ({size} rows)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=200000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-history-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/history.db"
+
+    from backend.app.db import SessionLocal, engine, init_db
+    from backend.app.history import list_review_results, list_submissions
+    from backend.app.pipeline import load_review_response
+
+    init_db()
+    started = time.perf_counter()
+    _seed(engine, args.reviews)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    try:
+        first = list_review_results(db, limit=20)
+        # 走到历史中段：用中间一条记录构造游标
+        mid = args.reviews // 2
+        mid_time = datetime(2024, 1, 1) + timedelta(minutes=3 * mid)
+        from backend.app.history import encode_cursor
+
+        deep_cursor = encode_cursor(mid_time, mid)
+        day = datetime(2024, 1, 1) + timedelta(minutes=3 * (args.reviews // 3))
+
+        _time("submissions, first page", lambda: list_submissions(db, limit=20))
+        _time("reviews, first page", lambda: list_review_results(db, limit=20))
+        _time("reviews, next page", lambda: list_review_results(db, limit=20, cursor=first.next_cursor))
+        _time("reviews, page at the middle", lambda: list_review_results(db, limit=20, cursor=deep_cursor))
+        _time(
+            "reviews, one-day range",
+            lambda: list_review_results(db, limit=20, generated_from=day, generated_to=day + timedelta(days=1)),
+        )
+        _time("reviews, novelty >= 4.5", lambda: list_review_results(db, limit=20, min_score=4.5, dimension="novelty"))
+        _time("reviews, mean >= 4.0", lambda: list_review_results(db, limit=20, min_score=4.0))
+        _time("single result with scores+reviews", lambda: load_review_response(db, f"rev_{mid:012x}"))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
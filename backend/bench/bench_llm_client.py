@@ -0,0 +1,129 @@
+"""
+Exercise the shared LLM client against the fake OpenAI-compatible server.
+
+Starts backend.bench.fake_llm_server in a background thread and runs three
+phases through acall_deepseek_for_review:
+
+1. healthy: all calls succeed; shows latency and how many TCP connections
+   the pooled client opened (keep-alive means far fewer than requests)
+2. flaky:   --error-rate of responses are 429/500/503; retries with jittered
+   backoff should still complete (almost) every call
+3. down:    every response is 503; once the circuit breaker opens, the
+   remaining calls fail fast instead of waiting through their retries
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_llm_client --calls 40 --latency 0.2 --error-rate 0.3
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _phase(llm, calls: int) -> dict:
+    async def one():
+        started = time.perf_counter()
+        try:
+            await llm.acall_deepseek_for_review("fake paper text")
+            return True, time.perf_counter() - started, None
+        except llm.LLMError as e:
+            return False, time.perf_counter() - started, type(e).__name__
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*[one() for _ in range(calls)])
+    wall = time.perf_counter() - started
+    ok = [t for success, t, _ in outcomes if success]
+    failed = [(t, kind) for success, t, kind in outcomes if not success]
+    return {
+        "wall_s": wall,
+        "ok": len(ok),
+        "failed": len(failed),
+        "fast_failed": sum(1 for _, kind in failed if kind == "CircuitOpenError"),
+        "p50_s": statistics.median(ok) if ok else 0.0,
+        "p95_s": sorted(ok)[int(len(ok) * 0.95) - 1] if ok else 0.0,
+        "fail_max_s": max((t for t, _ in failed), default=0.0),
+    }
+
+
+def _report(name: str, result: dict, stats: dict) -> None:
+    print(
+        f"{name:<8} ok={result['ok']:>3} failed={result['failed']:>3} "
+        f"(circuit-open {result['fast_failed']:>3})  wall={result['wall_s']:.2f}s  "
+        f"p50={result['p50_s']:.2f}s p95={result['p95_s']:.2f}s  slowest failure={result['fail_max_s']:.2f}s  "
+        f"server requests={stats['requests']} errors={stats['errors']} connections={stats['connections']}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from backend.bench.fake_llm_server import FakeLLMConfig, FakeLLMStats, create_app
+
+    port = _free_port()
+    config = FakeLLMConfig(latency=args.latency, seed=args.seed)
+    app = create_app(config)
+    server, thread = _start_server(app, port)
+
+    # llm 模块在导入时读取这些配置；退避参数调小，让压测在几秒内跑完
+    os.environ["DEEPSEEK_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("DEEPSEEK_API_KEY", "fake")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.concurrency))
+    os.environ.setdefault("LLM_BACKOFF_BASE_SECONDS", "0.1")
+    os.environ.setdefault("LLM_BACKOFF_MAX_SECONDS", "1")
+    os.environ.setdefault("LLM_BREAKER_RESET_SECONDS", "60")
+
+    from backend.app import llm, providers
+
+    async def run():
+        try:
+            for name, error_rate, down in (
+                ("healthy", 0.0, False),
+                ("flaky", args.error_rate, False),
+                ("down", 0.0, True),
+            ):
+                config.error_rate, config.down = error_rate, down
+                app.state.stats.__dict__.update(FakeLLMStats().__dict__)
+                result = await _phase(llm, args.calls)
+                _report(name, result, app.state.stats.as_dict())
+            print(f"circuit breaker state after 'down': {providers.get_router().primary.breaker.state}")
+        finally:
+            await providers.aclose_llm_clients()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Compare LLM routing policies on the offline FakeProvider.
+
+Both providers answer in --latency seconds (+ uniform --jitter), but a
+--slow-rate share of calls take an extra --slow-seconds. The same workload is
+run with failover routing and with hedged routing; hedging sends a second
+request once the primary exceeds its observed p95, which should cut the tail
+(p99) at the cost of a few extra requests.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_llm_routing --calls 400 --slow-rate 0.05 --slow-seconds 2
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import List
+
+from backend.app.providers import FakeProvider, LLMRouter
+
+MESSAGES = [{"role": "user", "content": "fake paper text"}]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+async def _run(router: LLMRouter, calls: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await router.complete(MESSAGES, 0.1)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[one() for _ in range(calls)])
+    return latencies
+
+
+def _router(policy: str, args) -> LLMRouter:
+    def provider(name: str, seed: int) -> FakeProvider:
+        return FakeProvider(
+            latency=args.latency,
+            jitter=args.jitter,
+            slow_rate=args.slow_rate,
+            slow_seconds=args.slow_seconds,
+            seed=seed,
+            name=name,
+        )
+
+    return LLMRouter(
+        [provider("fake-a", args.seed), provider("fake-b", args.seed + 1)],
+        policy=policy,
+        hedge_default_seconds=args.latency * 3,
+        hedge_min_seconds=args.latency,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-seconds", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for policy in ("failover", "hedge"):
+        router = _router(policy, args)
+        latencies = asyncio.run(_run(router, args.calls, args.concurrency))
+        print(
+            f"{policy:<9} p50={statistics.median(latencies):.3f}s "
+            f"p95={_percentile(latencies, 0.95):.3f}s p99={_percentile(latencies, 0.99):.3f}s "
+            f"max={max(latencies):.3f}s  hedges sent={router.hedges_sent} won={router.hedges_won} "
+            f"(+{router.hedges_sent / args.calls:.1%} requests)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Wall-clock time of a single-call review vs the reviewer-parallel fan-out.
+
+The model is simulated: each request takes --ttft seconds plus the time to
+"generate" its output at --tokens-per-second, and the output length depends
+on the task (a full review with four comments, one reviewer comment, or just
+the scores). This is what fan-out trades on: the single call generates all
+four comments back to back, the fan-out generates them concurrently, so the
+review should take about as long as one comment.
+
+--persona-error-rate injects failures into reviewer requests only, to show
+that a failed persona drops just that comment instead of the whole review.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_review_fanout --runs 5 --tokens-per-second 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from typing import List, Tuple
+
+from backend.app.providers import FakeProvider, LLMError, Messages
+
+_PERSONA_RE = re.compile(r"write the review comment of (reviewer_\d)")
+_WORD = "lorem"
+
+
+class GenerationTimeProvider(FakeProvider):
+    """
+    FakeProvider whose latency grows with the length of the answer, with
+    output sized like a real review for each kind of prompt.
+    """
+
+    def __init__(self, ttft: float, tokens_per_second: float, review_tokens: int,
+                 persona_error_rate: float, seed: int) -> None:
+        super().__init__(latency=0.0, jitter=0.0, error_rate=0.0, slow_rate=0.0, seed=seed, name="fake-gen")
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.review_tokens = review_tokens
+        self.persona_error_rate = persona_error_rate
+
+    def _plan(self, messages: Messages) -> Tuple[float, bool, str]:
+        _, _, full = super()._plan(messages)
+        review = json.loads(full)
+        prompt = messages[-1]["content"]
+        text = " ".join([_WORD] * self.review_tokens)
+        fail = False
+
+        persona = _PERSONA_RE.search(prompt)
+        if persona:
+            content = json.dumps({"reviewer_id": persona.group(1), "text": text})
+            fail = self._rng.random() < self.persona_error_rate
+        elif "Task: score the paper" in prompt:
+            content = json.dumps({"scores": review["scores"]})
+        else:
+            for item in review["reviews"]:
+                item["text"] = text
+            content = json.dumps(review)
+
+        # 每个词约算 1 个 token，JSON 结构按 4 个字符 1 个 token
+        tokens = content.count(_WORD) + len(content.replace(_WORD, "")) / 4
+        return self.ttft + tokens / self.tokens_per_second, fail, content
+
+
+async def _run(fanout: bool, runs: int, paper_text: str) -> Tuple[List[float], List[int]]:
+    from backend.app import llm
+
+    llm.REVIEW_FANOUT = fanout
+    # 每次 asyncio.run 是新的事件循环，信号量要在新循环里重新创建
+    llm._llm_semaphore = None
+    latencies: List[float] = []
+    review_counts: List[int] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            result = await llm.acall_deepseek_for_review(paper_text)
+        except LLMError as e:
+            print(f"  {'fan-out' if fanout else 'single'} review failed: {e}")
+            continue
+        latencies.append(time.perf_counter() - started)
+        review_counts.append(len(result["reviews"]))
+    return latencies, review_counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--review-tokens", type=int, default=300, help="tokens per reviewer comment")
+    parser.add_argument("--persona-error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=5, help="LLM_MAX_CONCURRENCY for this run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # 并行模式一篇论文占 5 个并发名额；默认上限 4 时第 5 个请求要等一个名额空出来
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    from backend.app.providers import LLMRouter, set_router
+
+    set_router(LLMRouter([GenerationTimeProvider(
+        args.ttft, args.tokens_per_second, args.review_tokens, args.persona_error_rate, args.seed,
+    )]))
+    paper_text = " ".join(random.Random(args.seed).choice(["model", "data", "proof", "graph"]) for _ in range(5000))
+
+    print(f"simulated model: ttft={args.ttft}s, {args.tokens_per_second:.0f} tokens/s, "
+          f"{args.review_tokens} tokens per comment, max concurrency {args.max_concurrency}")
+    medians = {}
+    for label, fanout in (("single", False), ("fan-out", True)):
+        latencies, counts = asyncio.run(_run(fanout, args.runs, paper_text))
+        if not latencies:
+            continue
+        medians[label] = statistics.median(latencies)
+        print(
+            f"{label:<8} median={medians[label]:.2f}s min={min(latencies):.2f}s max={max(latencies):.2f}s "
+            f"reviews per result={sorted(set(counts))}"
+        )
+    if len(medians) == 2:
+        print(f"speed-up: {medians['single'] / medians['fan-out']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Full-text search latency on a large synthetic corpus.
+
+Seeds a temporary database with --reviews review comments built from a
+random vocabulary (the FTS index is maintained by the insert triggers), then
+compares GET /api/search's FTS5 query against the LIKE '%term%' scan it
+replaces, for a rare term, a common term and a two-term AND query. Terms
+with more than SEARCH_RANK_MAX_HITS matches are returned newest-first instead
+of by BM25; the "order" column shows which path a query took.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_search --reviews 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+VOCAB = (
+    "model method baseline experiment dataset result table figure training loss accuracy "
+    "network layer attention transformer convolution benchmark evaluation metric analysis "
+    "proposed approach novel significant improvement limitation clarity writing related work "
+    "theorem proof assumption hyperparameter optimization gradient regularization robustness"
+).split()
+
+
+def _seed(engine, count: int) -> None:
+    from backend.app.models import ReviewORM, ReviewResultORM, SubmissionORM
+
+    rng = random.Random(0)
+    now = datetime(2024, 1, 1)
+    papers = max(1, count // 4)
+    with engine.begin() as conn:
+        conn.execute(
+            SubmissionORM.__table__.insert(),
+            [
+                {
+                    "id": i,
+                    "submission_id": f"sub_{i:012x}",
+                    "file_name": f"paper_{i}.pdf",
+                    "file_size": 1000,
+                    "created_at": now,
+                    "text_preview": " ".join(rng.choices(VOCAB, k=60)),
+                }
+                for i in range(1, papers + 1)
+            ],
+        )
+        conn.execute(
+            ReviewResultORM.__table__.insert(),
+            [
+                {
+                    "id": i,
+                    "review_result_id": f"rev_{i:012x}",
+                    "submission_id": f"sub_{i:012x}",
+                    "submission_db_id": i,
+                    "generated_at": now,
+                }
+                for i in range(1, papers + 1)
+            ],
+        )
+        batch = 20000
+        for offset in range(0, count, batch):
+            rows = []
+            for i in range(offset, min(count, offset + batch)):
+                words = rng.choices(VOCAB, k=80)
+                # 约 0.1% 的评语提到 "ablation"，用作低频词
+                if rng.random() < 0.001:
+                    words[rng.randrange(len(words))] = "ablation"
+                rows.append(
+                    {"review_result_id": i // 4 + 1, "reviewer_id": f"reviewer_{i % 4 + 1}", "text": " ".join(words)}
+                )
+            conn.execute(ReviewORM.__table__.insert(), rows)
+
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=200000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-search-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/search.db"
+
+    from sqlalchemy import text
+
+    from backend.app.db import SessionLocal, engine, init_db
+    from backend.app.search import search
+
+    init_db()
+    started = time.perf_counter()
+    _seed(engine, args.reviews)
+    print(f"seeded {args.reviews} reviews (with FTS triggers) in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    try:
+        for label, q, like in (
+            ("rare term", "ablation", "ablation"),
+            ("common term", "transformer", "transformer"),
+            ("two terms (AND)", "theorem robustness", None),
+        ):
+            fts_ms = _time(lambda: search(db, q, "reviews", 20))
+            order = search(db, q, "reviews", 20).order
+            line = f"{label:<16} fts5={fts_ms:8.2f} ms ({order:<9})"
+            if like is not None:
+                # 排序需要拿到全部命中，LIKE 方案同样要扫完整张表
+                like_ms = _time(
+                    lambda: db.execute(
+                        text("SELECT id, text FROM reviews WHERE text LIKE :p"), {"p": f"%{like}%"}
+                    ).all()
+                )
+                line += f"   LIKE scan={like_ms:8.2f} ms"
+            print(line)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
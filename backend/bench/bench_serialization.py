@@ -0,0 +1,217 @@
+"""
+Response serialization CPU and bytes on the wire.
+
+Three parts:
+
+  * serializers: CPU per response (time.process_time) for a ReviewResponse with
+    four --review-words reviews and a --page-size page of /api/reviews, through
+      - stdlib: jsonable_encoder + json.dumps (a custom JSONResponse class)
+      - orjson: model_dump + orjson.dumps (ORJSONResponse)
+      - response_model: TypeAdapter validate + dump_json, the path FastAPI
+        takes for endpoints with a response_model and no response class
+    plus json.dumps vs serialization.dumps for the dict payloads that bypass
+    response_model (SSE result event, one NDJSON export batch);
+  * compression: bytes and CPU per response for gzip and br levels
+    (br only when the brotli package is installed);
+  * end to end: GET /api/reviews/{id} in-process over ASGI with different
+    Accept-Encoding headers, reporting Content-Encoding, body bytes and CPU per
+    request including routing, the database read and CompressionMiddleware.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_serialization --review-words 600 --page-size 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from typing import Callable, List
+
+WORDS = (
+    "the proposed method improves robustness on the benchmark but the ablation does not isolate "
+    "the contribution of each component 实验 结果 表明 and the related work section omits recent baselines"
+).split()
+
+
+def _text(words: int, salt: int) -> str:
+    # 随机词序加上数字，压缩率接近真实的审稿意见；循环重复的文本会让压缩结果好得失真
+    rng = random.Random(salt)
+    return " ".join(
+        rng.choice(WORDS) if rng.random() < 0.9 else f"{rng.uniform(0, 100):.1f}%" for _ in range(words)
+    )
+
+
+def _cpu_us(fn: Callable[[], object], repeat: int) -> float:
+    fn()
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat * 1e6
+
+
+def _payloads(args):
+    from backend.app.schemas import (
+        Review,
+        ReviewResponse,
+        ReviewResult,
+        ReviewResultPage,
+        ReviewResultSummary,
+        Score,
+        Submission,
+    )
+
+    scores = [Score(dimension=d, value=3.5) for d in ("novelty", "technical_quality", "clarity", "significance")]
+    review = ReviewResponse(
+        submission=Submission(
+            submission_id="sub_0123456789ab",
+            file_name="paper.pdf",
+            file_size=2_345_678,
+            created_at="2025-01-01T00:00:00+00:00",
+            text_preview=_text(80, 0),
+        ),
+        review_result=ReviewResult(
+            review_result_id="rev_0123456789ab",
+            submission_id="sub_0123456789ab",
+            scores=scores,
+            reviews=[Review(reviewer_id=f"reviewer_{k}", text=_text(args.review_words, k)) for k in range(1, 5)],
+            generated_at="2025-01-01T00:01:00+00:00",
+        ),
+    )
+    page = ReviewResultPage(
+        items=[
+            ReviewResultSummary(
+                review_result_id=f"rev_{i:012x}",
+                submission_id=f"sub_{i:012x}",
+                file_name=f"paper_{i}.pdf",
+                scores=scores,
+                mean_score=3.5,
+                generated_at="2025-01-01T00:01:00+00:00",
+            )
+            for i in range(args.page_size)
+        ],
+        next_cursor="WyIyMDI1LTAxLTAxVDAwOjAxOjAwIiwgMTIzXQ",
+    )
+    return review, page
+
+
+def bench_serializers(args) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from backend.app import serialization
+
+    review, page = _payloads(args)
+    print(f"serializers (CPU per response, {args.repeat} runs)")
+    for label, model in (("review response", review), (f"history page x{args.page_size}", page)):
+        adapter = TypeAdapter(type(model))
+        rows = [("stdlib", lambda: json.dumps(jsonable_encoder(model)).encode("utf-8"))]
+        if serialization.orjson is not None:
+            rows.append(("orjson", lambda: serialization.orjson.dumps(model.model_dump())))
+        rows.append(("response_model", lambda: adapter.dump_json(adapter.validate_python(model))))
+        size = len(adapter.dump_json(model))
+        for name, fn in rows:
+            print(f"  {label:<22} {name:<15} {_cpu_us(fn, args.repeat):9.1f} us  ({size} B)")
+
+    event = review.model_dump()
+    batch = [
+        {**event["review_result"], "file_name": "paper.pdf", "file_size": 2_345_678} for _ in range(args.page_size)
+    ]
+    for label, obj in (("SSE result event", event), (f"NDJSON batch x{args.page_size}", batch)):
+        for name, fn in (
+            ("json.dumps", lambda: json.dumps(obj, ensure_ascii=False).encode("utf-8")),
+            ("serialization", lambda: serialization.dumps(obj)),
+        ):
+            print(f"  {label:<22} {name:<15} {_cpu_us(fn, args.repeat):9.1f} us")
+    return TypeAdapter(type(review)).dump_json(review)
+
+
+def bench_compression(body: bytes, args) -> None:
+    from backend.app.compression import brotli
+
+    codecs: List = [(f"gzip {level}", lambda level=level: zlib.compress(body, level)) for level in (1, 6, 9)]
+    if brotli is not None:
+        codecs += [
+            (f"br {quality}", lambda quality=quality: brotli.compress(body, quality=quality, mode=brotli.MODE_TEXT))
+            for quality in (4, 5, 11)
+        ]
+    else:
+        print("  (brotli not installed: br skipped)")
+    print(f"compression of the review response ({len(body)} B)")
+    for label, fn in codecs:
+        size = len(fn())
+        print(f"  {label:<10} {size:8d} B ({size / len(body):6.1%})  {_cpu_us(fn, max(1, args.repeat // 4)):9.1f} us")
+
+
+async def _e2e(review_result_id: str, args) -> None:
+    import httpx
+
+    from backend import main
+    from backend.app.compression import SUPPORTED_ENCODINGS
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print("end to end GET /api/reviews/{id}")
+        # 没装 brotli 时 br 请求应退回不压缩，gzip;q=0.8 的那条退回 gzip
+        print(f"  server encodings: {', '.join(SUPPORTED_ENCODINGS)}")
+        for accept in ("identity", "gzip", "br", "br, gzip;q=0.8"):
+            headers = {"Accept-Encoding": accept}
+            url = f"/api/reviews/{review_result_id}"
+            resp = await client.get(url, headers=headers)
+            resp.raise_for_status()
+            # httpx 会自动解压；线上字节数以响应流的原始长度为准
+            async with client.stream("GET", url, headers=headers) as raw:
+                wire = sum([len(chunk) async for chunk in raw.aiter_raw()])
+            started = time.process_time()
+            for _ in range(args.requests):
+                await client.get(url, headers=headers)
+            cpu = (time.process_time() - started) / args.requests * 1e6
+            print(
+                f"  Accept-Encoding: {accept:<16} -> {resp.headers.get('content-encoding', 'identity'):<8} "
+                f"{wire:8d} B  {cpu:9.0f} us CPU per request"
+            )
+
+
+def bench_e2e(args) -> None:
+    from backend.app.db import SessionLocal, init_db
+    from backend.app.pipeline import persist_review
+
+    init_db()
+    llm_result = {
+        "scores": [{"dimension": d, "value": 3.5} for d in ("novelty", "technical_quality", "clarity", "significance")],
+        "reviews": [{"reviewer_id": f"reviewer_{k}", "text": _text(args.review_words, k)} for k in range(1, 5)],
+    }
+    db = SessionLocal()
+    try:
+        result = persist_review(db, "paper.pdf", 2_345_678, _text(80, 0), llm_result)
+    finally:
+        db.close()
+    asyncio.run(_e2e(result.review_result.review_result_id, args))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--review-words", type=int, default=600, help="words per review text")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000, help="serializer calls per measurement")
+    parser.add_argument("--requests", type=int, default=300, help="requests per end-to-end measurement")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-serialization-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    try:
+        body = bench_serializers(args)
+        bench_compression(body, args)
+        bench_e2e(args)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
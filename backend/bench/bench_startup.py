@@ -0,0 +1,114 @@
+"""
+Cold-start cost of the API process: `python -X importtime -c "import backend.main"`.
+
+Each run is a fresh interpreter. The script reports the median cumulative import
+time of backend.main and the interpreter's wall-clock time, and lists the
+slowest imports of the median run. It can also enforce limits, so CI can keep
+start-up from regressing:
+
+  --budget-ms   fail when the median import of backend.main exceeds this
+  --forbid      fail when any of these modules is imported by backend.main
+                (default: pypdf and openai, which must stay lazy)
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_startup --runs 7 --budget-ms 1000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_FORBIDDEN = "pypdf,openai"
+
+
+def _parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """module -> (self µs, cumulative µs) from -X importtime output."""
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # 表头
+        modules[parts[2].strip()] = (self_us, cumulative_us)
+    return modules
+
+
+def measure_import(runs: int, module: str = "backend.main") -> List[Tuple[float, float, Dict[str, Tuple[int, int]]]]:
+    """
+    Import `module` in `runs` fresh interpreters; returns (import seconds,
+    wall-clock seconds, per-module timings) per run.
+    """
+    with tempfile.TemporaryDirectory(prefix="cspaper-bench-startup-") as tmp:
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(REPO_ROOT),
+            # 导入时不应碰数据库；万一碰了，也别动 instance/cspaper.db
+            "CSPAPER_DATABASE_URL": f"sqlite:///{tmp}/startup.db",
+            "PYTHONDONTWRITEBYTECODE": "",
+        }
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+            )
+            wall = time.perf_counter() - started
+            if proc.returncode != 0:
+                raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+            modules = _parse_importtime(proc.stderr)
+            samples.append((modules[module][1] / 1e6, wall, modules))
+        return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="0 disables the check")
+    parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN, help="comma-separated; empty disables the check")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # 第一次运行会写 .pyc，不计入
+    measure_import(1, args.module)
+    samples = sorted(measure_import(args.runs, args.module), key=lambda s: s[0])
+    import_s, wall_s, modules = samples[len(samples) // 2]
+    print(
+        f"import {args.module}: median {import_s * 1000:.0f} ms "
+        f"(min {samples[0][0] * 1000:.0f}, max {samples[-1][0] * 1000:.0f}), "
+        f"interpreter wall-clock {statistics.median(s[1] for s in samples) * 1000:.0f} ms, "
+        f"{len(modules)} modules"
+    )
+    print(f"slowest imports (cumulative, median run):")
+    heaviest = sorted(
+        ((name, cumulative) for name, (_, cumulative) in modules.items() if name != args.module),
+        key=lambda item: -item[1],
+    )
+    for name, cumulative in heaviest[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    forbidden = [m.strip() for m in args.forbid.split(",") if m.strip()]
+    loaded = [m for m in forbidden if m in modules]
+    if loaded:
+        print(f"FAIL: {args.module} imports {', '.join(loaded)} at module load; import them lazily")
+        failed = True
+    if args.budget_ms and import_s * 1000 > args.budget_ms:
+        print(f"FAIL: median import {import_s * 1000:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
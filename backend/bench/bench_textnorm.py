@@ -0,0 +1,84 @@
+"""
+Prompt size before/after text normalization on a fixed set of PDFs.
+
+For each PDF (the sample arXiv paper by default, or every --pdf given),
+extracts the text, runs normalize_paper_text and prints characters and
+estimated tokens before/after plus what each rule removed.
+
+With --compare-reviews, each paper is also reviewed twice through the
+configured LLM providers (raw text vs normalized text) and the per-dimension
+score differences are printed, to check that the cut does not change the
+outcome. This makes real model calls unless LLM_PROVIDERS=fake.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_textnorm --pdf papers/*.pdf
+    python -m backend.bench.bench_textnorm --compare-reviews
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+from backend.bench.bench_pdf_extract import DEFAULT_PDF
+
+
+async def _scores(text: str) -> dict:
+    from backend.app.llm import acall_deepseek_for_review
+
+    result = await acall_deepseek_for_review(text)
+    return {s["dimension"]: float(s["value"]) for s in result.get("scores", [])}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, nargs="*", default=[DEFAULT_PDF])
+    parser.add_argument("--compare-reviews", action="store_true", help="review raw and normalized text and diff scores")
+    args = parser.parse_args()
+
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    from backend.app.chunking import estimate_tokens
+    from backend.app.pdf_utils import extract_text_from_pdf
+    from backend.app.providers import aclose_llm_clients
+    from backend.app.textnorm import normalize_paper_text
+
+    total_before = total_after = 0
+    diffs = []
+    print(f"{'paper':<40} {'chars':>15} {'est. tokens':>15} {'cut':>6} {'ms':>6}  dropped")
+    for path in args.pdf:
+        raw, _ = extract_text_from_pdf(path.read_bytes())
+        started = time.perf_counter()
+        normalized, stats = normalize_paper_text(raw)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        total_before += stats.chars_before
+        total_after += stats.chars_after
+        print(
+            f"{path.name[:40]:<40} {stats.chars_before:>7}->{stats.chars_after:<7} "
+            f"{estimate_tokens(raw):>7}->{estimate_tokens(normalized):<7} {stats.reduction:>6.1%} {elapsed_ms:>6.1f}  "
+            f"{stats.dropped_lines} references={stats.reference_chars}"
+        )
+
+        if args.compare_reviews:
+            async def compare():
+                try:
+                    return await _scores(raw), await _scores(normalized)
+                finally:
+                    await aclose_llm_clients()
+
+            before, after = asyncio.run(compare())
+            for dimension in sorted(set(before) & set(after)):
+                diffs.append(abs(before[dimension] - after[dimension]))
+                print(f"    {dimension:<18} raw={before[dimension]:.1f} normalized={after[dimension]:.1f}")
+
+    if total_before:
+        print(f"\ntotal: {total_before} -> {total_after} chars ({1 - total_after / total_before:.1%} smaller)")
+    if diffs:
+        print(f"mean |score difference| raw vs normalized: {sum(diffs) / len(diffs):.2f} over {len(diffs)} scores")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
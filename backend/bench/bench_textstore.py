@@ -0,0 +1,86 @@
+"""
+Re-review cost with and without the extracted-text store.
+
+Times, for the sample arXiv paper (or --pdf):
+
+- parsing the PDF through the worker pool (what every re-review paid before);
+- loading the stored text back from extracted_texts (what it pays now);
+- compressed size for each codec / level available in this environment.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_textstore
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from backend.bench.bench_pdf_extract import DEFAULT_PDF
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, default=DEFAULT_PDF)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-textstore-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/textstore.db"
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    import asyncio
+
+    from backend.app import textstore
+    from backend.app.db import SessionLocal, init_db
+    from backend.app.pdf_utils import extract_text_from_path_async, shutdown_pdf_pool
+    from backend.app.uploads import SpooledUpload
+
+    init_db()
+    upload = SpooledUpload.from_path(args.pdf, args.pdf.name)
+
+    async def parse():
+        return await extract_text_from_path_async(str(args.pdf))
+
+    try:
+        full_text, _ = asyncio.run(parse())  # 预热进程池
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            asyncio.run(parse())
+        parse_ms = (time.perf_counter() - started) / args.repeat * 1000
+    finally:
+        shutdown_pdf_pool()
+
+    db = SessionLocal()
+    try:
+        textstore.store_text(db, upload.sha256, full_text)
+        db.commit()
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            assert textstore.load_text(db, upload.sha256) == full_text
+        load_ms = (time.perf_counter() - started) / args.repeat * 1000
+    finally:
+        db.close()
+
+    raw = len(full_text.encode("utf-8"))
+    print(f"{args.pdf.name}: {args.pdf.stat().st_size / 1e3:.0f} KB PDF, {len(full_text)} chars of text")
+    print(f"parse PDF       {parse_ms:8.1f} ms")
+    print(f"load from store {load_ms:8.2f} ms")
+
+    codecs = [("zlib", "TEXT_STORE_ZLIB_LEVEL", level) for level in (1, 6, 9)]
+    if textstore.zstandard is not None:
+        codecs += [("zstd", "TEXT_STORE_ZSTD_LEVEL", level) for level in (3, 10, 19)]
+    for codec, setting, level in codecs:
+        setattr(textstore, setting, level)
+        started = time.perf_counter()
+        _, data = textstore.compress_text(full_text, codec)
+        compress_ms = (time.perf_counter() - started) * 1000
+        print(f"{codec} level {level:<2}   {len(data) / 1e3:7.1f} KB ({raw / len(data):.1f}x)  {compress_ms:6.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
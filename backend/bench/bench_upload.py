@@ -0,0 +1,190 @@
+"""
+Upload handling: FastAPI's UploadFile vs the streamed receiver in uploads.py.
+
+Both variants are driven through raw ASGI calls that deliver the multipart body
+in --chunk-kb pieces, the way uvicorn hands it over. Three things are
+measured for each:
+
+  * oversize: how many body bytes the app consumes before answering 413 to a
+    --oversize-mb upload, with and without a Content-Length header;
+  * not-a-pdf: bytes consumed before a non-PDF body of the same size is rejected;
+  * valid: wall-clock time and peak Python heap (tracemalloc) for a --valid-mb PDF.
+
+The UploadFile variant mirrors the previous endpoint: FastAPI parses the whole
+form into a SpooledTemporaryFile, then the handler copies it to the spool
+directory with a size check.
+
+Usage (from the repository root):
+
+    python -m backend.bench.bench_upload --valid-mb 19 --oversize-mb 200
+"""
+import argparse
+import asyncio
+import hashlib
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+
+from backend.app import uploads
+
+MAX_BYTES = 20 * 1024 * 1024
+BOUNDARY = "benchboundary7d3f"
+
+
+def _multipart_chunks(payload_size: int, head: bytes, chunk_size: int) -> Iterator[bytes]:
+    """
+    Yield a single-file multipart body without materialising it: the payload is
+    `head`, filler bytes, then a PDF trailer.
+    """
+    trailer = b"\nstartxref\n%d\n%%%%EOF\n" % max(payload_size - 64, 0)
+    preamble = (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"paper.pdf\"\r\n"
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + head
+    epilogue = f"\r\n--{BOUNDARY}--\r\n".encode()
+    filler = payload_size - len(head) - len(trailer)
+    block = b"0" * chunk_size
+
+    yield preamble
+    while filler > 0:
+        n = min(filler, chunk_size)
+        yield block[:n]
+        filler -= n
+    yield trailer + epilogue
+
+
+def _body_length(payload_size: int, head: bytes) -> int:
+    return sum(len(c) for c in _multipart_chunks(payload_size, head, 1 << 20))
+
+
+async def _drive(app, chunks: Iterator[bytes], content_length: Optional[int]) -> Tuple[int, int]:
+    """Send one POST through the ASGI app; returns (status, body bytes consumed)."""
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/upload", "raw_path": b"/upload", "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    consumed = 0
+    status = 0
+    done = asyncio.Event()
+    iterator = iter(chunks)
+
+    async def receive() -> Dict:
+        nonlocal consumed
+        if done.is_set():
+            return {"type": "http.disconnect"}
+        chunk = next(iterator, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        consumed += len(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message: Dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    await app(scope, receive, send)
+    return status, consumed
+
+
+def _upload_file_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        if file.content_type != "application/pdf":
+            raise HTTPException(400)
+        out, path = uploads._new_spool_file()
+        size = 0
+        digest = hashlib.sha256()
+        with out:
+            for chunk in iter(lambda: file.file.read(uploads.CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > MAX_BYTES:
+                    path.unlink()
+                    raise HTTPException(413)
+                digest.update(chunk)
+                out.write(chunk)
+        path.unlink()
+        return {"size": size}
+
+    return app
+
+
+def _streaming_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            received = await uploads.receive_pdf_uploads(request, "file", MAX_BYTES)
+        except uploads.UploadTooLarge:
+            raise HTTPException(413)
+        except uploads.InvalidUpload:
+            raise HTTPException(400)
+        for item in received:
+            item.cleanup()
+        return {"size": received[0].size}
+
+    return app
+
+
+async def _measure(app, args) -> List[Tuple[str, str]]:
+    chunk = args.chunk_kb * 1024
+    pdf_head = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+    oversize = int(args.oversize_mb * 1024 * 1024)
+    valid = int(args.valid_mb * 1024 * 1024)
+    rows = []
+
+    for label, length in (("oversize, Content-Length", _body_length(oversize, pdf_head)), ("oversize, chunked", None)):
+        started = time.perf_counter()
+        status, consumed = await _drive(app, _multipart_chunks(oversize, pdf_head, chunk), length)
+        rows.append((label, f"{status} after {consumed / 2**20:7.1f} MB in {time.perf_counter() - started:.3f}s"))
+
+    started = time.perf_counter()
+    status, consumed = await _drive(app, _multipart_chunks(valid, b"MZ\x90\x00", chunk), None)
+    rows.append(("not a pdf", f"{status} after {consumed / 2**20:7.1f} MB in {time.perf_counter() - started:.3f}s"))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    status, consumed = await _drive(app, _multipart_chunks(valid, pdf_head, chunk), None)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows.append(("valid pdf", f"{status} {consumed / 2**20:.1f} MB in {elapsed:.3f}s, peak heap {peak / 2**20:.2f} MB"))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--valid-mb", type=float, default=19.0)
+    parser.add_argument("--oversize-mb", type=float, default=200.0)
+    parser.add_argument("--chunk-kb", type=int, default=64, help="size of each ASGI body message")
+    args = parser.parse_args()
+
+    spool_dir = Path(tempfile.mkdtemp(prefix="cspaper-bench-upload-"))
+    uploads.UPLOAD_DIR = spool_dir
+    try:
+        for name, app in (("UploadFile", _upload_file_app()), ("streamed", _streaming_app())):
+            print(name)
+            for label, result in asyncio.run(_measure(app, args)):
+                print(f"  {label:<26} {result}")
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
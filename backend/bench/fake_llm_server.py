@@ -0,0 +1,178 @@
+"""
+Fake OpenAI-compatible chat completions server for exercising the LLM client.
+
+Serves POST /chat/completions (and /v1/chat/completions) with a canned review
+JSON, streamed or not. Latency and failures are injected per request:
+
+- --latency / --jitter: response delay in seconds (uniform jitter on top)
+- --error-rate: probability of answering with one of --error-statuses
+- --down: answer every request with 503, to trip the circuit breaker
+
+GET /_stats returns request counts and the number of distinct client
+connections seen, which shows whether keep-alive is working. The settings
+can be changed at runtime with POST /_config (same field names as FakeLLMConfig).
+
+Usage (from the repository root):
+
+    python -m backend.bench.fake_llm_server --port 8900 --latency 0.5 --error-rate 0.2
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8900 DEEPSEEK_API_KEY=fake python -m uvicorn backend.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_REVIEW = {
+    "scores": [
+        {"dimension": "novelty", "value": 4.0},
+        {"dimension": "technical_quality", "value": 3.5},
+        {"dimension": "clarity", "value": 4.0},
+        {"dimension": "significance", "value": 3.5},
+    ],
+    "reviews": [
+        {"reviewer_id": f"reviewer_{i}", "text": f"Fake review {i}: the paper is clear and well motivated."}
+        for i in range(1, 5)
+    ],
+}
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: float = 0.2
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    retry_after: Optional[float] = None
+    down: bool = False
+    stream_chunk_chars: int = 40
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeLLMStats:
+    requests: int = 0
+    errors: int = 0
+    connections: Set[str] = field(default_factory=set)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors, "connections": len(self.connections)}
+
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    config = config or FakeLLMConfig()
+    stats = FakeLLMStats()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="fake-llm")
+    app.state.config = config
+    app.state.stats = stats
+
+    def _completion(content: str, model: str) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-fake-{stats.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def _chunk(delta: Dict[str, Any], model: str, finish: Optional[str] = None) -> str:
+        payload = {
+            "id": f"chatcmpl-fake-{stats.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats.requests += 1
+        if request.client is not None:
+            stats.connections.add(f"{request.client.host}:{request.client.port}")
+
+        delay = config.latency + (rng.uniform(0, config.jitter) if config.jitter > 0 else 0.0)
+        await asyncio.sleep(delay)
+
+        if config.down or rng.random() < config.error_rate:
+            stats.errors += 1
+            status = 503 if config.down else rng.choice(config.error_statuses)
+            headers = {"retry-after": str(config.retry_after)} if config.retry_after is not None else None
+            return JSONResponse(
+                {"error": {"message": f"fake error {status}", "type": "fake_error"}},
+                status_code=status,
+                headers=headers,
+            )
+
+        model = body.get("model", "fake")
+        content = json.dumps(FAKE_REVIEW)
+        if not body.get("stream"):
+            return JSONResponse(_completion(content, model))
+
+        async def events():
+            yield _chunk({"role": "assistant", "content": ""}, model)
+            step = max(1, config.stream_chunk_chars)
+            for i in range(0, len(content), step):
+                yield _chunk({"content": content[i : i + step]}, model)
+                await asyncio.sleep(0)
+            yield _chunk({}, model, finish="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/_stats")
+    async def get_stats():
+        return stats.as_dict()
+
+    @app.post("/_config")
+    async def update_config(values: Dict[str, Any]):
+        for key, value in values.items():
+            if hasattr(config, key):
+                setattr(config, key, value)
+        return asdict(config)
+
+    return app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[429, 500, 503])
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--down", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeLLMConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        retry_after=args.retry_after,
+        down=args.down,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+"""
+Concurrency load test for POST /api/review.
+
+Fires N concurrent uploads of the same PDF at the app in-process and compares
+the wall-clock time against a single upload. The model is served by the local
+FakeProvider (--llm-latency seconds per call, deterministic output), so no API
+key or network is needed. While the burst runs, /ping is polled to show the event loop stays
+responsive.
+
+Usage (from the repository root):
+
+    python -m backend.bench.load_review --concurrency 8 --llm-latency 2.0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_PDF = REPO_ROOT / "https:arxiv.org:pdf:1512.pdf"
+
+
+async def _upload(client, pdf_bytes: bytes) -> float:
+    started = time.perf_counter()
+    # refresh=true 绕过审稿缓存，保证每次都走完整流水线
+    resp = await client.post(
+        "/api/review?refresh=true",
+        files={"file": ("paper.pdf", pdf_bytes, "application/pdf")},
+    )
+    resp.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def _poll_ping(client, stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/ping")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+
+async def _run(pdf_bytes: bytes, concurrency: int) -> dict:
+    import httpx
+    from backend import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # 预热：启动进程池，避免首个请求的 spawn 开销计入结果
+        await _upload(client, pdf_bytes)
+
+        started = time.perf_counter()
+        await _upload(client, pdf_bytes)
+        single = time.perf_counter() - started
+
+        stop = asyncio.Event()
+        ping_samples: list = []
+        poller = asyncio.create_task(_poll_ping(client, stop, ping_samples))
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*[_upload(client, pdf_bytes) for _ in range(concurrency)])
+        burst = time.perf_counter() - started
+        stop.set()
+        await poller
+
+    return {
+        "single_s": single,
+        "burst_s": burst,
+        "slowest_s": max(latencies),
+        "ping_max_ms": max(ping_samples) * 1000 if ping_samples else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, default=DEFAULT_PDF)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    # 压测使用临时数据库，不写入 backend/instance/cspaper.db
+    tmp_dir = tempfile.mkdtemp(prefix="cspaper-bench-")
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.concurrency))
+    # 所有请求都来自同一个 ASGI 客户端地址，单客户端上限不能低于并发数
+    os.environ.setdefault("ADMISSION_MAX_PER_CLIENT", str(args.concurrency))
+
+    from backend.app.db import init_db
+    from backend.app.pdf_utils import shutdown_pdf_pool
+    from backend.app.providers import FakeProvider, LLMRouter, set_router
+
+    init_db()
+    set_router(LLMRouter([FakeProvider(latency=args.llm_latency)]))
+
+    try:
+        result = asyncio.run(_run(args.pdf.read_bytes(), args.concurrency))
+    finally:
+        shutdown_pdf_pool()
+
+    print(f"single upload        : {result['single_s']:.2f}s")
+    print(f"{args.concurrency:>3} concurrent uploads: {result['burst_s']:.2f}s "
+          f"(slowest {result['slowest_s']:.2f}s, serial would be ~{result['single_s'] * args.concurrency:.2f}s)")
+    print(f"max /ping latency during burst: {result['ping_max_ms']:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,425 @@
+"""
+Reproducible benchmark suite for the review pipeline.
+
+Runs four groups and writes every number to one JSON file, so results can be
+compared across commits:
+
+- pdf:  extract_text_from_pdf (single process) and extract_text_from_path
+        (page pool) on 1 to 300-page PDFs built from the sample arXiv paper,
+        plus the sample itself
+- json: sanitize_llm_json + json.loads on clean, messy (fenced, prefixed,
+        trailing prose) and large model outputs, IncrementalReviewParser
+        on the same output fed in streaming-sized pieces, and the local
+        repair path (parse_review_json) on a broken and a truncated output
+- db:   pipeline.persist_review, serially and from concurrent writer threads
+- e2e:  POST /api/review throughput and p50/p95/p99 latency under concurrency,
+        in-process over ASGI, with the FakeProvider standing in for the model
+        and a distinct PDF per request so every request parses and persists
+
+Everything runs against a temporary database; the inputs are generated
+deterministically from the sample PDF and --seed. Timings are medians over
+--repeat runs (wall-clock, so keep the machine otherwise idle).
+
+Usage (from the repository root):
+
+    python -m backend.bench.suite                       # full run -> bench-results/<commit>.json
+    python -m backend.bench.suite --quick --only pdf,json
+    python -m backend.bench.suite --compare bench-results/a1b2c3d.json bench-results/e4f5a6b.json
+
+--compare prints the relative change of every metric and exits with status 1
+when any metric got worse by more than --tolerance (default 15%).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.bench.bench_pdf_extract import DEFAULT_PDF, REPO_ROOT, build_pdf
+
+GROUPS = ("pdf", "json", "db", "e2e")
+DEFAULT_OUT_DIR = REPO_ROOT / "bench-results"
+
+PDF_PAGES = (1, 10, 50, 150, 300)
+QUICK_PDF_PAGES = (1, 10, 50)
+
+Results = Dict[str, Dict[str, Any]]
+
+
+def _metric(results: Results, name: str, value: float, unit: str, better: str = "lower") -> None:
+    results[name] = {"value": round(value, 6), "unit": unit, "better": better}
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    # 最近秩法，与 Prometheus / 多数压测工具的口径一致
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def _median_time(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------- pdf ----------
+
+
+def bench_pdf(args, tmp: Path) -> Results:
+    from backend.app import pdf_utils
+
+    results: Results = {}
+    pdf_utils.extract_text_from_path(str(DEFAULT_PDF))  # 预热进程池，spawn 开销不计入结果
+
+    inputs = [("sample", DEFAULT_PDF, 0)]
+    for pages in QUICK_PDF_PAGES if args.quick else PDF_PAGES:
+        path = tmp / f"pages_{pages}.pdf"
+        build_pdf(DEFAULT_PDF, pages, path)
+        inputs.append((f"p{pages}", path, pages))
+
+    for label, path, pages in inputs:
+        data = path.read_bytes()
+        # 上百页的文件单次就要十几秒，只跑一次
+        repeat = args.repeat if pages <= 50 else 1
+        serial = _median_time(lambda: pdf_utils.extract_text_from_pdf(data), repeat)
+        pooled = _median_time(lambda: pdf_utils.extract_text_from_path(str(path)), repeat)
+        _metric(results, f"pdf.extract_serial.{label}", serial, "s")
+        _metric(results, f"pdf.extract_pool.{label}", pooled, "s")
+        print(f"  {label:<7} {len(data) / 1e6:6.1f} MB  serial {serial:7.3f}s  pool {pooled:7.3f}s", flush=True)
+    return results
+
+
+# ---------- json ----------
+
+
+def _model_output(rng: random.Random, words_per_review: int) -> Dict[str, Any]:
+    vocabulary = ["the", "method", "results", "baseline", "ablation", "clear", "novel", "proof", "é", "数据"]
+    return {
+        "scores": [
+            {"dimension": d, "value": rng.choice([2.5, 3.0, 3.5, 4.0])}
+            for d in ("novelty", "technical_quality", "clarity", "significance")
+        ],
+        "reviews": [
+            {
+                "reviewer_id": f"reviewer_{i}",
+                "text": " ".join(rng.choice(vocabulary) for _ in range(words_per_review))
+                + ' with "quotes", braces {like this} and a\nnewline',
+            }
+            for i in range(1, 5)
+        ],
+    }
+
+
+def bench_json(args, tmp: Path) -> Results:
+    from backend.app.llm import IncrementalReviewParser, ReviewJSONError, parse_review_json, sanitize_llm_json
+
+    # 清洗函数每次调用都会写一行 INFO 日志，这里只测解析本身
+    logging.getLogger("cspaper.llm").setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    clean = json.dumps(_model_output(rng, 300), ensure_ascii=False, indent=2)
+    messy = (
+        "Sure! Here is the review you asked for.\nJSON:\n```json\n"
+        + json.dumps(_model_output(rng, 300), ensure_ascii=False)
+        + "\n```\nLet me know if you need anything else."
+    )
+    large = "```json\n" + json.dumps(_model_output(rng, 60_000), ensure_ascii=False) + "\n```"
+
+    results: Results = {}
+    for label, content in (("clean", clean), ("messy", messy), ("large", large)):
+        loops = max(1, int(200_000 / len(content) * (5 if args.quick else 20)))
+
+        def parse_all():
+            for _ in range(loops):
+                json.loads(sanitize_llm_json(content))
+
+        def stream_all():
+            parser = IncrementalReviewParser()
+            for i in range(0, len(content), 40):
+                parser.feed(content[i : i + 40])
+            parser.finish()
+
+        per_call = _median_time(parse_all, args.repeat) / loops
+        streamed = _median_time(stream_all, args.repeat)
+        _metric(results, f"json.sanitize_loads.{label}", per_call * 1e6, "us")
+        _metric(results, f"json.incremental_parse.{label}", streamed * 1e3, "ms")
+        print(
+            f"  {label:<6} {len(content) / 1e3:8.1f} KB  sanitize+loads {per_call * 1e6:9.1f}us  "
+            f"incremental {streamed * 1e3:8.2f}ms",
+            flush=True,
+        )
+    # 修复路径：多余逗号 + 未转义引号（本地修复即可），以及截断（修复后仍缺最后一条审稿意见）
+    broken = clean.replace("}\n  ]", "},\n  ]").replace("newline", 'a "quoted" newline', 1).replace('\\"quotes\\"', '"quotes"')
+    truncated = clean[: int(len(clean) * 0.8)]
+    for label, content in (("broken", broken), ("truncated", truncated)):
+        loops = 50 if args.quick else 200
+
+        def repair_all():
+            for _ in range(loops):
+                try:
+                    parse_review_json(content)
+                except ReviewJSONError:
+                    pass
+
+        per_call = _median_time(repair_all, args.repeat) / loops
+        _metric(results, f"json.repair.{label}", per_call * 1e6, "us")
+        print(f"  {label:<9} repair {per_call * 1e6:9.1f}us", flush=True)
+    logging.getLogger("cspaper.llm").setLevel(logging.INFO)
+    return results
+
+
+# ---------- db ----------
+
+
+def bench_db(args, tmp: Path) -> Results:
+    from backend.app.db import SessionLocal
+    from backend.app.pipeline import persist_review
+    from backend.bench.bench_db_writes import LLM_RESULT, PREVIEW
+
+    count = 100 if args.quick else 500
+    writers = 8
+
+    def write(i: int) -> float:
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            persist_review(db, f"paper_{i}.pdf", 1_000_000, PREVIEW, LLM_RESULT, f"bench-{i}-{time.perf_counter_ns()}")
+            return time.perf_counter() - started
+        finally:
+            db.close()
+
+    results: Results = {}
+    started = time.perf_counter()
+    serial = [write(i) for i in range(count)]
+    elapsed = time.perf_counter() - started
+    _metric(results, "db.persist_serial.throughput", count / elapsed, "reviews/s", "higher")
+    _metric(results, "db.persist_serial.p50", _percentile(serial, 0.50) * 1e3, "ms")
+    _metric(results, "db.persist_serial.p99", _percentile(serial, 0.99) * 1e3, "ms")
+
+    concurrent: List[float] = []
+    lock = threading.Lock()
+
+    def writer(offset: int) -> None:
+        for i in range(count // writers):
+            latency = write(offset + i)
+            with lock:
+                concurrent.append(latency)
+
+    threads = [threading.Thread(target=writer, args=(count * (w + 1),)) for w in range(writers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    _metric(results, "db.persist_concurrent.throughput", len(concurrent) / elapsed, "reviews/s", "higher")
+    _metric(results, "db.persist_concurrent.p99", _percentile(concurrent, 0.99) * 1e3, "ms")
+    print(
+        f"  serial {results['db.persist_serial.throughput']['value']:.0f} reviews/s, "
+        f"{writers} writers {results['db.persist_concurrent.throughput']['value']:.0f} reviews/s",
+        flush=True,
+    )
+    return results
+
+
+# ---------- e2e ----------
+
+
+def _distinct_pdfs(count: int, tmp: Path) -> List[bytes]:
+    # 同样的页面、不同的元数据：内容哈希各不相同，每个请求都走完整的解析与写库
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(str(DEFAULT_PDF))
+    out = []
+    for i in range(count):
+        writer = PdfWriter()
+        for page in reader.pages:
+            writer.add_page(page)
+        writer.add_metadata({"/Title": f"cspaper bench paper {i}"})
+        path = tmp / f"e2e_{i}.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+        out.append(path.read_bytes())
+    return out
+
+
+async def _e2e(pdfs: List[bytes], concurrency: int) -> Dict[str, Any]:
+    import httpx
+    from backend import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def upload(pdf: bytes) -> None:
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                resp = await client.post(
+                    "/api/review?refresh=true", files={"file": ("paper.pdf", pdf, "application/pdf")}
+                )
+                if resp.status_code != 200:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        await upload(pdfs[0])  # 预热：进程池、数据库连接、模块级缓存
+        latencies.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(pdf) for pdf in pdfs[1:]))
+        elapsed = time.perf_counter() - started
+
+    return {"latencies": latencies, "elapsed": elapsed, "errors": errors}
+
+
+def bench_e2e(args, tmp: Path) -> Results:
+    from backend.app.providers import FakeProvider, LLMRouter, set_router
+
+    requests = 8 if args.quick else args.requests
+    set_router(LLMRouter([FakeProvider(latency=args.llm_latency, jitter=0.0, error_rate=0.0, seed=args.seed)]))
+    pdfs = _distinct_pdfs(requests + 1, tmp)
+    run = asyncio.run(_e2e(pdfs, args.concurrency))
+
+    results: Results = {}
+    latencies = run["latencies"]
+    _metric(results, "e2e.review.throughput", len(latencies) / run["elapsed"], "req/s", "higher")
+    for q in (0.50, 0.95, 0.99):
+        _metric(results, f"e2e.review.p{int(q * 100)}", _percentile(latencies, q), "s")
+    _metric(results, "e2e.review.errors", run["errors"], "count")
+    print(
+        f"  {len(latencies)} requests at concurrency {args.concurrency}: "
+        f"{results['e2e.review.throughput']['value']:.2f} req/s, "
+        f"p50 {results['e2e.review.p50']['value']:.2f}s p95 {results['e2e.review.p95']['value']:.2f}s "
+        f"p99 {results['e2e.review.p99']['value']:.2f}s, {run['errors']} errors",
+        flush=True,
+    )
+    return results
+
+
+BENCHMARKS = {"pdf": bench_pdf, "json": bench_json, "db": bench_db, "e2e": bench_e2e}
+
+
+# ---------- compare ----------
+
+
+def compare(old_path: Path, new_path: Path, tolerance: float) -> int:
+    old = json.loads(old_path.read_text(encoding="utf-8"))
+    new = json.loads(new_path.read_text(encoding="utf-8"))
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')} (tolerance {tolerance:.0%})")
+
+    regressions = 0
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        before, after = old["results"].get(name), new["results"].get(name)
+        if before is None or after is None:
+            print(f"  {name:<38} {'only in ' + ('new' if before is None else 'old'):>30}")
+            continue
+        if before["value"] == 0:
+            change = 0.0 if after["value"] == 0 else float("inf")
+        else:
+            change = after["value"] / before["value"] - 1
+        worse = change > tolerance if after["better"] == "lower" else change < -tolerance
+        regressions += worse
+        print(
+            f"  {name:<38} {before['value']:>12.4g} -> {after['value']:<12.4g} {after['unit']:<10} "
+            f"{change:+7.1%}{'  REGRESSION' if worse else ''}"
+        )
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"comma-separated subset of {','.join(GROUPS)}")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast sanity run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=24, help="e2e: requests after warm-up")
+    parser.add_argument("--concurrency", type=int, default=8, help="e2e: concurrent uploads")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="e2e: FakeProvider seconds per call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, default=None, help="default: bench-results/<commit>.json")
+    parser.add_argument("--compare", type=Path, nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare, args.tolerance)
+
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    tmp = Path(tempfile.mkdtemp(prefix="cspaper-bench-"))
+    # 必须在导入 backend.app 之前设置：临时数据库、不截断 PDF、模型走本地假服务
+    os.environ["CSPAPER_DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["PDF_MAX_PAGES"] = "0"
+    os.environ["PDF_MAX_CHARS"] = "0"
+    os.environ["LLM_PROVIDERS"] = "fake"
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.concurrency))
+    # 所有请求都来自同一个 ASGI 客户端地址，单客户端上限不能低于并发数
+    os.environ.setdefault("ADMISSION_MAX_PER_CLIENT", str(args.concurrency))
+
+    from backend.app.db import init_db
+    from backend.app.pdf_utils import PDF_MAX_WORKERS, shutdown_pdf_pool
+
+    init_db()
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pdf_workers": PDF_MAX_WORKERS,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "results": {},
+    }
+
+    try:
+        for group in groups:
+            print(f"[{group}]", flush=True)
+            started = time.perf_counter()
+            report["results"].update(BENCHMARKS[group](args, tmp))
+            print(f"  ({time.perf_counter() - started:.1f}s)", flush=True)
+    finally:
+        shutdown_pdf_pool()
+
+    out = args.out or DEFAULT_OUT_DIR / f"{commit or 'unknown'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, default=str) + "\n", encoding="utf-8")
+    print(f"results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,86 @@
 # 顶部导入区域（改为绝对导入）
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+import os
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from fastapi.responses import JSONResponse
-from backend.app.schemas import ReviewResponse
-from backend.app.db import engine, SessionLocal, init_db
-from backend.app.models import Base, SubmissionORM, ReviewResultORM, ScoreORM, ReviewORM
-from backend.app.pdf_utils import extract_text_from_pdf
-from backend.app.llm import call_deepseek_for_review, LLMError
+from backend.app.schemas import (
+    ReviewBatch,
+    ReviewJob,
+    ReviewResponse,
+    ReviewResultPage,
+    ScoreAnalytics,
+    ScoreRank,
+    SearchResponse,
+    SubmissionPage,
+)
+from backend.app.db import SessionLocal, init_db
+from backend.app.providers import aclose_llm_clients, preload_llm_sdk
+from backend.app.observability import (
+    STAGE_UPLOAD,
+    RequestContextMiddleware,
+    record_error,
+    render_metrics,
+    span,
+)
+from backend.app.pdf_utils import preload_pdf_reader, shutdown_pdf_pool, warm_pdf_pool
+from backend.app.pipeline import (
+    ReviewPipelineError,
+    rereview_submission,
+    run_review_pipeline,
+    stream_review_pipeline,
+    load_review_response,
+)
+from backend.app.jobs import STATUS_DONE, create_job, get_job, job_pool, job_to_schema
+from backend.app.batch import REVIEW_BATCH_MAX_FILES, create_batch, get_batch
+from backend.app.uploads import InvalidUpload, SpooledUpload, UploadTooLarge, receive_pdf_uploads
+from backend.app.admission import (
+    PRIORITY_DEFAULT,
+    PRIORITY_INTERACTIVE,
+    AdmissionRejected,
+    AdmissionSlot,
+    admission,
+)
+from backend.app.compression import RESPONSE_COMPRESSION, CompressionMiddleware
+from backend.app.serialization import dumps as dumps_json
+from backend.app.export import (
+    EXPORT_FORMATS,
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    ExportError,
+    check_format,
+    export_upper_bound,
+    stream_export,
+)
+from backend.app.analytics import ANALYTICS_DAYS, ANALYTICS_MAX_DAYS, score_analytics, score_rank
+from backend.app.history import (
+    HISTORY_MAX_PAGE_SIZE,
+    HISTORY_PAGE_SIZE,
+    InvalidCursor,
+    list_review_results,
+    list_submissions,
+)
+from backend.app.search import (
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    EmptySearchQuery,
+    search,
+)
 from uuid import uuid4
 from datetime import datetime, timezone
 
+# 不要设置 default_response_class / response_class：带 response_model 的接口
+# 由 FastAPI 经 pydantic-core 直接序列化为 JSON 字节（实例不会重新校验），自定义响应类会退回较慢的 dict + json 路径
 app = FastAPI(title="csPaper AI Review MVP")
 
-# 创建表（如果尚不存在）
-Base.metadata.create_all(bind=engine)
+# 启动时预热 PDF 与模型 SDK（见 backend/serve.py）：首个请求不再承担模块导入与进程池启动
+CSPAPER_WARMUP = os.getenv("CSPAPER_WARMUP", "0") != "0"
+
+# 按 Accept-Encoding 压缩较大的响应（br / gzip），最内层，CORS 等头部照常添加
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
 
 # Dev CORS: allow localhost frontends
 app.add_middleware(
@@ -23,7 +89,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Review-Cache", "X-Export-Watermark"],
 )
+# 请求 ID（X-Request-ID）、请求计数与耗时；放在最外层，CORS 预检请求同样计入
+app.add_middleware(RequestContextMiddleware)
 
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
 
@@ -40,368 +109,455 @@ def get_db():
         db.close()
 
 @app.on_event("startup")
-def _startup():
+async def _startup():
+    # 结构版本一致时只读一次 PRAGMA user_version
     init_db()
+    if CSPAPER_WARMUP:
+        # 经 backend.serve 在 fork 前预加载过时，前两步只剩几毫秒
+        preload_pdf_reader()
+        preload_llm_sdk()
+        warm_pdf_pool()
+    await job_pool.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await job_pool.stop()
+    await aclose_llm_clients()
+    shutdown_pdf_pool()
 
 
 @app.get("/ping")
 def ping():
     return {"msg": "ok"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus 文本格式的指标：各阶段耗时直方图、错误码计数、模型 token 用量、审稿缓存命中情况、
+    SQLite 语句耗时与 HTTP 请求统计。每个 worker 进程单独计数。
+    """
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-@app.post("/api/review", response_model=ReviewResponse)
-async def create_review(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-):
+def _error(status_code: int, code: str, message: str, details=None, headers=None) -> HTTPException:
+    record_error(code)
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "error": {
+                "code": code,
+                "message": message,
+                "details": details,
+            }
+        },
+        headers=headers,
+    )
+
+
+async def _admit(request: Optional[Request], priority: int = PRIORITY_DEFAULT) -> AdmissionSlot:
     """
-    接受一个 PDF 文件，解析文本，调用 DeepSeek 获取评分与审稿意见，
-    写入数据库四张表（submissions/review_results/scores/reviews），并返回结构化结果。
+    审稿准入：按客户端 IP 与全局并发限流，在接收上传之前执行，过载时不必先收完整个 PDF。
+    拒绝时返回 429 / 503 并带 Retry-After；放行后调用方负责 slot.release()。
     """
-    # 1. 基础校验：存在性 + 类型 + 大小
-    if file is None:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": {
-                    "code": "MISSING_FILE",
-                    "message": "必须提供一个名为 file 的 PDF 文件。",
-                    "details": None,
-                }
-            },
-        )
+    client = request.client.host if request is not None and request.client else None
+    try:
+        return await admission.acquire(client, priority)
+    except AdmissionRejected as e:
+        raise _error(e.status_code, e.code, e.message, e.details, headers={"Retry-After": str(e.retry_after)})
 
-    if file.content_type != "application/pdf":
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": {
-                    "code": "INVALID_FILE_TYPE",
-                    "message": "仅支持上传 PDF 文件。",
-                    "details": {"content_type": file.content_type},
-                }
-            },
-        )
 
-    raw_bytes = await file.read()
-    if len(raw_bytes) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail={
-                "error": {
-                    "code": "FILE_TOO_LARGE",
-                    "message": "文件大小超过 20MB 限制。",
-                    "details": {"size": len(raw_bytes)},
-                }
-            },
-        )
+class _AdmittedStreamingResponse(StreamingResponse):
+    """
+    响应结束时归还准入名额，并删除请求对应的上传临时文件。客户端在生成器开始前就断开时
+    生成器的 finally 不会执行，所以两者都不放在生成器里。
+    """
 
-    # 2. PDF 转文本
-    try:
-        full_text, preview = extract_text_from_pdf(raw_bytes)
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": {
-                    "code": "FORMAT_FAILED",
-                    "message": "PDF 解析失败，请检查文件是否损坏。",
-                    "details": {"reason": str(e)},
-                }
-            },
-        )
+    def __init__(self, *args, slot: AdmissionSlot, upload: Optional[SpooledUpload] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slot = slot
+        self.upload = upload
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+            if self.upload is not None:
+                await run_in_threadpool(self.upload.cleanup)
 
-    if not full_text.strip():
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": {
-                    "code": "EMPTY_TEXT",
-                    "message": "无法从 PDF 中提取有效文本。",
-                    "details": None,
+
+def _upload_body(field: str, multiple: bool = False) -> dict:
+    """
+    上传接口直接读取请求体流，不声明 File(...) 参数；这里补上 OpenAPI 里的 multipart 请求体说明。
+    """
+    schema = {"type": "string", "format": "binary"}
+    if multiple:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "properties": {field: schema}, "required": [field]}
                 }
             },
-        )
+        }
+    }
 
-    # 3. 调用 DeepSeek 模型得到 scores + reviews
+
+async def _receive_pdf_uploads(request: Request, field: str, max_files: int = 1) -> List[SpooledUpload]:
+    """
+    边接收边校验并落盘：超过大小限制立即 413，文件头不是 %PDF、文件尾缺少 xref 时 400，
+    不会先把整个请求体收完；调用方负责 cleanup()。
+    """
     try:
-        llm_result = call_deepseek_for_review(full_text)
-    except LLMError as e:
-        raise HTTPException(
-            status_code=502,
-            detail={
-                "error": {
-                    "code": "MODEL_ERROR",
-                    "message": "审稿模型调用失败，请稍后重试。",
-                    "details": {"reason": str(e)},
-                }
-            },
+        with span(STAGE_UPLOAD):
+            return await receive_pdf_uploads(request, field, MAX_FILE_SIZE, max_files)
+    except UploadTooLarge as e:
+        raise _error(
+            413,
+            "FILE_TOO_LARGE",
+            "文件大小超过 20MB 限制。",
+            {"size": e.size, "limit": e.limit},
         )
+    except InvalidUpload as e:
+        raise _error(400, e.code, e.message, e.details)
 
-    scores_data = llm_result.get("scores", [])
-    reviews_data = llm_result.get("reviews", [])
 
-    # 4. 写入数据库：submission + review_result + scores + reviews
-    submission_id = f"sub_{uuid4().hex[:12]}"
-    review_result_id = f"rev_{uuid4().hex[:12]}"
+async def _receive_pdf_upload(request: Request) -> SpooledUpload:
+    uploads = await _receive_pdf_uploads(request, "file")
+    return uploads[0]
 
-    db_submission = SubmissionORM(
-        submission_id=submission_id,
-        file_name=file.filename,
-        file_size=len(raw_bytes),
-        text_preview=preview,
-    )
-    db.add(db_submission)
-    db.flush()  # 获取 db_submission.id
 
-    db_review_result = ReviewResultORM(
-        review_result_id=review_result_id,
-        submission_id=submission_id,
-        submission_db_id=db_submission.id,
-    )
-    db.add(db_review_result)
-    db.flush()
-
-    # scores
-    for item in scores_data:
-        dimension = str(item.get("dimension", "")).strip()
-        value_raw = item.get("value", 0.0)
+@app.post("/api/review", response_model=ReviewResponse, openapi_extra=_upload_body("file"))
+async def create_review(
+    request: Request,
+    response: Response,
+    refresh: bool = Query(False, description="跳过审稿缓存，强制重新调用模型"),
+):
+    """
+    接受一个 PDF 文件，解析文本，调用 DeepSeek 获取评分与审稿意见，
+    写入数据库四张表（submissions/review_results/scores/reviews），并返回结构化结果。
+    同一份 PDF 再次上传时直接返回缓存的审稿结果（响应头 X-Review-Cache: hit），
+    全文与已审稿件近似重复（改名、小幅修订）时复用那份结果（X-Review-Cache: near-hit），
+    除非带上 ?refresh=true。
+    服务过载时返回 429（同一客户端并发过多）或 503（排队已满或等待过长），响应头 Retry-After 给出重试间隔。
+    """
+    slot = await _admit(request)
+    try:
+        upload = await _receive_pdf_upload(request)
         try:
-            value = float(value_raw)
-        except Exception:
-            value = 0.0
+            result, cache_status = await run_review_pipeline(upload, refresh=refresh)
+        except ReviewPipelineError as e:
+            raise _error(e.status_code, e.code, e.message, e.details)
+        finally:
+            await run_in_threadpool(upload.cleanup)
+    finally:
+        slot.release()
 
-        if not dimension:
-            continue
+    response.headers["X-Review-Cache"] = cache_status
+    return result
 
-        db_score = ScoreORM(
-            review_result_id=db_review_result.id,
-            dimension=dimension,
-            value=value,
-        )
-        db.add(db_score)
-
-    # reviews
-    for item in reviews_data:
-        reviewer_id = str(item.get("reviewer_id", "")).strip() or "reviewer"
-        text = str(item.get("text", "")).strip()
-        if not text:
-            continue
-
-        db_review = ReviewORM(
-            review_result_id=db_review_result.id,
-            reviewer_id=reviewer_id,
-            text=text,
-        )
-        db.add(db_review)
-
-    db.commit()
-    db.refresh(db_submission)
-    db.refresh(db_review_result)
-
-    # 5. 组装成 Pydantic 的 ReviewResponse 返回
-    # 注意：此处局部导入也改为绝对导入
-    from backend.app.schemas import Submission as SubmissionSchema
-    from backend.app.schemas import ReviewResult as ReviewResultSchema
-    from backend.app.schemas import Score as ScoreSchema
-    from backend.app.schemas import Review as ReviewSchema
-    from backend.app.schemas import ReviewResponse as ReviewResponseSchema
-
-    submission_schema = SubmissionSchema(
-        submission_id=db_submission.submission_id,
-        file_name=db_submission.file_name,
-        file_size=db_submission.file_size,
-        created_at=db_submission.created_at.isoformat(),
-        text_preview=db_submission.text_preview,
-    )
 
-    score_schemas = [
-        ScoreSchema(dimension=s.dimension, value=s.value)
-        for s in db_review_result.scores
-    ]
-
-    review_schemas = [
-        ReviewSchema(reviewer_id=r.reviewer_id, text=r.text)
-        for r in db_review_result.reviews
-    ]
-
-    review_result_schema = ReviewResultSchema(
-        review_result_id=db_review_result.review_result_id,
-        submission_id=db_review_result.submission_id,
-        scores=score_schemas,
-        reviews=review_schemas,
-        generated_at=db_review_result.generated_at.isoformat(),
-    )
+def _sse(event: str, data) -> bytes:
+    return b"event: " + event.encode("ascii") + b"\ndata: " + dumps_json(data) + b"\n\n"
 
-    response = ReviewResponseSchema(
-        submission=submission_schema,
-        review_result=review_result_schema,
+
+@app.post("/api/review/stream", openapi_extra=_upload_body("file"))
+async def create_review_stream(
+    request: Request,
+    refresh: bool = Query(False, description="跳过审稿缓存，强制重新调用模型"),
+):
+    """
+    与 POST /api/review 相同的审稿流程，但以 Server-Sent Events 实时推送：
+    stage（阶段切换）、token（模型原始输出片段）、score / review（单条结果闭合后立即推送）、
+    result（写库后的完整 ReviewResponse）或 error（{"error": {...}}）。
+    上传校验失败、服务过载（429 / 503，同 POST /api/review）时仍返回普通的 HTTP 错误；
+    排队时优先于同步审稿放行。
+    """
+    slot = await _admit(request, PRIORITY_INTERACTIVE)
+    try:
+        upload = await _receive_pdf_upload(request)
+    except BaseException:
+        slot.release()
+        raise
+
+    async def events():
+        try:
+            async for event, payload in stream_review_pipeline(upload, refresh=refresh):
+                yield _sse(event, payload)
+        except ReviewPipelineError as e:
+            record_error(e.code)
+            yield _sse("error", {"error": e.to_error()})
+
+    return _AdmittedStreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        slot=slot,
+        upload=upload,
     )
 
-    return response
+
+@app.post("/api/review/jobs", response_model=ReviewJob, status_code=202, openapi_extra=_upload_body("file"))
+async def submit_review_job(
+    request: Request,
+    refresh: bool = Query(False, description="跳过审稿缓存，强制重新调用模型"),
+    db: Session = Depends(get_db),
+):
+    """
+    异步提交审稿任务：校验并落盘后立即返回 job_id，
+    由后台 worker 完成解析、模型调用与写库。
+    """
+    upload = await _receive_pdf_upload(request)
+    try:
+        job = await run_in_threadpool(create_job, db, upload, refresh)
+    except Exception:
+        await run_in_threadpool(upload.cleanup)
+        raise
+    job_pool.notify()
+    return job_to_schema(job)
+
+
+@app.get("/api/review/jobs/{job_id}", response_model=ReviewJob)
+def get_review_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    查询任务状态：queued / extracting / calling_model / persisting / done / failed。
+    """
+    job = get_job(db, job_id)
+    if job is None:
+        raise _error(404, "JOB_NOT_FOUND", "审稿任务不存在。", {"job_id": job_id})
+    return job_to_schema(job)
 
 
-@app.post("/api/review", response_model=ReviewResponse)
-async def create_review(file: UploadFile = File(...)):
+@app.get("/api/review/jobs/{job_id}/result", response_model=ReviewResponse)
+def get_review_job_result(job_id: str, db: Session = Depends(get_db)):
     """
-    接受一个 PDF 文件，解析文本，调用 DeepSeek 获取评分与审稿意见，
-    写入数据库四张表（submissions/review_results/scores/reviews），并返回结构化结果。
+    获取已完成任务的审稿结果，结构与 POST /api/review 的响应一致。
     """
-    # 基本校验
-    if file is None:
-        return JSONResponse(
-            status_code=400,
-            content=ErrorEnvelope(
-                error=ApiError(code="MISSING_FILE", message="必须提供一个名为 file 的 PDF 文件。", details=None)
-            ).model_dump(),
+    job = get_job(db, job_id)
+    if job is None:
+        raise _error(404, "JOB_NOT_FOUND", "审稿任务不存在。", {"job_id": job_id})
+    if job.status != STATUS_DONE:
+        raise _error(
+            409,
+            "JOB_NOT_DONE",
+            "审稿任务尚未完成。",
+            {"job_id": job_id, "status": job.status},
         )
+    result = load_review_response(db, job.review_result_id)
+    if result is None:
+        raise _error(404, "REVIEW_NOT_FOUND", "审稿结果不存在。", {"review_result_id": job.review_result_id})
+    return result
 
-    if file.content_type != "application/pdf":
-        return JSONResponse(
-            status_code=400,
-            content=ErrorEnvelope(
-                error=ApiError(
-                    code="INVALID_FILE_TYPE",
-                    message="仅支持上传 PDF 文件。",
-                    details={"content_type": file.content_type},
-                )
-            ).model_dump(),
-        )
 
-    # 读入文件
-    data = await file.read()
-    size = len(data)
-    if size > MAX_FILE_SIZE:
-        return JSONResponse(
-            status_code=413,
-            content=ErrorEnvelope(
-                error=ApiError(
-                    code="FILE_TOO_LARGE", message="文件超过 20MB 限制", details={"limit_mb": 20}
-                )
-            ).model_dump(),
-        )
+@app.post(
+    "/api/review/batches",
+    response_model=ReviewBatch,
+    status_code=202,
+    openapi_extra=_upload_body("files", multiple=True),
+)
+async def submit_review_batch(
+    request: Request,
+    refresh: bool = Query(False, description="跳过审稿缓存，强制重新调用模型"),
+    db: Session = Depends(get_db),
+):
+    """
+    批量提交审稿：一次上传多个 PDF（字段名均为 files），每个文件登记为一条异步任务，
+    由后台 worker 以有限并发处理。任一文件校验失败（或文件数超过上限）则整个批次不提交。
+    用 GET /api/review/batches/{batch_id} 查询进度与吞吐。
+    """
+    uploads = await _receive_pdf_uploads(request, "files", REVIEW_BATCH_MAX_FILES)
+    try:
+        batch = await run_in_threadpool(create_batch, db, uploads, refresh)
+    except Exception:
+        for upload in uploads:
+            await run_in_threadpool(upload.cleanup)
+        raise
+    job_pool.notify()
+    return await run_in_threadpool(get_batch, db, batch.batch_id)
+
 
-    # 解析 PDF -> 文本
+@app.get("/api/review/batches/{batch_id}", response_model=ReviewBatch)
+def get_review_batch(batch_id: str, db: Session = Depends(get_db)):
+    """
+    批次进度：各状态任务数、每个任务的状态，以及按已完成篇数计算的吞吐（篇/分钟）。
+    """
+    batch = get_batch(db, batch_id)
+    if batch is None:
+        raise _error(404, "BATCH_NOT_FOUND", "审稿批次不存在。", {"batch_id": batch_id})
+    return batch
+
+
+def _invalid_cursor(cursor: str) -> HTTPException:
+    return _error(400, "INVALID_CURSOR", "分页游标无效，请从第一页重新获取。", {"cursor": cursor})
+
+
+@app.get("/api/submissions", response_model=SubmissionPage)
+def get_submissions(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    created_from: Optional[datetime] = Query(None, description="起始时间（含）"),
+    created_to: Optional[datetime] = Query(None, description="结束时间（不含）"),
+    db: Session = Depends(get_db),
+):
+    """
+    历史上传记录，按上传时间倒序，keyset 分页。
+    """
     try:
-        full_text, preview = extract_text_from_pdf(data)
-    except Exception as e:
-        return JSONResponse(
-            status_code=422,
-            content=ErrorEnvelope(
-                error=ApiError(code="PDF_PARSE_FAILED", message="PDF 解析失败", details=str(e))
-            ).model_dump(),
-        )
+        return list_submissions(db, limit, cursor, created_from, created_to)
+    except InvalidCursor:
+        raise _invalid_cursor(cursor)
 
-    if not full_text.strip():
-        return JSONResponse(
-            status_code=422,
-            content=ErrorEnvelope(
-                error=ApiError(code="PDF_PARSE_EMPTY_TEXT", message="PDF 文本为空", details=None)
-            ).model_dump(),
-        )
 
-    # 调用 DeepSeek -> JSON
+@app.post("/api/submissions/{submission_id}/reviews", response_model=ReviewResponse)
+async def create_rereview(submission_id: str, request: Request):
+    """
+    用已保存的全文重新审阅一份历史投稿（例如换了 prompt 或模型），无需重新上传 PDF；
+    新的审稿结果追加到同一个 submission 下。没有保存全文的旧投稿返回 409。
+    与 POST /api/review 共用准入限制。
+    """
+    slot = await _admit(request)
     try:
-        llm_out = call_deepseek_for_review(full_text)
-    except LLMError as e:
-        return JSONResponse(
-            status_code=502,
-            content=ErrorEnvelope(
-                error=ApiError(code="LLM_CALL_FAILED", message="DeepSeek 调用失败", details=str(e))
-            ).model_dump(),
+        return await rereview_submission(submission_id)
+    except ReviewPipelineError as e:
+        raise _error(e.status_code, e.code, e.message, e.details)
+    finally:
+        slot.release()
+
+
+@app.get("/api/reviews", response_model=ReviewResultPage)
+def get_review_results(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    generated_from: Optional[datetime] = Query(None, description="起始时间（含）"),
+    generated_to: Optional[datetime] = Query(None, description="结束时间（不含）"),
+    submission_id: Optional[str] = Query(None),
+    min_score: Optional[float] = Query(None, ge=0.0, le=5.0),
+    max_score: Optional[float] = Query(None, ge=0.0, le=5.0),
+    dimension: Optional[str] = Query(None, description="分数阈值作用的维度，缺省为平均分"),
+    db: Session = Depends(get_db),
+):
+    """
+    历史审稿结果（含分数，不含审稿意见全文），按生成时间倒序，keyset 分页。
+    支持按时间范围、submission 与分数阈值筛选。
+    """
+    try:
+        return list_review_results(
+            db,
+            limit,
+            cursor,
+            generated_from,
+            generated_to,
+            submission_id,
+            min_score,
+            max_score,
+            dimension,
         )
+    except InvalidCursor:
+        raise _invalid_cursor(cursor)
+
 
-    # 生成业务 ID
-    submission_id = _make_id("sub")
-    review_result_id = _make_id("rev")
+@app.get("/api/reviews/{review_result_id}", response_model=ReviewResponse)
+def get_review_result(review_result_id: str, db: Session = Depends(get_db)):
+    """
+    按 review_result_id 获取完整审稿结果，结构与 POST /api/review 的响应一致。
+    """
+    result = load_review_response(db, review_result_id)
+    if result is None:
+        raise _error(404, "REVIEW_NOT_FOUND", "审稿结果不存在。", {"review_result_id": review_result_id})
+    return result
 
-    # 入库
-    session = SessionLocal()
+
+@app.get("/api/export/reviews")
+def export_reviews(
+    format: str = Query("ndjson", description=f"导出格式：{' / '.join(EXPORT_FORMATS)}（parquet、arrow 需要安装 pyarrow）"),
+    after: int = Query(0, ge=0, description="增量导出：只导出水位之后的结果，传上一次响应头里的 X-Export-Watermark"),
+):
+    """
+    流式导出全部审稿结果（含分数与审稿意见全文），内存占用与导出总量无关。
+    响应头 X-Export-Watermark 为本次导出的上界，下次带上 ?after=<水位> 即只取新增的结果；
+    导出过程中新写入的结果留给下一次。
+    """
     try:
-        sub_db = SubmissionORM(
-            submission_id=submission_id,
-            file_name=file.filename or "paper.pdf",
-            file_size=size,
-            text_preview=preview,
-        )
-        session.add(sub_db)
-        session.commit()
-        session.refresh(sub_db)
-
-        rr_db = ReviewResultORM(
-            review_result_id=review_result_id,
-            submission_id=submission_id,
-            submission_db_id=sub_db.id,
-        )
-        session.add(rr_db)
-        session.commit()
-        session.refresh(rr_db)
-
-        # scores
-        for s in llm_out["scores"]:
-            session.add(
-                ScoreORM(
-                    review_result_id=rr_db.id,
-                    dimension=str(s["dimension"]),
-                    value=float(s["value"]),
-                )
-            )
-
-        # reviews
-        for r in llm_out["reviews"]:
-            session.add(
-                ReviewORM(
-                    review_result_id=rr_db.id,
-                    reviewer_id=str(r["reviewer_id"]),
-                    text=str(r["text"]),
-                )
-            )
-
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        return JSONResponse(
-            status_code=500,
-            content=ErrorEnvelope(
-                error=ApiError(code="DB_WRITE_FAILED", message="写入数据库失败", details=str(e))
-            ).model_dump(),
-        )
-    finally:
-        session.close()
-
-    # 构造响应（与前端契约一致）
-    submission = Submission(
-        submission_id=sub_db.submission_id,
-        file_name=sub_db.file_name,
-        file_size=sub_db.file_size,
-        created_at=sub_db.created_at.isoformat(),
-        text_preview=sub_db.text_preview,
-    )
+        check_format(format)
+    except ExportError as e:
+        raise _error(400, "INVALID_EXPORT_FORMAT", "不支持的导出格式。", {"format": format, "reason": str(e)})
 
-    scores = [Score(dimension=str(s["dimension"]), value=float(s["value"])) for s in llm_out["scores"]]
-    reviews = [Review(reviewer_id=str(r["reviewer_id"]), text=str(r["text"])) for r in llm_out["reviews"]]
+    db = SessionLocal()
+    try:
+        until = export_upper_bound(db)
+    except Exception:
+        db.close()
+        raise
 
-    review_result = ReviewResult(
-        review_result_id=rr_db.review_result_id,
-        submission_id=sub_db.submission_id,
-        scores=scores,
-        reviews=reviews,
-        generated_at=rr_db.generated_at.isoformat(),
+    def body():
+        try:
+            yield from stream_export(db, format, after, until)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="reviews-{after}-{until}.{FILE_EXTENSIONS[format]}"',
+            "X-Export-Watermark": str(until),
+        },
     )
 
-    return ReviewResponse(submission=submission, review_result=review_result)
+
+@app.get("/api/analytics/scores", response_model=ScoreAnalytics)
+def get_score_analytics(
+    days: int = Query(ANALYTICS_DAYS, ge=1, le=ANALYTICS_MAX_DAYS, description="逐日趋势回看的天数"),
+    db: Session = Depends(get_db),
+):
+    """
+    各评分维度的分布：条数、均值、标准差、最值、分位数与直方图（全部历史），
+    以及最近 days 天的逐日均值 / 标准差。读取增量维护的汇总表，不扫描 scores 表。
+    """
+    return score_analytics(db, days)
+
+
+@app.get("/api/analytics/scores/rank", response_model=ScoreRank)
+def get_score_rank(
+    dimension: str = Query(..., min_length=1, max_length=64),
+    value: float = Query(..., ge=0.0, le=5.0),
+    db: Session = Depends(get_db),
+):
+    """
+    某个分数在该维度全部历史分数中的百分位，例如 clarity 4.5 分位于前 12%（top_percent=12）。
+    """
+    rank = score_rank(db, dimension, value)
+    if rank is None:
+        raise _error(404, "DIMENSION_NOT_FOUND", "该维度暂无评分数据。", {"dimension": dimension})
+    return rank
+
+
+@app.get("/api/search", response_model=SearchResponse)
+def search_reviews(
+    q: str = Query(..., min_length=1, max_length=200, description="关键词，多个词之间为 AND；词尾 * 表示前缀匹配"),
+    scope: str = Query("all", pattern="^(all|reviews|submissions)$"),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    全文检索审稿意见与上传记录（文件名、正文预览），按相关度排序并返回命中摘要。
+    """
+    try:
+        return search(db, q, scope, limit, offset)
+    except EmptySearchQuery:
+        raise _error(400, "EMPTY_QUERY", "检索词中没有可用的关键词。", {"q": q})
 
 
 if __name__ == "__main__":
+    # 开发用（自动重载）；生产环境用 python -m backend.serve
     import uvicorn
 
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
-from backend.app.db import engine, SessionLocal, init_db
-from backend.app.models import Base, SubmissionORM, ReviewResultORM, ScoreORM, ReviewORM
-from backend.app.pdf_utils import extract_text_from_pdf
-from backend.app.llm import call_deepseek_for_review, LLMError
-
-
@@ -0,0 +1,141 @@
+"""
+生产环境入口：预先 fork 的多 worker uvicorn。
+
+主进程只做一次的事：检查数据库结构版本（init_db）、把上次退出时处理中的审稿任务放回队列、导入应用，--warmup 时再预加载
+pypdf 与 openai SDK；随后绑定监听端口并 fork 出 --workers 个 worker，worker 直接继承已导入的
+模块，启动只剩 lifespan 钩子。worker 异常退出时主进程立即补 fork 一个（它没处理完的任务要等下次重启才放回队列），扩容同样不必重新导入。
+uvicorn 自带的 --workers 用 spawn 启动子进程，每个 worker 都要从头导入一遍。
+
+    python -m backend.serve --host 0.0.0.0 --port 8000 --workers 4 --warmup
+
+不支持 fork 的平台上退回 uvicorn 自带的多进程模式。
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+logger = logging.getLogger("cspaper.serve")
+
+
+def _prepare(warmup: bool) -> None:
+    # 必须在导入 backend.main 之前设置，worker 的启动钩子据此预热进程池
+    if warmup:
+        os.environ["CSPAPER_WARMUP"] = "1"
+    # 处理中的任务在这里放回队列；worker 启动时再放回会抢走兄弟进程正在处理的任务
+    os.environ["REVIEW_JOB_REQUEUE_ON_STARTUP"] = "0"
+
+    from backend.app.db import SessionLocal, engine, init_db
+    from backend.app.jobs import requeue_interrupted_jobs
+
+    started = time.perf_counter()
+    init_db()
+    db = SessionLocal()
+    try:
+        requeue_interrupted_jobs(db)
+    finally:
+        db.close()
+    # fork 之后各 worker 各自建立 SQLite 连接，不共用主进程的连接
+    engine.dispose()
+    if warmup:
+        from backend.app.pdf_utils import preload_pdf_reader
+        from backend.app.providers import preload_llm_sdk
+
+        preload_pdf_reader()
+        preload_llm_sdk()
+    logger.info(f"Schema checked{' and PDF / LLM layers preloaded' if warmup else ''} in {time.perf_counter() - started:.2f}s")
+
+
+def _run_prefork(config: uvicorn.Config, workers: int) -> None:
+    config.load()
+    sock = config.bind_socket()
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            # worker 里由 uvicorn 重新安装自己的信号处理
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Started {workers} workers on {config.host}:{config.port}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        logger.warning(f"Worker {pid} exited (status {status}) after {time.monotonic() - started:.0f}s; replacing it")
+        # 启动即崩溃时别让主进程空转
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        spawn()
+    sock.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument(
+        "--warmup",
+        action=argparse.BooleanOptionalAction,
+        default=os.getenv("CSPAPER_WARMUP", "0") != "0",
+        help="preload pypdf and the openai SDK before forking, and start each worker's PDF pool at startup",
+    )
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    _prepare(args.warmup)
+
+    config = uvicorn.Config(
+        "backend.main:app",
+        host=args.host,
+        port=args.port,
+        log_level=args.log_level,
+        proxy_headers=True,
+    )
+    if args.workers <= 1:
+        uvicorn.Server(config).run()
+    elif hasattr(os, "fork"):
+        _run_prefork(config, args.workers)
+    else:
+        uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())